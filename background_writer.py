@@ -0,0 +1,109 @@
+"""
+Escritor en segundo plano: saca las escrituras a disco del bucle de eventos
+
+Los elementos encolados se escriben desde un hilo propio. Mientras una
+escritura está en curso, los que llegan se acumulan y se escriben todos juntos
+en la siguiente, así que una ráfaga de altas cuesta una sola escritura (y un
+solo fsync) en lugar de una por alta.
+"""
+
+import logging
+import threading
+import time
+
+
+class EscritorSegundoPlano:
+    """Hilo que escribe por lotes lo que se le encola
+
+    'escribir_lote' recibe la lista de elementos pendientes, en orden de
+    llegada. Si falla, el error se registra y esos elementos se descartan.
+    """
+
+    def __init__(self, escribir_lote, nombre='escritor', retardo=0.0):
+        self._escribir_lote = escribir_lote
+        self.nombre = nombre
+        # Espera opcional antes de escribir para juntar más elementos en el mismo lote
+        self.retardo = retardo
+        self._pendientes = []
+        self._condicion = threading.Condition()
+        self._escribiendo = False
+        self._detenido = False
+        self.encolados = 0
+        self.escrituras = 0
+        self.escritos = 0
+        self.errores = 0
+        self.lote_maximo = 0
+        self.latencia_total = 0.0
+        self.latencia_maxima = 0.0
+        self.latencia_ultima = None
+        self._hilo = threading.Thread(target=self._bucle, name=nombre, daemon=True)
+        self._hilo.start()
+
+    def encolar(self, elemento):
+        """Añade un elemento a la cola; no espera a que se escriba"""
+        with self._condicion:
+            if self._detenido:
+                raise RuntimeError(f"El escritor '{self.nombre}' está detenido")
+            self._pendientes.append(elemento)
+            self.encolados += 1
+            self._condicion.notify_all()
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while not self._pendientes and not self._detenido:
+                    self._condicion.wait()
+                if not self._pendientes:
+                    return
+            if self.retardo and not self._detenido:
+                time.sleep(self.retardo)
+            with self._condicion:
+                lote = self._pendientes
+                self._pendientes = []
+                self._escribiendo = True
+
+            inicio = time.perf_counter()
+            try:
+                self._escribir_lote(lote)
+            except Exception as e:
+                self.errores += 1
+                logging.error(f"Error en el escritor '{self.nombre}' ({len(lote)} elementos perdidos): {e}")
+            latencia = time.perf_counter() - inicio
+
+            with self._condicion:
+                self._escribiendo = False
+                self.escrituras += 1
+                self.escritos += len(lote)
+                self.lote_maximo = max(self.lote_maximo, len(lote))
+                self.latencia_ultima = latencia
+                self.latencia_total += latencia
+                self.latencia_maxima = max(self.latencia_maxima, latencia)
+                self._condicion.notify_all()
+
+    def vaciar(self, timeout=None):
+        """Espera a que todo lo encolado hasta ahora esté escrito; devuelve False si vence el timeout"""
+        with self._condicion:
+            return self._condicion.wait_for(lambda: not self._pendientes and not self._escribiendo, timeout)
+
+    def detener(self, timeout=None):
+        """Escribe lo pendiente y termina el hilo"""
+        with self._condicion:
+            self._detenido = True
+            self._condicion.notify_all()
+        self._hilo.join(timeout)
+
+    def estadisticas(self):
+        """Contadores: cola, escrituras, elementos por escritura y latencia de cada escritura"""
+        with self._condicion:
+            return {
+                'en_cola': len(self._pendientes),
+                'encolados': self.encolados,
+                'escrituras': self.escrituras,
+                'escritos': self.escritos,
+                'errores': self.errores,
+                'lote_medio': self.escritos / self.escrituras if self.escrituras else None,
+                'lote_maximo': self.lote_maximo,
+                'latencia_ultima_ms': self.latencia_ultima * 1000 if self.latencia_ultima is not None else None,
+                'latencia_media_ms': self.latencia_total / self.escrituras * 1000 if self.escrituras else None,
+                'latencia_maxima_ms': self.latencia_maxima * 1000
+            }
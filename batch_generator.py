@@ -0,0 +1,399 @@
+"""
+Motor de generación en bloque: genera N sistemas a la vez con arrays de NumPy
+"""
+
+import numpy as np
+from samplers import AliasSampler
+from ruleset import MAX_ESTRELLAS, NUM_ESTRELLAS_POR_TIPO
+
+MENSAJE_SIN_DEPOSITOS = "No hay ningún depósito de recursos estratégicos en el sistema"
+MENSAJE_CON_DEPOSITOS = "Recursos estratégicos presentes en el sistema"
+
+
+def _muestrear_alias(rng, sampler, size):
+    """Muestrea índices de un AliasSampler en bloque"""
+    cortes, alias = sampler.tabla_alias()
+    cortes = np.asarray(cortes, dtype=np.int64)
+    alias = np.asarray(alias, dtype=np.int64)
+    r = rng.integers(0, len(sampler) * sampler.total, size=size, dtype=np.int64)
+    columna = r // sampler.total
+    return np.where(r < cortes[columna], columna, alias[columna])
+
+
+def _porcentaje(rng, probabilidad, size):
+    """Equivalente en bloque a 'random.randint(1, 100) <= probabilidad'"""
+    return rng.integers(1, 101, size=size) <= probabilidad
+
+
+def _tablas_rasgos(sampler, especies):
+    """Matriz [especie, rasgo] de elegibilidad y máscaras de exclusión de un TraitSampler"""
+    num_rasgos = len(sampler.rasgos)
+    elegibles = np.array(
+        [[sampler.pool(especie) >> j & 1 for j in range(num_rasgos)] for especie in especies],
+        dtype=bool
+    )
+    return elegibles, np.array(sampler.exclusiones, dtype=np.int64)
+
+
+def _muestrear_rasgos(rng, especies, elegibles, exclusiones, cantidad):
+    """Elige 'cantidad' rasgos sin reemplazo para cada especie, respetando exclusiones
+
+    Recorrer una permutación aleatoria de los rasgos elegibles y saltar los ya
+    excluidos equivale a elegir uno a uno entre los que quedan disponibles.
+    """
+    m = len(especies)
+    num_rasgos = elegibles.shape[1]
+    resultado = np.full((m, cantidad), -1, dtype=np.int8)
+    if m == 0:
+        return resultado
+
+    claves = rng.random((m, num_rasgos))
+    claves[~elegibles[especies]] = np.inf
+    orden = np.argsort(claves, axis=1)
+
+    elegidos = np.zeros(m, dtype=np.int64)
+    bloqueados = np.zeros(m, dtype=np.int64)
+    filas = np.arange(m)
+    for j in range(num_rasgos):
+        rasgo = orden[:, j]
+        bit = np.left_shift(np.int64(1), rasgo)
+        valido = (elegibles[especies, rasgo]
+                  & ((bloqueados & bit) == 0)
+                  & (elegidos < cantidad))
+        resultado[filas[valido], elegidos[valido]] = rasgo[valido]
+        bloqueados[valido] |= bit[valido] | exclusiones[rasgo[valido]]
+        elegidos += valido
+    return resultado
+
+
+class LoteSistemas:
+    """Resultado columnar de una generación en bloque
+
+    Cada campo del sistema se guarda como un array con una fila por sistema y
+    códigos enteros en lugar de textos (-1 indica ausencia). Las filas pueden
+    convertirse de vuelta al diccionario de generar_sistema_completo.
+    """
+
+    def __init__(self, catalogo, columnas):
+        self.catalogo = catalogo
+        self.columnas = columnas
+        for nombre, columna in columnas.items():
+            setattr(self, nombre, columna)
+
+    def __len__(self):
+        return len(self.tipo)
+
+    def __iter__(self):
+        return iter(self.a_dicts())
+
+    def sistema(self, indice):
+        """Devuelve el sistema de la fila indicada con el formato habitual"""
+        return self.a_dicts(indice, indice + 1)[0]
+
+    def a_dicts(self, inicio=0, fin=None):
+        """Convierte un rango de filas al formato de diccionario de generar_sistema_completo"""
+        fin = len(self) if fin is None else fin
+        cat = self.catalogo
+        cols = {nombre: columna[inicio:fin].tolist() for nombre, columna in self.columnas.items()}
+        sistemas = []
+
+        for i in range(fin - inicio):
+            estrellas = [cat['estrellas'][e] for e in cols['estrellas'][i] if e >= 0]
+            habitable = cols['habitable'][i]
+            generar_cuerpos = cols['generar_cuerpos'][i]
+            resultado = {
+                'tipo_sistema': cat['tipos_sistema'][cols['tipo'][i]],
+                'estrellas': estrellas,
+                'habitabilidad': "Habitable" if habitable else "Inhabitable",
+                'generar_cuerpos': generar_cuerpos
+            }
+
+            cuerpos_por_estrella = {}
+            if generar_cuerpos:
+                for j, estrella in enumerate(estrellas):
+                    cuerpos_por_estrella[estrella] = {
+                        'planetas': cols['planetas'][i][j],
+                        'lunas': cols['lunas'][i][j]
+                    }
+            resultado.update({
+                'cuerpos_por_estrella': cuerpos_por_estrella,
+                'asteroides': cols['asteroides'][i],
+                'total_planetas': cols['total_planetas'][i],
+                'total_lunas': cols['total_lunas'][i]
+            })
+
+            if not habitable and generar_cuerpos:
+                tipos_inhabitables = []
+                lunas_gaseoso = []
+                for j, tipo in enumerate(cols['inhabitables'][i]):
+                    if tipo < 0:
+                        break
+                    tipos_inhabitables.append(cat['inhabitables'][tipo])
+                    for k in range(cols['lunas_gaseoso'][i][j]):
+                        lunas_gaseoso.append(f"Moon {j + 1}{chr(97 + k)}")
+                resultado.update({
+                    'tipos_planetas_inhabitables': tipos_inhabitables,
+                    'lunas_planeta_gaseoso': lunas_gaseoso
+                })
+
+            recurso = cols['recurso'][i]
+            if recurso >= 0:
+                depositos = {'tiene_depositos': True, 'recurso': cat['recursos'][recurso],
+                             'mensaje': MENSAJE_CON_DEPOSITOS}
+            else:
+                depositos = {'tiene_depositos': False, 'recurso': None, 'mensaje': MENSAJE_SIN_DEPOSITOS}
+
+            evento = cols['evento'][i]
+            if evento >= 0:
+                evento_especial = {'tiene_evento': True, 'tipo_evento': cat['eventos'][evento]}
+            else:
+                evento_especial = {'tiene_evento': False, 'tipo_evento': None}
+
+            tipos_planetas = []
+            for j in range(cols['planetas_habitables'][i]):
+                categoria = cat['categorias_planetas'][cols['categoria_planeta'][i][j]]
+                tipos_planetas.append({
+                    'categoria': categoria,
+                    'tipo': cat['planetas_por_categoria'][cols['categoria_planeta'][i][j]][cols['tipo_planeta'][i][j]]
+                })
+
+            megaestructura = cols['megaestructura'][i]
+            if megaestructura >= 0:
+                sondeo = {'sondeo_exitoso': True, 'megaestructura': cat['megaestructuras'][megaestructura],
+                          'mensaje': "Sondeo exitoso"}
+            else:
+                sondeo = {'sondeo_exitoso': False, 'megaestructura': None, 'mensaje': "Sondeo no exitoso"}
+
+            leviatan = cols['leviatan'][i]
+            if leviatan >= 0:
+                leviatanes = {'tiene_leviatanes': True, 'leviatan': cat['leviatanes'][leviatan]}
+            else:
+                leviatanes = {'tiene_leviatanes': False, 'leviatan': None}
+
+            especie = cols['especie'][i]
+            if especie >= 0:
+                especies = {
+                    'tiene_especies': True,
+                    'tipo_especie': cat['especies'][especie],
+                    'nivel_tecnologico': cat['niveles_tecnologicos'][cols['nivel_tecnologico'][i]],
+                    'rasgos_positivos': [cat['rasgos_positivos'][r] for r in cols['rasgos_positivos'][i] if r >= 0],
+                    'rasgos_negativos': [cat['rasgos_negativos'][r] for r in cols['rasgos_negativos'][i] if r >= 0]
+                }
+            else:
+                especies = {
+                    'tiene_especies': False,
+                    'tipo_especie': None,
+                    'nivel_tecnologico': None,
+                    'rasgos_positivos': [],
+                    'rasgos_negativos': []
+                }
+
+            resultado.update({
+                'depositos': depositos,
+                'evento_especial': evento_especial,
+                'planetas_habitables': cols['planetas_habitables'][i],
+                'tipos_planetas': tipos_planetas,
+                'sondeo': sondeo,
+                'leviatanes': leviatanes,
+                'especies': especies
+            })
+            sistemas.append(resultado)
+
+        return sistemas
+
+
+class BatchGenerator:
+    """Genera lotes de sistemas con la misma distribución que SolarSystemGenerator"""
+
+    def __init__(self, ruleset):
+        self.ruleset = ruleset
+        estrellas = ruleset.estrellas
+
+        # Propiedades por tipo de estrella; la posición extra cubre el relleno -1
+        self._peligrosa = np.array([e in ruleset.estrellas_peligrosas for e in estrellas] + [False])
+        self._habitable = np.array([e in ruleset.estrellas_habitables for e in estrellas] + [False])
+        self._sin_cuerpos = np.array([e in ruleset.estrellas_sin_cuerpos for e in estrellas] + [False])
+        self._num_estrellas = np.array([NUM_ESTRELLAS_POR_TIPO[t] for t in ruleset.tipos_sistema])
+
+        recursos = ruleset.sampler_recursos.opciones + ruleset.recursos_agujero_negro
+        self._agujero_negro = estrellas.index('Agujero Negro') if 'Agujero Negro' in estrellas else -2
+        self._recurso_agujero_negro = recursos.index(ruleset.recursos_agujero_negro[0])
+
+        categorias = ruleset.sampler_categorias_planetas.opciones
+        planetas_por_categoria = tuple(ruleset.planetas_por_categoria[c] for c in categorias)
+        self._planetas_por_categoria = np.array([len(planetas) for planetas in planetas_por_categoria])
+        inhabitables = ruleset.tipos_planetas_inhabitables
+        self._gaseoso = inhabitables.index("Planeta Gaseoso") if "Planeta Gaseoso" in inhabitables else -2
+
+        self._indice_megaestructura = {m: i for i, m in enumerate(ruleset.megaestructuras)}
+        self._indice_leviatan = {l: i for i, l in enumerate(ruleset.leviatanes)}
+
+        self._elegibles_positivos, self._exclusiones_positivos = _tablas_rasgos(
+            ruleset.sampler_rasgos_positivos, ruleset.tipos_especies
+        )
+        self._elegibles_negativos, self._exclusiones_negativos = _tablas_rasgos(
+            ruleset.sampler_rasgos_negativos, ruleset.tipos_especies
+        )
+
+        self.catalogo = {
+            'tipos_sistema': ruleset.tipos_sistema,
+            'estrellas': estrellas,
+            'recursos': recursos,
+            'eventos': ruleset.eventos,
+            'categorias_planetas': categorias,
+            'planetas_por_categoria': planetas_por_categoria,
+            'inhabitables': inhabitables,
+            'megaestructuras': ruleset.megaestructuras,
+            'leviatanes': ruleset.leviatanes,
+            'especies': ruleset.tipos_especies,
+            'niveles_tecnologicos': ruleset.niveles_tecnologicos,
+            'rasgos_positivos': ruleset.sampler_rasgos_positivos.rasgos,
+            'rasgos_negativos': ruleset.sampler_rasgos_negativos.rasgos
+        }
+
+    def _por_conjunto_estrellas(self, estrellas, filas):
+        """Agrupa filas por su conjunto de estrellas; devuelve {máscara: filas}"""
+        bits = np.where(estrellas[filas] >= 0, np.left_shift(1, np.maximum(estrellas[filas], 0)), 0)
+        mascaras = np.bitwise_or.reduce(bits, axis=1)
+        return {mascara: filas[mascaras == mascara] for mascara in np.unique(mascaras).tolist()}
+
+    def generar(self, cantidad, semilla=None):
+        """Genera 'cantidad' sistemas y devuelve un LoteSistemas
+
+        Con semilla el lote es reproducible, pero los sistemas no coinciden con
+        los del generador escalar con la misma semilla.
+        """
+        rng = np.random.default_rng(semilla)
+        rs = self.ruleset
+        n = cantidad
+
+        # Tipo de sistema y estrellas
+        tipo = _muestrear_alias(rng, rs.sampler_tipo_sistema, n)
+        num_estrellas = self._num_estrellas[tipo]
+        estrellas = _muestrear_alias(rng, rs.sampler_estrellas, (n, MAX_ESTRELLAS))
+        posiciones = np.arange(MAX_ESTRELLAS)
+        activa = posiciones[None, :] < num_estrellas[:, None]
+        estrellas = np.where(activa, estrellas, -1)
+
+        habitable = ~self._peligrosa[estrellas].any(axis=1) & self._habitable[estrellas].any(axis=1)
+        generar_cuerpos = ~self._sin_cuerpos[estrellas].any(axis=1)
+
+        # Cuerpos celestes repartidos por estrella
+        restantes_planetas = rng.integers(rs.rango_planetas[0], rs.rango_planetas[1] + 1, size=n)
+        restantes_lunas = rng.integers(rs.rango_lunas[0], rs.rango_lunas[1] + 1, size=n)
+        asteroides = rng.integers(rs.rango_asteroides[0], rs.rango_asteroides[1] + 1, size=n)
+        planetas = np.zeros((n, MAX_ESTRELLAS), dtype=np.int64)
+        lunas = np.zeros((n, MAX_ESTRELLAS), dtype=np.int64)
+        for j in range(MAX_ESTRELLAS):
+            ultima = num_estrellas - 1 == j
+            intermedia = j < num_estrellas - 1
+            tope_planetas = np.maximum(1, restantes_planetas // num_estrellas + 2)
+            tope_lunas = np.maximum(1, restantes_lunas // num_estrellas + 5)
+            p = rng.integers(0, tope_planetas + 1)
+            l = rng.integers(0, tope_lunas + 1)
+            p = np.where(ultima, restantes_planetas, np.where(intermedia, p, 0))
+            l = np.where(ultima, restantes_lunas, np.where(intermedia, l, 0))
+            restantes_planetas = np.where(intermedia, restantes_planetas - p, restantes_planetas)
+            restantes_lunas = np.where(intermedia, restantes_lunas - l, restantes_lunas)
+            planetas[:, j] = np.maximum(0, p)
+            lunas[:, j] = np.maximum(0, l)
+        planetas[~generar_cuerpos] = 0
+        lunas[~generar_cuerpos] = 0
+        asteroides = np.where(generar_cuerpos, asteroides, 0)
+
+        # Con estrellas repetidas el diccionario por estrella conserva solo la última aparición
+        ultima_aparicion = activa.copy()
+        for j in range(MAX_ESTRELLAS - 1):
+            for k in range(j + 1, MAX_ESTRELLAS):
+                ultima_aparicion[:, j] &= ~(activa[:, k] & (estrellas[:, k] == estrellas[:, j]))
+        total_planetas = (planetas * ultima_aparicion).sum(axis=1)
+        total_lunas = (lunas * ultima_aparicion).sum(axis=1)
+
+        # Depósitos de recursos
+        tiene_depositos = _porcentaje(rng, rs.prob_depositos, n)
+        recurso_normal = _muestrear_alias(rng, rs.sampler_recursos, n)
+        con_agujero_negro = (estrellas == self._agujero_negro).any(axis=1)
+        recurso = np.where(con_agujero_negro, self._recurso_agujero_negro, recurso_normal)
+        recurso = np.where(tiene_depositos, recurso, -1)
+
+        # Evento especial
+        tiene_evento = _porcentaje(rng, rs.prob_evento, n)
+        evento = np.where(tiene_evento, rng.integers(0, len(rs.eventos), size=n), -1)
+
+        # Planetas habitables
+        min_habitables, max_habitables = rs.rango_planetas_habitables
+        planetas_habitables = np.where(
+            habitable, rng.integers(min_habitables, max_habitables + 1, size=n), 0
+        )
+        categoria_planeta = _muestrear_alias(rng, rs.sampler_categorias_planetas, (n, max_habitables))
+        tipo_planeta = rng.integers(0, self._planetas_por_categoria[categoria_planeta])
+
+        # Planetas de sistemas inhabitables (máximo rs.planetas_inhabitables_max)
+        max_inhabitables = rs.planetas_inhabitables_max
+        con_inhabitables = ~habitable & generar_cuerpos
+        num_inhabitables = np.where(con_inhabitables, np.minimum(total_planetas, max_inhabitables), 0)
+        inhabitables = rng.integers(0, len(rs.tipos_planetas_inhabitables), size=(n, max_inhabitables))
+        inhabitables = np.where(np.arange(max_inhabitables)[None, :] < num_inhabitables[:, None],
+                                inhabitables, -1)
+        lunas_gaseoso = rng.integers(rs.rango_lunas_gaseoso[0], rs.rango_lunas_gaseoso[1] + 1,
+                                     size=(n, max_inhabitables))
+        lunas_gaseoso = np.where(inhabitables == self._gaseoso, lunas_gaseoso, 0)
+
+        # Sondeo y megaestructuras, agrupando por conjunto de estrellas
+        megaestructura = np.full(n, -1, dtype=np.int64)
+        filas_sondeo = np.flatnonzero(_porcentaje(rng, rs.prob_sondeo, n))
+        for mascara, filas in self._por_conjunto_estrellas(estrellas, filas_sondeo).items():
+            sampler = rs.megaestructuras_por_mascara[mascara]
+            if sampler is None:
+                sampler = AliasSampler(rs.megaestructuras_genericas, [1] * len(rs.megaestructuras_genericas))
+            codigos = np.array([self._indice_megaestructura[m] for m in sampler.opciones])
+            megaestructura[filas] = codigos[_muestrear_alias(rng, sampler, len(filas))]
+
+        # Leviatanes, agrupando por conjunto de estrellas
+        leviatan = np.full(n, -1, dtype=np.int64)
+        filas_leviatan = np.flatnonzero(_porcentaje(rng, rs.prob_leviatanes, n))
+        for mascara, filas in self._por_conjunto_estrellas(estrellas, filas_leviatan).items():
+            disponibles = rs.leviatanes_por_mascara[mascara]
+            if disponibles:
+                codigos = np.array([self._indice_leviatan[l] for l in disponibles])
+                leviatan[filas] = codigos[rng.integers(0, len(disponibles), size=len(filas))]
+
+        # Especies (solo en sistemas habitables)
+        especie = np.full(n, -1, dtype=np.int64)
+        nivel_tecnologico = np.full(n, -1, dtype=np.int64)
+        filas_especies = np.flatnonzero(habitable & _porcentaje(rng, rs.prob_especies, n))
+        especie[filas_especies] = rng.integers(0, len(rs.tipos_especies), size=len(filas_especies))
+        nivel_tecnologico[filas_especies] = rng.integers(0, len(rs.niveles_tecnologicos), size=len(filas_especies))
+        rasgos_positivos = np.full((n, 3), -1, dtype=np.int8)
+        rasgos_negativos = np.full((n, 2), -1, dtype=np.int8)
+        rasgos_positivos[filas_especies] = _muestrear_rasgos(
+            rng, especie[filas_especies], self._elegibles_positivos, self._exclusiones_positivos, 3
+        )
+        rasgos_negativos[filas_especies] = _muestrear_rasgos(
+            rng, especie[filas_especies], self._elegibles_negativos, self._exclusiones_negativos, 2
+        )
+
+        return LoteSistemas(self.catalogo, {
+            'tipo': tipo.astype(np.int8),
+            'estrellas': estrellas.astype(np.int8),
+            'habitable': habitable,
+            'generar_cuerpos': generar_cuerpos,
+            'planetas': planetas.astype(np.int16),
+            'lunas': lunas.astype(np.int16),
+            'asteroides': asteroides.astype(np.int8),
+            'total_planetas': total_planetas.astype(np.int16),
+            'total_lunas': total_lunas.astype(np.int16),
+            'recurso': recurso.astype(np.int8),
+            'evento': evento.astype(np.int8),
+            'planetas_habitables': planetas_habitables.astype(np.int8),
+            'categoria_planeta': categoria_planeta.astype(np.int8),
+            'tipo_planeta': tipo_planeta.astype(np.int16),
+            'inhabitables': inhabitables.astype(np.int8),
+            'lunas_gaseoso': lunas_gaseoso.astype(np.int8),
+            'megaestructura': megaestructura.astype(np.int8),
+            'leviatan': leviatan.astype(np.int8),
+            'especie': especie.astype(np.int8),
+            'nivel_tecnologico': nivel_tecnologico.astype(np.int8),
+            'rasgos_positivos': rasgos_positivos,
+            'rasgos_negativos': rasgos_negativos
+        })
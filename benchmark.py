@@ -0,0 +1,345 @@
+"""
+Benchmark del generador: rendimiento por etapa, memoria y frecuencias observadas
+
+Uso:
+    python benchmark.py -n 20000                 # medir y comparar con la línea base
+    python benchmark.py -n 20000 --guardar       # medir y guardar como nueva línea base
+
+Sale con código 1 si los sistemas por segundo caen más que el umbral
+respecto a la línea base guardada.
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime
+from solar_system_generator import SolarSystemGenerator, derivar_semilla
+
+BASELINE_POR_DEFECTO = 'benchmark_baseline.json'
+UMBRAL_POR_DEFECTO = 0.2  # caída máxima tolerada (20%)
+MUESTRA_MEMORIA = 2000
+REPETICIONES = 3
+
+# Etapas cuyo rendimiento se mide en sistemas completos por segundo
+ETAPAS_SISTEMA = ('sistema_completo', 'sistema_completo_semilla', 'lote')
+
+
+def _preparar_entradas(generator, cantidad, semilla):
+    """Genera las entradas de cada etapa antes de medir, para no cronometrarlas"""
+    rng = random.Random(derivar_semilla(semilla, 'entradas'))
+    tipos = [generator.generar_tipo_sistema(rng) for _ in range(cantidad)]
+    estrellas = [generator.generar_estrellas_sistema(tipo, rng) for tipo in tipos]
+    con_cuerpos = [e for e in estrellas if generator.puede_generar_cuerpos(e)] or estrellas
+    especies = generator.ruleset.tipos_especies
+    return {
+        'tipos': tipos,
+        'estrellas': estrellas,
+        'con_cuerpos': con_cuerpos,
+        'especies': [especies[i % len(especies)] for i in range(cantidad)],
+        'num_planetas': [rng.randint(1, 30) for _ in range(cantidad)]
+    }
+
+
+def etapas_generador(generator, entradas, semilla):
+    """Devuelve ({nombre: función(rng, i)}, número de llamadas) con las etapas a medir"""
+    e = entradas
+    g = generator
+    n = len(e['tipos'])
+    nc = len(e['con_cuerpos'])
+    return {
+        'tipo_sistema': lambda rng, i: g.generar_tipo_sistema(rng),
+        'estrellas_sistema': lambda rng, i: g.generar_estrellas_sistema(e['tipos'][i], rng),
+        'habitabilidad': lambda rng, i: g.determinar_habitabilidad(e['estrellas'][i]),
+        'cuerpos_celestes': lambda rng, i: g.generar_cuerpos_celestes(e['con_cuerpos'][i % nc], rng),
+        'depositos_recursos': lambda rng, i: g.generar_depositos_recursos(e['estrellas'][i], rng),
+        'evento_especial': lambda rng, i: g.generar_evento_especial(rng),
+        'planetas_habitables': lambda rng, i: g.generar_planetas_habitables("Habitable", rng),
+        'tipos_planetas': lambda rng, i: g.generar_tipos_planetas(3, rng),
+        'sondeo': lambda rng, i: g.generar_sondeo(e['estrellas'][i], rng),
+        'megaestructura': lambda rng, i: g.generar_megaestructura(e['estrellas'][i], rng),
+        'leviatanes': lambda rng, i: g.generar_leviatanes(e['estrellas'][i], rng),
+        'especies': lambda rng, i: g.generar_especies("Habitable", rng),
+        'rasgos_positivos': lambda rng, i: g.generar_rasgos_positivos(e['especies'][i], rng),
+        'rasgos_negativos': lambda rng, i: g.generar_rasgos_negativos(e['especies'][i], rng),
+        'planetas_inhabitables': lambda rng, i: g.generar_tipos_planetas_inhabitables(
+            "Inhabitable", e['num_planetas'][i], rng
+        ),
+        'sistema_completo': lambda rng, i: g.generar_sistema_completo(),
+        'sistema_completo_semilla': lambda rng, i: g.generar_sistema_completo(semilla=semilla + i),
+        'sistema_perezoso': lambda rng, i: g.generar_sistema(semilla=semilla + i),
+    }, n
+
+
+def medir_tiempo(funcion, cantidad, semilla, repeticiones=REPETICIONES):
+    """Ejecuta la función 'cantidad' veces y devuelve los segundos de la repetición más rápida
+
+    Quedarse con el mínimo filtra el ruido de otros procesos de la máquina.
+    """
+    mejor = None
+    for _ in range(repeticiones):
+        rng = random.Random(semilla)
+        inicio = time.perf_counter()
+        for i in range(cantidad):
+            funcion(rng, i)
+        segundos = time.perf_counter() - inicio
+        mejor = segundos if mejor is None else min(mejor, segundos)
+    return mejor
+
+
+def medir_memoria(funcion, llamadas, semilla, ops_por_llamada=1):
+    """Mide con tracemalloc la memoria retenida por operación, los bloques y el pico
+
+    Los resultados se conservan hasta el final para que cuente lo que cada
+    operación deja reservado, no solo lo que libera enseguida.
+    """
+    rng = random.Random(semilla)
+    resultados = [None] * llamadas
+    tracemalloc.clear_traces()
+    tracemalloc.reset_peak()
+    for i in range(llamadas):
+        resultados[i] = funcion(rng, i)
+    actual, pico = tracemalloc.get_traced_memory()
+    bloques = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    del resultados
+    ops = llamadas * ops_por_llamada
+    return {
+        'bytes_por_op': round(actual / ops, 1),
+        'bloques_por_op': round(bloques / ops, 2),
+        'pico_kb': round(pico / 1024, 1)
+    }
+
+
+def _resultado_etapa(segundos, cantidad):
+    return {
+        'segundos': round(segundos, 4),
+        'ops_por_segundo': round(cantidad / segundos, 1) if segundos else None,
+        'us_por_op': round(segundos / cantidad * 1e6, 3)
+    }
+
+
+def medir_etapas(generator, cantidad, semilla, memoria=True, repeticiones=REPETICIONES):
+    """Mide todas las etapas del generador escalar (y el motor en bloque si hay numpy)"""
+    entradas = _preparar_entradas(generator, cantidad, semilla)
+    etapas, n = etapas_generador(generator, entradas, semilla)
+    resultados = {}
+
+    for nombre, funcion in etapas.items():
+        resultados[nombre] = _resultado_etapa(medir_tiempo(funcion, n, semilla, repeticiones), n)
+
+    try:
+        lote = generator.generar_lote(cantidad, semilla)
+        t_lote = medir_tiempo(lambda rng, i: generator.generar_lote(cantidad, semilla), 1, semilla, repeticiones)
+        t_dicts = medir_tiempo(lambda rng, i: lote.a_dicts(), 1, semilla, repeticiones)
+        resultados['lote'] = _resultado_etapa(t_lote, cantidad)
+        resultados['lote_a_dicts'] = _resultado_etapa(t_dicts, cantidad)
+    except ImportError:
+        logging.info("numpy no está instalado: se omite el motor en bloque")
+
+    if memoria:
+        muestra = min(n, MUESTRA_MEMORIA)
+        tracemalloc.start()
+        try:
+            for nombre, funcion in etapas.items():
+                resultados[nombre].update(medir_memoria(funcion, muestra, semilla))
+            if 'lote' in resultados:
+                resultados['lote'].update(medir_memoria(
+                    lambda rng, i: generator.generar_lote(muestra, semilla), 1, semilla, ops_por_llamada=muestra
+                ))
+        finally:
+            tracemalloc.stop()
+
+    return resultados
+
+
+def tablas_frecuencia(generator, cantidad, semilla):
+    """Compara las frecuencias observadas en 'cantidad' sistemas con las probabilidades de config
+
+    Devuelve {tabla: {'n': muestras, 'filas': {opción: (observados, probabilidad esperada)}}}.
+    """
+    ruleset = generator.ruleset
+    tablas = {}
+
+    def tabla(nombre, contador, esperadas, n):
+        tablas[nombre] = {
+            'n': n,
+            'filas': {opcion: (contador.get(opcion, 0), p) for opcion, p in esperadas.items()}
+        }
+
+    def desde_sampler(sampler):
+        return {o: sampler.probabilidad(i) for i, o in enumerate(sampler.opciones)}
+
+    def presencia(p):
+        return {True: p / 100, False: 1 - p / 100}
+
+    tipos = Counter()
+    estrellas = Counter()
+    depositos = Counter()
+    recursos = Counter()
+    eventos = Counter()
+    tipos_evento = Counter()
+    sondeos = Counter()
+    leviatanes = Counter()
+    especies = Counter()
+    niveles = Counter()
+    categorias = Counter()
+    n_leviatanes = n_especies = 0
+
+    for i in range(cantidad):
+        sistema = generator.generar_sistema_completo(semilla=derivar_semilla(semilla, 'frecuencias', i))
+        tipos[sistema['tipo_sistema']] += 1
+        estrellas.update(sistema['estrellas'])
+        depositos[sistema['depositos']['tiene_depositos']] += 1
+        if sistema['depositos']['tiene_depositos'] and 'Agujero Negro' not in sistema['estrellas']:
+            recursos[sistema['depositos']['recurso']] += 1
+        eventos[sistema['evento_especial']['tiene_evento']] += 1
+        if sistema['evento_especial']['tiene_evento']:
+            tipos_evento[sistema['evento_especial']['tipo_evento']] += 1
+        sondeos[sistema['sondeo']['sondeo_exitoso']] += 1
+        # La probabilidad de leviatanes solo se aplica si hay alguno disponible
+        if ruleset.elegibles(sistema['estrellas'])[1]:
+            leviatanes[sistema['leviatanes']['tiene_leviatanes']] += 1
+            n_leviatanes += 1
+        if sistema['habitabilidad'] == "Habitable":
+            especies[sistema['especies']['tiene_especies']] += 1
+            n_especies += 1
+            if sistema['especies']['tiene_especies']:
+                niveles[sistema['especies']['nivel_tecnologico']] += 1
+        categorias.update(planeta['categoria'] for planeta in sistema['tipos_planetas'])
+
+    uniforme = lambda opciones: {o: 1 / len(opciones) for o in opciones}
+    tabla('tipo_sistema', tipos, desde_sampler(ruleset.sampler_tipo_sistema), cantidad)
+    tabla('estrellas', estrellas, desde_sampler(ruleset.sampler_estrellas), sum(estrellas.values()))
+    tabla('tiene_depositos', depositos, presencia(ruleset.prob_depositos), cantidad)
+    tabla('recurso', recursos, desde_sampler(ruleset.sampler_recursos), sum(recursos.values()))
+    tabla('tiene_evento', eventos, presencia(ruleset.prob_evento), cantidad)
+    tabla('tipo_evento', tipos_evento, uniforme(ruleset.eventos), sum(tipos_evento.values()))
+    tabla('sondeo_exitoso', sondeos, presencia(ruleset.prob_sondeo), cantidad)
+    tabla('tiene_leviatanes', leviatanes, presencia(ruleset.prob_leviatanes), n_leviatanes)
+    tabla('tiene_especies', especies, presencia(ruleset.prob_especies), n_especies)
+    tabla('nivel_tecnologico', niveles, uniforme(ruleset.niveles_tecnologicos), sum(niveles.values()))
+    tabla('categoria_planeta', categorias, desde_sampler(ruleset.sampler_categorias_planetas),
+          sum(categorias.values()))
+    return tablas
+
+
+def _desviacion(observados, p, n):
+    """Desviación en sigmas de la frecuencia observada respecto a la binomial esperada"""
+    if n == 0 or p in (0, 1):
+        return 0.0
+    return (observados - n * p) / math.sqrt(n * p * (1 - p))
+
+
+def imprimir_etapas(resultados, baseline=None):
+    referencia = (baseline or {}).get('etapas', {})
+    print(f"\n{'Etapa':<28}{'ops/s':>14}{'µs/op':>10}{'B/op':>10}{'bloq/op':>9}{'pico KB':>10}{'vs base':>9}")
+    for nombre, r in resultados.items():
+        base = referencia.get(nombre, {}).get('ops_por_segundo')
+        cambio = f"{(r['ops_por_segundo'] / base - 1) * 100:+.1f}%" if base and r['ops_por_segundo'] else ''
+        print(
+            f"{nombre:<28}{r['ops_por_segundo'] or 0:>14,.0f}{r['us_por_op']:>10.2f}"
+            f"{r.get('bytes_por_op', ''):>10}{r.get('bloques_por_op', ''):>9}{r.get('pico_kb', ''):>10}{cambio:>9}"
+        )
+
+
+def imprimir_frecuencias(tablas):
+    for nombre, t in tablas.items():
+        print(f"\n{nombre} (n={t['n']})")
+        for opcion, (observados, p) in t['filas'].items():
+            observada = observados / t['n'] if t['n'] else 0.0
+            z = _desviacion(observados, p, t['n'])
+            aviso = '  <-- revisar' if abs(z) > 4 else ''
+            print(f"  {str(opcion):<38}{observada * 100:>9.3f}%{p * 100:>9.3f}%{z:>+8.2f}σ{aviso}")
+
+
+def comparar(resultados, baseline, umbral):
+    """Devuelve las etapas de sistema completo cuyo rendimiento cae más que 'umbral'"""
+    regresiones = []
+    for nombre in ETAPAS_SISTEMA:
+        actual = resultados.get(nombre, {}).get('ops_por_segundo')
+        base = baseline.get('etapas', {}).get(nombre, {}).get('ops_por_segundo')
+        if actual and base and actual < base * (1 - umbral):
+            regresiones.append((nombre, base, actual))
+    return regresiones
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del generador de sistemas solares")
+    parser.add_argument('-n', '--cantidad', type=int, default=20000, help="sistemas por etapa")
+    parser.add_argument('--semilla', type=int, default=1)
+    parser.add_argument('--baseline', default=BASELINE_POR_DEFECTO, help="archivo JSON de línea base")
+    parser.add_argument('--guardar', action='store_true', help="guardar los resultados como línea base")
+    parser.add_argument('--umbral', type=float, default=UMBRAL_POR_DEFECTO,
+                        help="caída de sistemas/s tolerada antes de fallar (0.2 = 20%%)")
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES,
+                        help="repeticiones por etapa; se usa la más rápida")
+    parser.add_argument('--sin-memoria', action='store_true', help="no medir memoria con tracemalloc")
+    parser.add_argument('--sin-frecuencias', action='store_true', help="no calcular tablas de frecuencia")
+    args = parser.parse_args(argv)
+
+    if args.cantidad <= 0:
+        parser.error("--cantidad debe ser mayor que cero")
+    if args.repeticiones <= 0:
+        parser.error("--repeticiones debe ser mayor que cero")
+
+    generator = SolarSystemGenerator()
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print(f"Benchmark: {args.cantidad} sistemas por etapa, reglas v{generator.ruleset_version}, "
+          f"Python {platform.python_version()}")
+    resultados = medir_etapas(generator, args.cantidad, args.semilla, memoria=not args.sin_memoria,
+                              repeticiones=args.repeticiones)
+    imprimir_etapas(resultados, baseline)
+
+    tablas = None
+    if not args.sin_frecuencias:
+        tablas = tablas_frecuencia(generator, args.cantidad, args.semilla)
+        print(f"\n{'Frecuencias':<40}{'observada':>10}{'config':>10}{'desv.':>9}")
+        imprimir_frecuencias(tablas)
+
+    informe = {
+        'fecha': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'maquina': platform.machine(),
+        'ruleset_version': generator.ruleset_version,
+        'cantidad': args.cantidad,
+        'semilla': args.semilla,
+        'etapas': resultados
+    }
+    if tablas is not None:
+        informe['frecuencias'] = {
+            nombre: {'n': t['n'], 'filas': {str(o): list(v) for o, v in t['filas'].items()}}
+            for nombre, t in tablas.items()
+        }
+
+    if args.guardar:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(informe, f, ensure_ascii=False, indent=2)
+        print(f"\nLínea base guardada en {args.baseline}")
+        return 0
+
+    if baseline is None:
+        print(f"\nNo hay línea base en {args.baseline}; usa --guardar para crearla")
+        return 0
+
+    regresiones = comparar(resultados, baseline, args.umbral)
+    for nombre, base, actual in regresiones:
+        print(f"REGRESIÓN {nombre}: {actual:,.0f} sistemas/s frente a {base:,.0f} en la línea base")
+    if regresiones:
+        return 1
+    print(f"\nSin regresiones respecto a {args.baseline} (umbral {args.umbral:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
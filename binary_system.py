@@ -0,0 +1,392 @@
+"""
+Codificación binaria de los sistemas guardados en la base de datos
+
+Un SistemaCompacto se guarda como una secuencia de enteros en varint: los
+textos (estrellas, recursos, planetas, megaestructuras, leviatanes, rasgos...)
+como códigos de un libro de códigos fijado por versión de reglas, y los
+bloques vacíos (sin depósitos, sin sondeo, sin especies) como un bit. Los
+campos deducibles (totales, 'tiene_*', mensajes) ya no se guardan en el
+registro compacto, así que tampoco llegan al disco.
+
+En JSON el registro se escribe en base64 en lugar del diccionario del sistema.
+Al leerlo se obtiene el mismo SistemaCompacto, que se decodifica exactamente
+al diccionario original.
+
+Los libros de códigos no cambian nunca una vez publicados: si una versión de
+reglas añade valores, se crea un libro nuevo para esa versión. Un valor que no
+esté en el libro se guarda como texto, así que cualquier sistema se puede
+codificar aunque su libro esté incompleto.
+"""
+
+import base64
+import json
+import sys
+from collections.abc import Mapping
+from compact_system import (
+    CATEGORIAS, ESPECIES, ESTRELLAS, EVENTOS, HABITABILIDAD, LEVIATANES, MEGAESTRUCTURAS, NIVELES, PLANETAS,
+    RASGOS, RECURSOS, TIPOS_SISTEMA, SistemaCompacto, compactar
+)
+
+FORMATO = 1
+
+# Códigos de un valor de texto: 0 es None, 1 precede a un texto literal y el resto son posiciones del libro
+_NINGUNO = 0
+_LITERAL = 1
+_PRIMER_CODIGO = 2
+
+# Bits de la cabecera del sistema
+_CUERPOS = 1
+_INHABITABLES = 2
+_ESPECIES = 4
+
+
+class LibroCodigos:
+    """Valores de texto de una versión de reglas, en un orden fijo"""
+
+    def __init__(self, version, **tablas):
+        self.version = version
+        self.tablas = tablas
+        self._indices = {
+            categoria: {valor: i + _PRIMER_CODIGO for i, valor in enumerate(valores)}
+            for categoria, valores in tablas.items()
+        }
+
+    def faltantes(self, ruleset):
+        """Valores del ruleset que este libro no tiene (se guardarían como texto literal)"""
+        valores = {
+            'tipo_sistema': ruleset.tipos_sistema,
+            'estrella': ruleset.estrellas,
+            'recurso': ruleset.sampler_recursos.opciones + ruleset.recursos_agujero_negro,
+            'evento': ruleset.eventos,
+            'categoria_planeta': ruleset.sampler_categorias_planetas.opciones,
+            'planeta': ruleset.tipos_planetas_inhabitables + sum(ruleset.planetas_por_categoria.values(), ()),
+            'megaestructura': ruleset.megaestructuras,
+            'leviatan': ruleset.leviatanes,
+            'especie': ruleset.tipos_especies,
+            'nivel_tecnologico': ruleset.niveles_tecnologicos,
+            'rasgo': ruleset.sampler_rasgos_positivos.rasgos + ruleset.sampler_rasgos_negativos.rasgos
+        }
+        return {
+            categoria: [valor for valor in lista if valor not in self._indices[categoria]]
+            for categoria, lista in valores.items()
+            if any(valor not in self._indices[categoria] for valor in lista)
+        }
+
+
+LIBROS = {
+    1: LibroCodigos(
+        1,
+        tipo_sistema=(
+            'Unario', 'Binario', 'Trinario',
+        ),
+        estrella=(
+            'Estrella Clase M', 'Tipo T', 'Tipo K', 'Tipo G', 'Tipo F', 'Tipo A', 'Gigante Roja', 'Pulsar',
+            'Estrella de Neutrones', 'Agujero Negro', 'Magnetar', 'Estrella Extraña', 'Tipo O',
+        ),
+        habitabilidad=(
+            'Habitable', 'Inhabitable',
+        ),
+        recurso=(
+            'Gases Exóticos', 'Cristales Raros', 'Polvo Zro', 'Motas Volátiles', 'Metal Vivo', 'Nanitos',
+            'Materia Oscura',
+        ),
+        evento=(
+            'Yacimiento Arqueológico', 'Anomalía',
+        ),
+        categoria_planeta=(
+            'Helados', 'Secos', 'Humedos', 'Otros', 'Exoticos',
+        ),
+        planeta=(
+            'Planeta Gaseoso', 'Mundo Fragmentado', 'Mundo toxico', 'Mundo Volcanico', 'Mundo congelado',
+            'Mundo yermo', 'Mundo frio', 'tundra', 'alpino', 'ártico', 'Tormentoso', 'Icebergs', 'Glacial',
+            'Antártico', 'Eólico', 'Desertico Frio', 'Dunas de Hielo', 'Grietas', 'Púas de Hielo', 'Crioflora',
+            'Líquenes', 'Pantanos', 'Micelio', 'Barro', 'Basalto', 'Tuya', 'Criovolcánico', 'Treelines',
+            'Glaciovolcánico', 'Lantánidos', 'Borealis', 'Nevado', 'Mundo de las Alturas', 'Bosques de Duna',
+            'Fiordos', 'Floreciente', 'Taiga', 'desértico', 'árido', 'sabana', 'Salado', 'Acuífero', 'Oasis',
+            'Duna', 'Outbacks', 'Costero', 'Hongos', 'Arena de Hierro', 'Cactus', 'Coral', 'Primitivo', 'Mesa',
+            'Desierto de Niebla', 'Mediterráneo', 'Badlands', 'Suculentas', 'Rayado, Amatista', 'Sumideros',
+            'Estepa', 'Pradera', 'Calcita', 'Semiárido', 'Álamos', 'Turquesa', 'continental', 'megafloriano',
+            'Petrificado', 'Supercontinental', 'Lagos', 'boscoso', 'tropical', 'oceánico', 'fungal', 'musgoso',
+            'arrecife', 'cascadiano', 'pantanico', 'archipiélago', 'riscoso', 'niebla', 'Mundo de alga', 'pilares',
+            'alganiano rosa', 'geotérmico', 'bioluminiscente', 'atolonico', 'tepuico', 'manglares', 'cenótico',
+            'fúngico', 'aereo', 'Tumba', 'Reliquia', 'Gaia', 'Gaia seco', 'Gaia frio', 'Superhabitable humedo',
+            'Superhabitable Frio', 'Superhabitable Seco', 'Acido', 'Radiotropical', 'Hiceano', 'Metanico',
+            'Ceniza', 'Amoniaco', 'Sulfurico', 'Pandorico', 'cristalino',
+        ),
+        megaestructura=(
+            'Mundo Anillo', 'Asamblea Interestelar', 'Megainstalacion de Artes',
+            'Centro de Coordinación Estratégica', 'Esfera Dyson', 'Gran archivo', 'Forja de Arco', 'Ecumenópolis',
+            'Catapulta Cuántica', 'Nexo Científico', 'Matriz Centinela', 'Megastillero', 'Cerebro Matriohska',
+            'Descompresor de Materia',
+        ),
+        leviatan=(
+            'Nubes de Vacío', 'Dragones espaciales', 'Amebas espaciales', 'Entidades cristalinas', 'Tiyankis',
+            'Colmenas de asteroides', 'Calamares fantasma', 'Estelaritas', 'Engendros del vacío',
+            'Horrores dimensionales', 'Drones mineros antiguos', 'Cutoloides', 'Gusanos del vacío',
+        ),
+        especie=(
+            'Maquina', 'Mamiferas', 'Toxoides', 'Necronas', 'Reptilianas', 'Acuaticas', 'Moluscoides', 'Aviares',
+            'Litoideas', 'Fungicas', 'Plantoides', 'Antropodas',
+        ),
+        nivel_tecnologico=(
+            'Edad de Piedra', 'Edad de Bronce', 'Edad de Hierro', 'Renacimiento', 'Edad del Vapor',
+            'Era Industrial', 'Edad de las Máquinas', 'Era Atómica', 'Era Espacial Inicial',
+        ),
+        rasgo=(
+            'Agrarios', 'Ingeniosos', 'Laboriosos', 'Inteligentes', 'Negociantes natos', 'Ingenieros natos',
+            'Físicos natos', 'Sociólogos natos', 'Muy adaptables', 'Adaptables', 'Reproductores rápidos',
+            'Talentosos', 'Aprendizaje rápido', 'Tradicionistas', 'Dóciles', 'Muy fuertes', 'Fuertes', 'Nómadas',
+            'Comunales', 'Carismáticos', 'Conformistas', 'Venerables', 'Duraderos', 'Resilientes',
+            'Conservacionistas', 'Poco adaptables', 'Reproductores lentos', 'Aprendizaje lento', 'Beligerantes',
+            'Rebeldes', 'Débiles', 'Sedentarios', 'Solitarios', 'Repugnantes', 'Desviados', 'Efímeros',
+            'Decadentes', 'Derrochadores',
+        ),
+    )
+}
+
+
+def libro_actual():
+    """Libro de la versión de reglas activa, o el más reciente si esa versión no tiene uno propio"""
+    from ruleset import ruleset_actual
+    version = ruleset_actual().version
+    return LIBROS.get(version) or LIBROS[max(LIBROS)]
+
+
+class _Escritor:
+    __slots__ = ('libro', 'datos')
+
+    def __init__(self, libro):
+        self.libro = libro
+        self.datos = bytearray()
+
+    def entero(self, valor):
+        if not isinstance(valor, int) or valor < 0:
+            raise ValueError(f"No se puede codificar como varint: {valor!r}")
+        while valor >= 0x80:
+            self.datos.append(valor & 0x7F | 0x80)
+            valor >>= 7
+        self.datos.append(valor)
+
+    def texto(self, categoria, valor):
+        if valor is None:
+            self.entero(_NINGUNO)
+            return
+        codigo = self.libro._indices[categoria].get(valor)
+        if codigo is not None:
+            self.entero(codigo)
+            return
+        literal = valor.encode('utf-8')
+        self.entero(_LITERAL)
+        self.entero(len(literal))
+        self.datos += literal
+
+    def textos(self, categoria, valores):
+        self.entero(len(valores))
+        for valor in valores:
+            self.texto(categoria, valor)
+
+
+class _Lector:
+    __slots__ = ('libro', 'datos', 'posicion')
+
+    def __init__(self, libro, datos, posicion):
+        self.libro = libro
+        self.datos = datos
+        self.posicion = posicion
+
+    def entero(self):
+        valor = desplazamiento = 0
+        while True:
+            try:
+                byte = self.datos[self.posicion]
+            except IndexError:
+                raise ValueError("Sistema binario truncado") from None
+            self.posicion += 1
+            valor |= (byte & 0x7F) << desplazamiento
+            if byte < 0x80:
+                return valor
+            desplazamiento += 7
+
+    def texto(self, categoria):
+        codigo = self.entero()
+        if codigo == _NINGUNO:
+            return None
+        if codigo == _LITERAL:
+            longitud = self.entero()
+            inicio = self.posicion
+            self.posicion += longitud
+            if self.posicion > len(self.datos):
+                raise ValueError("Sistema binario truncado")
+            return bytes(self.datos[inicio:self.posicion]).decode('utf-8')
+        try:
+            return self.libro.tablas[categoria][codigo - _PRIMER_CODIGO]
+        except IndexError:
+            raise ValueError(f"Código {codigo} fuera del libro v{self.libro.version} ({categoria})") from None
+
+    def textos(self, categoria):
+        return [self.texto(categoria) for _ in range(self.entero())]
+
+
+def codificar(sistema, libro=None):
+    """Codifica un SistemaCompacto en bytes; lanza ValueError si algún campo no es representable"""
+    libro = libro or libro_actual()
+    if not isinstance(sistema.generar_cuerpos, bool):
+        raise ValueError(f"generar_cuerpos no es booleano: {sistema.generar_cuerpos!r}")
+    e = _Escritor(libro)
+    e.entero(FORMATO)
+    e.entero(libro.version)
+    e.entero(
+        (_CUERPOS if sistema.generar_cuerpos else 0)
+        | (_INHABITABLES if sistema.inhabitables is not None else 0)
+        | (_ESPECIES if sistema.especie is not None else 0)
+    )
+
+    e.texto('tipo_sistema', TIPOS_SISTEMA.valor(sistema.tipo))
+    e.textos('estrella', [ESTRELLAS.valor(c) for c in sistema.estrellas])
+    e.texto('habitabilidad', HABITABILIDAD.valor(sistema.habitabilidad))
+    cuerpos = sistema.cuerpos
+    e.entero(len(cuerpos) // 3)
+    for i in range(0, len(cuerpos), 3):
+        e.texto('estrella', ESTRELLAS.valor(cuerpos[i]))
+        e.entero(cuerpos[i + 1])
+        e.entero(cuerpos[i + 2])
+    e.entero(sistema.asteroides)
+
+    if sistema.inhabitables is not None:
+        # Las lunas del gaseoso van una por planeta inhabitable, así que no necesitan su propia longitud
+        e.textos('planeta', [PLANETAS.valor(c) for c in sistema.inhabitables])
+        for lunas in sistema.lunas_gaseoso:
+            e.entero(lunas)
+
+    e.texto('recurso', RECURSOS.valor_opcional(sistema.recurso))
+    e.texto('evento', EVENTOS.valor_opcional(sistema.evento))
+    tipos = sistema.tipos_planetas
+    e.entero(len(tipos) // 2)
+    for i in range(0, len(tipos), 2):
+        e.texto('categoria_planeta', CATEGORIAS.valor(tipos[i]))
+        e.texto('planeta', PLANETAS.valor(tipos[i + 1]))
+    e.texto('megaestructura', MEGAESTRUCTURAS.valor_opcional(sistema.megaestructura))
+    e.texto('leviatan', LEVIATANES.valor_opcional(sistema.leviatan))
+
+    if sistema.especie is not None:
+        especie, nivel, positivos, negativos = sistema.especie
+        e.texto('especie', ESPECIES.valor(especie))
+        e.texto('nivel_tecnologico', NIVELES.valor(nivel))
+        e.textos('rasgo', [RASGOS.valor(r) for r in positivos])
+        e.textos('rasgo', [RASGOS.valor(r) for r in negativos])
+    return bytes(e.datos)
+
+
+def decodificar(datos):
+    """Reconstruye el SistemaCompacto de unos bytes escritos por codificar()"""
+    r = _Lector(None, datos, 0)
+    formato = r.entero()
+    if formato != FORMATO:
+        raise ValueError(f"Formato de sistema binario desconocido: {formato}")
+    version = r.entero()
+    r.libro = LIBROS.get(version)
+    if r.libro is None:
+        raise ValueError(f"No hay libro de códigos para la versión de reglas {version}")
+    marcas = r.entero()
+
+    sistema = SistemaCompacto()
+    sistema.generar_cuerpos = bool(marcas & _CUERPOS)
+    sistema.tipo = TIPOS_SISTEMA.codigo(r.texto('tipo_sistema'))
+    sistema.estrellas = tuple(ESTRELLAS.codigo(e) for e in r.textos('estrella'))
+    sistema.habitabilidad = HABITABILIDAD.codigo(r.texto('habitabilidad'))
+    sistema.cuerpos = tuple(
+        valor
+        for _ in range(r.entero())
+        for valor in (ESTRELLAS.codigo(r.texto('estrella')), r.entero(), r.entero())
+    )
+    sistema.asteroides = r.entero()
+
+    if marcas & _INHABITABLES:
+        sistema.inhabitables = tuple(PLANETAS.codigo(p) for p in r.textos('planeta'))
+        sistema.lunas_gaseoso = tuple(r.entero() for _ in sistema.inhabitables)
+    else:
+        sistema.inhabitables = None
+        sistema.lunas_gaseoso = None
+
+    sistema.recurso = RECURSOS.codigo_opcional(r.texto('recurso'))
+    sistema.evento = EVENTOS.codigo_opcional(r.texto('evento'))
+    sistema.tipos_planetas = tuple(
+        valor
+        for _ in range(r.entero())
+        for valor in (CATEGORIAS.codigo(r.texto('categoria_planeta')), PLANETAS.codigo(r.texto('planeta')))
+    )
+    sistema.megaestructura = MEGAESTRUCTURAS.codigo_opcional(r.texto('megaestructura'))
+    sistema.leviatan = LEVIATANES.codigo_opcional(r.texto('leviatan'))
+
+    if marcas & _ESPECIES:
+        sistema.especie = (
+            ESPECIES.codigo(r.texto('especie')),
+            NIVELES.codigo(r.texto('nivel_tecnologico')),
+            tuple(RASGOS.codigo(x) for x in r.textos('rasgo')),
+            tuple(RASGOS.codigo(x) for x in r.textos('rasgo'))
+        )
+    else:
+        sistema.especie = None
+    if r.posicion != len(datos):
+        raise ValueError("Sobran bytes al final del sistema binario")
+    return sistema
+
+
+def para_persistencia(system_data):
+    """Forma en la que se guarda 'system_data': bytes si es un SistemaCompacto codificable, o un diccionario"""
+    if isinstance(system_data, SistemaCompacto):
+        try:
+            return codificar(system_data)
+        except ValueError:
+            pass
+    return dict(system_data)
+
+
+def desde_persistencia(valor):
+    """Inversa de para_persistencia, aceptando también base64 (JSON) y diccionarios completos"""
+    if isinstance(valor, str):
+        valor = base64.b64decode(valor)
+    if isinstance(valor, (bytes, bytearray, memoryview)):
+        return decodificar(valor)
+    return compactar(valor)
+
+
+def serializar_binario(objeto):
+    """Función 'default' de json.dump que guarda los sistemas compactos en base64"""
+    if isinstance(objeto, Mapping):
+        valor = para_persistencia(objeto)
+        if isinstance(valor, bytes):
+            return base64.b64encode(valor).decode('ascii')
+        return valor
+    raise TypeError(f"Object of type {type(objeto).__name__} is not JSON serializable")
+
+
+def _leer_system_data(db_file):
+    """system_data guardados en una base JSON (instantánea y journal), sin modificarla"""
+    from database import leer_database_json
+    sistemas = leer_database_json(db_file)['systems'].values()
+    return [entrada['system_data'] for entrada in sistemas if 'system_data' in entrada]
+
+
+def main(argv=None):
+    """Compara el tamaño de los sistemas de una base de datos JSON en diccionario y en binario"""
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Uso: python binary_system.py <systems_database.json>", file=sys.stderr)
+        return 2
+
+    from ruleset import ruleset_actual
+    for categoria, valores in libro_actual().faltantes(ruleset_actual()).items():
+        print(f"Sin código en el libro ({categoria}): {', '.join(valores)}", file=sys.stderr)
+
+    sistemas = completos = binarios = 0
+    for system_data in _leer_system_data(argv[0]):
+        sistemas += 1
+        completos += len(json.dumps(dict(system_data), ensure_ascii=False, separators=(',', ':')).encode())
+        binarios += len(json.dumps(system_data, default=serializar_binario))
+    print(f"{sistemas} sistemas con system_data: {completos} bytes en JSON, {binarios} bytes en binario (base64)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,19 @@
+import asyncio
 import discord
 from discord.ext import commands
 import logging
+from ruleset import RulesetError, cargar_ruleset
 from solar_system_generator import SolarSystemGenerator
-from database import SystemDatabase
+from database import SistemaIrreconstruible, crear_database
+from system_pool import PoolSistemas
+from galaxy import Galaxia
+from rng_backends import crear_rng
+from conditional_generator import Restricciones
+from probabilities import media, porcentaje, probabilidades
+from config import (
+    DATABASE_BACKEND, DATABASE_MEMORIA_MB, GALAXIA_CACHE_SECTORES, GALAXIA_DENSIDAD, GALAXIA_SEMILLA, GALAXIA_TAMANO_SECTOR,
+    POOL_SISTEMAS_RITMO, POOL_SISTEMAS_TAMANO, RNG_BACKEND
+)
 
 class SolarSystemBot(commands.Bot):
     def __init__(self):
@@ -15,8 +26,16 @@ class SolarSystemBot(commands.Bot):
             description='Bot generador de sistemas solares para roleplay espacial'
         )
 
-        self.generator = SolarSystemGenerator()
-        self.database = SystemDatabase()
+        self.generator = SolarSystemGenerator(rng=crear_rng(RNG_BACKEND))
+        # Con particiones por servidor, las de servidores inactivos se descargan al pasar del presupuesto
+        opciones_database = {'presupuesto_memoria': DATABASE_MEMORIA_MB << 20} if DATABASE_BACKEND == 'guilds' else {}
+        self.database = crear_database(DATABASE_BACKEND, generator=self.generator, **opciones_database)
+        # Sistemas pregenerados para que /generar_sistema responda al instante
+        self.pool = PoolSistemas(self.generator, POOL_SISTEMAS_TAMANO, POOL_SISTEMAS_RITMO)
+        # Galaxia procedimental: los sectores se generan al consultarlos
+        self.galaxia = Galaxia(
+            GALAXIA_SEMILLA, self.generator, GALAXIA_TAMANO_SECTOR, GALAXIA_DENSIDAD, GALAXIA_CACHE_SECTORES
+        )
 
     async def setup_hook(self):
         """Se ejecuta cuando el bot se está configurando"""
@@ -26,6 +45,13 @@ class SolarSystemBot(commands.Bot):
         self.tree.add_command(generar_ficha_slash)
         self.tree.add_command(stats_exploracion_slash)
         self.tree.add_command(ayuda_sistema_slash)
+        self.tree.add_command(recargar_reglas_slash)
+        self.tree.add_command(explorar_sector_slash)
+        self.tree.add_command(probabilidades_slash)
+        self.tree.add_command(mis_sistemas_slash)
+
+        # Empezar a llenar el pool de sistemas en segundo plano
+        self.pool.iniciar()
 
         # Sync commands immediately
         try:
@@ -34,6 +60,17 @@ class SolarSystemBot(commands.Bot):
         except Exception as e:
             logging.error(f'Error en setup_hook sync: {e}')
 
+    async def close(self):
+        """Detiene las tareas en segundo plano antes de desconectar"""
+        await self.pool.detener()
+        logging.info(f'Pool de sistemas: {self.pool.estadisticas()}')
+        # Escribe a disco los sistemas que aún estén en cola
+        self.database.close()
+        persistencia = self.database.estadisticas_persistencia()
+        if persistencia is not None:
+            logging.info(f'Persistencia de la base de datos: {persistencia}')
+        await super().close()
+
     async def on_ready(self):
         """Evento que se ejecuta cuando el bot está listo"""
         logging.info(f'{self.user} se ha conectado a Discord!')
@@ -269,23 +306,60 @@ def crear_embed_sistema(sistema, nombre_sistema=None):
 
 # Configurar comandos slash
 @discord.app_commands.command(name="generar_sistema", description="Genera un sistema solar aleatorio para roleplay")
-@discord.app_commands.describe(nombre="Nombre del sistema (opcional) - se guardará en la base de datos")
-async def generar_sistema_slash(interaction: discord.Interaction, nombre: str = None):
+@discord.app_commands.describe(
+    nombre="Nombre del sistema (opcional) - se guardará en la base de datos",
+    tipo="Exigir un tipo de sistema",
+    habitable="Exigir que el sistema sea (o no sea) habitable",
+    estrella="Exigir un tipo de estrella, p. ej. 'Agujero Negro'",
+    megaestructura="Exigir (o excluir) una megaestructura detectada por sondeo",
+    leviatan="Exigir (o excluir) un leviatán",
+    especies="Exigir (o excluir) especies inteligentes"
+)
+@discord.app_commands.choices(tipo=[
+    discord.app_commands.Choice(name=tipo, value=tipo) for tipo in ('Unario', 'Binario', 'Trinario')
+])
+async def generar_sistema_slash(interaction: discord.Interaction, nombre: str = None,
+                                tipo: discord.app_commands.Choice[str] = None, habitable: bool = None,
+                                estrella: str = None, megaestructura: bool = None, leviatan: bool = None,
+                                especies: bool = None):
     """Comando slash para generar un sistema solar aleatorio"""
+    # Las opciones a False excluyen el resultado: sin megaestructura, sin leviatanes o sin especies
+    restricciones = Restricciones(
+        tipo_sistema=tipo.value if tipo else None,
+        habitable=habitable,
+        estrella=estrella,
+        megaestructura=megaestructura,
+        leviatan=leviatan,
+        especies=especies
+    )
     try:
         # Generar el sistema solar
         bot_instance = interaction.client
-        if hasattr(bot_instance, 'generator'):
-            sistema = bot_instance.generator.generar_sistema_completo()
+        if restricciones:
+            # Generación condicionada: el sistema no se puede reconstruir solo con la semilla,
+            # así que se guarda completo
+            generator = bot_instance.generator
+            semilla = None
+            ruleset_version = generator.ruleset_version
+            try:
+                sistema = generator.generar_sistema_condicionado(restricciones)
+            except ValueError as e:
+                await interaction.response.send_message(f"❌ {e}", ephemeral=True)
+                return
+        elif hasattr(bot_instance, 'pool'):
+            # Sacar un sistema pregenerado del pool
+            semilla, ruleset_version, sistema = bot_instance.pool.tomar()
         else:
             # Fallback: crear un generador temporal
             from solar_system_generator import SolarSystemGenerator
             generator = SolarSystemGenerator()
-            sistema = generator.generar_sistema_completo()
+            semilla = generator.nueva_semilla()
+            ruleset_version = generator.ruleset_version
+            sistema = generator.generar_sistema(semilla=semilla)
 
         # Si se proporcionó un nombre, guardar en la base de datos
         if nombre:
-            if bot_instance.database.system_exists(nombre):
+            if bot_instance.database.particion(interaction.guild_id).system_exists(nombre):
                 # Advertir pero permitir duplicados
                 embed = crear_embed_sistema(sistema, nombre)
                 embed.add_field(
@@ -296,8 +370,13 @@ async def generar_sistema_slash(interaction: discord.Interaction, nombre: str =
             else:
                 embed = crear_embed_sistema(sistema, nombre)
             
-            # Guardar en la base de datos
-            bot_instance.database.add_system(nombre, interaction.user.id, interaction.user.name, sistema)
+            # Guardar en la base de datos (fuera del bucle de eventos: con SQLite el alta espera al commit)
+            await asyncio.to_thread(
+                bot_instance.database.add_system,
+                nombre, interaction.user.id, interaction.user.name, sistema,
+                semilla=semilla, ruleset_version=ruleset_version,
+                guild_id=interaction.guild.id if interaction.guild else None
+            )
             
             embed.add_field(
                 name="💾 Sistema Guardado",
@@ -312,6 +391,8 @@ async def generar_sistema_slash(interaction: discord.Interaction, nombre: str =
         # Log del sistema generado
         guild_name = interaction.guild.name if interaction.guild else "DM"
         nombre_log = f" - {nombre}" if nombre else ""
+        if restricciones:
+            nombre_log += f" {restricciones!r}"
         logging.info(f"Sistema generado para {interaction.user.name} en {guild_name}: {sistema['tipo_sistema']}{nombre_log}")
 
     except Exception as e:
@@ -321,15 +402,26 @@ async def generar_sistema_slash(interaction: discord.Interaction, nombre: str =
             ephemeral=True
         )
 
+async def autocompletar_nombre_sistema(interaction: discord.Interaction, actual: str):
+    """Sugiere nombres de sistemas guardados mientras se escribe el parámetro 'nombre'"""
+    try:
+        nombres = interaction.client.database.particion(interaction.guild_id).buscar_nombres(actual, limite=25)
+    except Exception as e:
+        logging.error(f"Error al autocompletar nombres de sistemas: {e}")
+        return []
+    # Discord limita cada opción a 100 caracteres
+    return [discord.app_commands.Choice(name=nombre[:100], value=nombre[:100]) for nombre in nombres]
+
 @discord.app_commands.command(name="ficha_sistema", description="Muestra la ficha detallada de un sistema guardado")
 @discord.app_commands.describe(nombre="Nombre del sistema a consultar")
+@discord.app_commands.autocomplete(nombre=autocompletar_nombre_sistema)
 async def ficha_sistema_slash(interaction: discord.Interaction, nombre: str):
     """Comando slash para mostrar la ficha de un sistema guardado"""
     try:
         bot_instance = interaction.client
         
         # Buscar el sistema en la base de datos
-        sistema_info = bot_instance.database.get_system(nombre)
+        sistema_info = bot_instance.database.particion(interaction.guild_id).get_system(nombre)
         
         if not sistema_info:
             await interaction.response.send_message(
@@ -355,6 +447,12 @@ async def ficha_sistema_slash(interaction: discord.Interaction, nombre: str):
         guild_name = interaction.guild.name if interaction.guild else "DM"
         logging.info(f"Ficha de sistema '{nombre}' consultada por {interaction.user.name} en {guild_name}")
         
+    except SistemaIrreconstruible as e:
+        logging.error(str(e))
+        await interaction.response.send_message(
+            f"❌ No se puede reconstruir el sistema '{nombre}': se guardó con unas reglas de generación que ya no están disponibles.",
+            ephemeral=True
+        )
     except Exception as e:
         logging.error(f"Error al consultar ficha de sistema: {e}")
         await interaction.response.send_message(
@@ -368,14 +466,20 @@ async def stats_exploracion_slash(interaction: discord.Interaction):
     try:
         bot_instance = interaction.client
         
-        # Obtener estadísticas
-        total_systems = bot_instance.database.get_total_systems()
-        top_explorers = bot_instance.database.get_top_explorers(5)
+        # Obtener estadísticas del servidor (en mensajes directos, las globales)
+        guild_id = interaction.guild.id if interaction.guild else None
+        total_systems = bot_instance.database.get_total_systems(guild_id)
+        if guild_id is not None and not total_systems:
+            # Los sistemas guardados antes de registrar el servidor no tienen guild_id: un servidor
+            # sin sistemas propios muestra las estadísticas globales en lugar de un ranking vacío
+            guild_id = None
+            total_systems = bot_instance.database.get_total_systems()
+        top_explorers = bot_instance.database.get_top_explorers(5, guild_id)
         
         embed = discord.Embed(
             title="📊 Estadísticas de Exploración",
             color=0x4CAF50,
-            description="Estadísticas de sistemas explorados en este servidor"
+            description="Estadísticas de sistemas explorados en este servidor" if guild_id else "Estadísticas de sistemas explorados en todos los servidores"
         )
         
         embed.add_field(
@@ -468,11 +572,11 @@ async def generar_comando(ctx, *, nombre: str = None):
     """Comando tradicional para generar un sistema solar aleatorio"""
     try:
         # Generar el sistema solar
-        sistema = ctx.bot.generator.generar_sistema_completo()
+        semilla, ruleset_version, sistema = ctx.bot.pool.tomar()
         
         # Si se proporcionó un nombre, guardar en la base de datos
         if nombre:
-            if ctx.bot.database.system_exists(nombre):
+            if ctx.bot.database.particion(ctx.guild.id if ctx.guild else None).system_exists(nombre):
                 # Advertir pero permitir duplicados
                 embed = crear_embed_sistema(sistema, nombre)
                 embed.add_field(
@@ -483,8 +587,13 @@ async def generar_comando(ctx, *, nombre: str = None):
             else:
                 embed = crear_embed_sistema(sistema, nombre)
             
-            # Guardar en la base de datos
-            ctx.bot.database.add_system(nombre, ctx.author.id, ctx.author.name, sistema)
+            # Guardar en la base de datos (fuera del bucle de eventos: con SQLite el alta espera al commit)
+            await asyncio.to_thread(
+                ctx.bot.database.add_system,
+                nombre, ctx.author.id, ctx.author.name, sistema,
+                semilla=semilla, ruleset_version=ruleset_version,
+                guild_id=ctx.guild.id if ctx.guild else None
+            )
             
             embed.add_field(
                 name="💾 Sistema Guardado",
@@ -510,7 +619,7 @@ async def ficha_comando(ctx, *, nombre: str):
     """Comando tradicional para mostrar la ficha de un sistema guardado"""
     try:
         # Buscar el sistema en la base de datos
-        sistema_info = ctx.bot.database.get_system(nombre)
+        sistema_info = ctx.bot.database.particion(ctx.guild.id if ctx.guild else None).get_system(nombre)
         
         if not sistema_info:
             await ctx.send(f"❌ No se encontró el sistema '{nombre}' en la base de datos.")
@@ -533,6 +642,9 @@ async def ficha_comando(ctx, *, nombre: str):
         guild_name = ctx.guild.name if ctx.guild else "DM"
         logging.info(f"Ficha de sistema '{nombre}' consultada por {ctx.author.name} en {guild_name}")
         
+    except SistemaIrreconstruible as e:
+        logging.error(str(e))
+        await ctx.send(f"❌ No se puede reconstruir el sistema '{nombre}': se guardó con unas reglas de generación que ya no están disponibles.")
     except Exception as e:
         logging.error(f"Error al consultar ficha de sistema: {e}")
         await ctx.send("❌ Ocurrió un error al consultar la ficha del sistema.")
@@ -542,7 +654,7 @@ async def generar_ficha_comando(ctx, *, nombre: str):
     """Comando tradicional para generar ficha detallada con nombres específicos"""
     try:
         # Buscar el sistema en la base de datos
-        sistema_info = ctx.bot.database.get_system(nombre)
+        sistema_info = ctx.bot.database.particion(ctx.guild.id if ctx.guild else None).get_system(nombre)
         
         if not sistema_info:
             await ctx.send(f"❌ No se encontró el sistema '{nombre}' en la base de datos. Primero genera un sistema con ese nombre usando `!generar {nombre}` o `/generar_sistema {nombre}`")
@@ -550,7 +662,7 @@ async def generar_ficha_comando(ctx, *, nombre: str):
         
         # Crear embed detallado
         sistema_data = sistema_info['system_data']
-        embed = crear_embed_ficha_detallada(sistema_data, sistema_info['original_name'])
+        embed = crear_embed_ficha_detallada(sistema_data, sistema_info['original_name'], ctx.bot.generator.rng)
         
         # Añadir información del explorador
         embed.add_field(
@@ -565,6 +677,9 @@ async def generar_ficha_comando(ctx, *, nombre: str):
         guild_name = ctx.guild.name if ctx.guild else "DM"
         logging.info(f"Ficha detallada de sistema '{nombre}' generada por {ctx.author.name} en {guild_name}")
         
+    except SistemaIrreconstruible as e:
+        logging.error(str(e))
+        await ctx.send(f"❌ No se puede reconstruir el sistema '{nombre}': se guardó con unas reglas de generación que ya no están disponibles.")
     except Exception as e:
         logging.error(f"Error al generar ficha detallada: {e}")
         await ctx.send("❌ Ocurrió un error al generar la ficha detallada del sistema.")
@@ -616,7 +731,7 @@ async def ayuda_comando(ctx):
 
     await ctx.send(embed=embed)
 
-def crear_embed_ficha_detallada(sistema, nombre_sistema):
+def crear_embed_ficha_detallada(sistema, nombre_sistema, rng=None):
     """Crea un embed detallado con nombres específicos para cuerpos celestes"""
     from datetime import datetime, timezone, timedelta
     
@@ -654,7 +769,7 @@ def crear_embed_ficha_detallada(sistema, nombre_sistema):
 
     # Generar nombres detallados de planetas y lunas
     if sistema['generar_cuerpos'] and sistema.get('total_planetas', 0) > 0:
-        planetas_detalle = generar_nombres_planetas_lunas(nombre_sistema, sistema)
+        planetas_detalle = generar_nombres_planetas_lunas(nombre_sistema, sistema, rng)
         
         if planetas_detalle:
             embed.add_field(
@@ -744,8 +859,10 @@ def crear_embed_ficha_detallada(sistema, nombre_sistema):
 
     return embed
 
-def generar_nombres_planetas_lunas(nombre_sistema, sistema):
+def generar_nombres_planetas_lunas(nombre_sistema, sistema, rng=None):
     """Genera nombres detallados para planetas y lunas usando números romanos organizados por estrella"""
+    rng = rng or crear_rng()
+
     def numero_a_romano(num):
         valores = [
             (1000, 'M'), (900, 'CM'), (500, 'D'), (400, 'CD'),
@@ -797,13 +914,12 @@ def generar_nombres_planetas_lunas(nombre_sistema, sistema):
         # Distribuir lunas entre los planetas de esta estrella
         lunas_por_planeta = []
         if lunas_estrella > 0:
-            import random
             lunas_restantes = lunas_estrella
             for j in range(planetas_estrella):
                 if j == planetas_estrella - 1:  # Último planeta obtiene lunas restantes
                     lunas_por_planeta.append(lunas_restantes)
                 else:
-                    max_lunas = min(lunas_restantes, random.randint(0, 3))
+                    max_lunas = min(lunas_restantes, rng.randint(0, 3))
                     lunas_por_planeta.append(max_lunas)
                     lunas_restantes -= max_lunas
         else:
@@ -839,13 +955,14 @@ def generar_nombres_planetas_lunas(nombre_sistema, sistema):
 
 @discord.app_commands.command(name="generar_ficha", description="Genera una ficha detallada con nombres específicos para un sistema guardado")
 @discord.app_commands.describe(nombre="Nombre del sistema para generar la ficha detallada")
+@discord.app_commands.autocomplete(nombre=autocompletar_nombre_sistema)
 async def generar_ficha_slash(interaction: discord.Interaction, nombre: str):
     """Comando slash para generar ficha detallada con nombres específicos"""
     try:
         bot_instance = interaction.client
         
         # Buscar el sistema en la base de datos
-        sistema_info = bot_instance.database.get_system(nombre)
+        sistema_info = bot_instance.database.particion(interaction.guild_id).get_system(nombre)
         
         if not sistema_info:
             await interaction.response.send_message(
@@ -856,7 +973,7 @@ async def generar_ficha_slash(interaction: discord.Interaction, nombre: str):
         
         # Crear embed detallado
         sistema_data = sistema_info['system_data']
-        embed = crear_embed_ficha_detallada(sistema_data, sistema_info['original_name'])
+        embed = crear_embed_ficha_detallada(sistema_data, sistema_info['original_name'], bot_instance.generator.rng)
         
         # Añadir información del explorador
         embed.add_field(
@@ -871,6 +988,12 @@ async def generar_ficha_slash(interaction: discord.Interaction, nombre: str):
         guild_name = interaction.guild.name if interaction.guild else "DM"
         logging.info(f"Ficha detallada de sistema '{nombre}' generada por {interaction.user.name} en {guild_name}")
         
+    except SistemaIrreconstruible as e:
+        logging.error(str(e))
+        await interaction.response.send_message(
+            f"❌ No se puede reconstruir el sistema '{nombre}': se guardó con unas reglas de generación que ya no están disponibles.",
+            ephemeral=True
+        )
     except Exception as e:
         logging.error(f"Error al generar ficha detallada: {e}")
         await interaction.response.send_message(
@@ -878,4 +1001,234 @@ async def generar_ficha_slash(interaction: discord.Interaction, nombre: str):
             ephemeral=True
         )
 
+@discord.app_commands.command(name="recargar_reglas", description="Recarga las tablas de generación desde config.py")
+@discord.app_commands.default_permissions(administrator=True)
+async def recargar_reglas_slash(interaction: discord.Interaction):
+    """Comando slash para recargar las reglas de generación sin reiniciar el bot"""
+    try:
+        ruleset = await asyncio.to_thread(cargar_ruleset)
+    except RulesetError as e:
+        logging.error(f"Recarga de reglas rechazada: {e}")
+        await interaction.response.send_message(
+            f"❌ La configuración no es válida, se mantienen las reglas actuales:\n{e}",
+            ephemeral=True
+        )
+        return
+
+    await interaction.response.send_message(
+        f"✅ Reglas de generación v{ruleset.version} activas.",
+        ephemeral=True
+    )
+    logging.info(f"Reglas v{ruleset.version} recargadas por {interaction.user.name}")
+
+@discord.app_commands.command(name="explorar_sector", description="Explora un sector de la galaxia por coordenadas")
+@discord.app_commands.describe(x="Coordenada X del sector", y="Coordenada Y del sector")
+async def explorar_sector_slash(interaction: discord.Interaction, x: int, y: int):
+    """Comando slash para listar los sistemas de un sector de la galaxia"""
+    try:
+        galaxia = interaction.client.galaxia
+        sector = galaxia.sector(x, y)
+
+        embed = discord.Embed(
+            title=f"🗺️ Sector ({x}, {y})",
+            color=0x1E88E5,
+            description=f"{len(sector)} sistemas detectados en el sector"
+        )
+
+        lineas = []
+        for (cx, cy), sistema in sector:
+            habitabilidad_emoji = "✅" if sistema['habitabilidad'] == "Habitable" else "❌"
+            lineas.append(
+                f"`({cx}, {cy})` {habitabilidad_emoji} **{sistema['tipo_sistema']}**: {', '.join(sistema['estrellas'])}"
+            )
+
+        # Los campos de un embed admiten como mucho 1024 caracteres
+        bloque = ""
+        for linea in lineas or ["Sector vacío"]:
+            if len(bloque) + len(linea) + 1 > 1024:
+                embed.add_field(name="🌌 Sistemas", value=bloque, inline=False)
+                bloque = ""
+            bloque += linea + "\n"
+        embed.add_field(name="🌌 Sistemas", value=bloque, inline=False)
+
+        await interaction.response.send_message(embed=embed)
+
+        guild_name = interaction.guild.name if interaction.guild else "DM"
+        logging.info(f"Sector ({x}, {y}) explorado por {interaction.user.name} en {guild_name}")
+
+    except Exception as e:
+        logging.error(f"Error al explorar sector: {e}")
+        await interaction.response.send_message(
+            "❌ Ocurrió un error al explorar el sector.",
+            ephemeral=True
+        )
+
+SECCIONES_PROBABILIDADES = {
+    'resumen': "📊 Resumen",
+    'megaestructuras': "🏗️ Megaestructuras",
+    'leviatanes': "🐉 Leviatanes",
+    'recursos': "💎 Recursos",
+    'estrellas': "⭐ Combinaciones de estrellas",
+    'planetas': "🪐 Total de planetas"
+}
+
+def calcular_probabilidades(seccion):
+    """Líneas de texto con las probabilidades exactas de la sección indicada"""
+    motor = probabilidades()
+    if seccion == 'resumen':
+        nombres = {
+            'habitable': "Sistema habitable",
+            'con_cuerpos': "Con planetas y lunas",
+            'depositos': "Depósitos estratégicos",
+            'evento': "Evento especial",
+            'megaestructura': "Megaestructura",
+            'leviatan': "Leviatán",
+            'especies': "Especies inteligentes"
+        }
+        return motor.ruleset.version, [
+            f"**{nombres[clave]}**: {porcentaje(p)}" for clave, p in motor.resumen().items()
+        ]
+    if seccion == 'estrellas':
+        combinaciones = list(motor.combinaciones_estrellas().items())[:15]
+        return motor.ruleset.version, [
+            f"**{tipo}**: {', '.join(estrellas)} — {porcentaje(p)}" for (tipo, estrellas), p in combinaciones
+        ]
+    if seccion == 'planetas':
+        distribucion = motor.total_planetas()
+        return motor.ruleset.version, [f"Media: **{float(media(distribucion)):.2f}** planetas"] + [
+            f"`{valor:>2}` {porcentaje(p)}" for valor, p in distribucion.items()
+        ]
+    tabla = getattr(motor, seccion)()
+    return motor.ruleset.version, [
+        f"**{nombre}**: {porcentaje(p)}" for nombre, p in sorted(tabla.items(), key=lambda x: x[1], reverse=True)
+    ]
+
+@discord.app_commands.command(name="probabilidades", description="Muestra las probabilidades exactas de cada resultado")
+@discord.app_commands.describe(seccion="Qué probabilidades mostrar")
+@discord.app_commands.choices(seccion=[
+    discord.app_commands.Choice(name=nombre, value=clave) for clave, nombre in SECCIONES_PROBABILIDADES.items()
+])
+async def probabilidades_slash(interaction: discord.Interaction, seccion: discord.app_commands.Choice[str] = None):
+    """Comando slash para consultar las probabilidades calculadas a partir de las reglas activas"""
+    seccion = seccion.value if seccion else 'resumen'
+    try:
+        # La primera consulta tras cargar unas reglas recorre todas las combinaciones
+        version, lineas = await asyncio.to_thread(calcular_probabilidades, seccion)
+
+        embed = discord.Embed(
+            title=SECCIONES_PROBABILIDADES[seccion],
+            color=0x7E57C2,
+            description=f"Probabilidades exactas con las reglas de generación v{version}"
+        )
+        bloque = ""
+        for linea in lineas:
+            if len(bloque) + len(linea) + 1 > 1024:
+                embed.add_field(name="\u200b", value=bloque, inline=False)
+                bloque = ""
+            bloque += linea + "\n"
+        embed.add_field(name="\u200b", value=bloque, inline=False)
+
+        await interaction.response.send_message(embed=embed)
+
+    except Exception as e:
+        logging.error(f"Error al calcular probabilidades: {e}")
+        await interaction.response.send_message(
+            "❌ Ocurrió un error al calcular las probabilidades.",
+            ephemeral=True
+        )
+
+SISTEMAS_POR_PAGINA = 10
+
+class PaginasSistemas(discord.ui.View):
+    """Botones para recorrer los sistemas de un explorador página a página
+
+    Guarda el cursor con el que empieza cada página visitada, así que volver
+    atrás o avanzar solo lee una página de la base de datos.
+    """
+
+    def __init__(self, database, usuario, timeout=180):
+        super().__init__(timeout=timeout)
+        self.database = database
+        self.usuario = usuario
+        self.cursores = [None]
+        self.pagina = 0
+        self.siguiente = None
+        self.total = database.count_systems_by_explorer(usuario.id)
+        self.mensaje = None
+
+    def crear_embed(self):
+        sistemas, self.siguiente = self.database.get_systems_page(
+            self.usuario.id, SISTEMAS_POR_PAGINA, self.cursores[self.pagina]
+        )
+        paginas = max(1, -(-self.total // SISTEMAS_POR_PAGINA))
+        embed = discord.Embed(
+            title=f"🧭 Sistemas explorados por {self.usuario.display_name}",
+            color=0x4CAF50,
+            description=f"{self.total} sistemas guardados"
+        )
+        lineas = []
+        for sistema_info in sistemas:
+            sistema = sistema_info['system_data']
+            habitabilidad_emoji = "✅" if sistema['habitabilidad'] == "Habitable" else "❌"
+            lineas.append(
+                f"{habitabilidad_emoji} **{sistema_info['original_name']}** - {sistema['tipo_sistema']}: "
+                f"{', '.join(sistema['estrellas'])} ({sistema_info['timestamp'][:10]})"
+            )
+        embed.add_field(name="🌌 Sistemas", value="\n".join(lineas) or "Aún no has guardado ningún sistema", inline=False)
+        embed.set_footer(text=f"Página {self.pagina + 1} de {paginas}")
+        self.anterior.disabled = self.pagina == 0
+        self.posterior.disabled = self.siguiente is None
+        return embed
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.user.id != self.usuario.id:
+            await interaction.response.send_message("❌ Solo quien usó el comando puede pasar de página.", ephemeral=True)
+            return False
+        return True
+
+    @discord.ui.button(label="◀️ Anterior", style=discord.ButtonStyle.secondary)
+    async def anterior(self, interaction: discord.Interaction, button: discord.ui.Button):
+        self.pagina -= 1
+        await interaction.response.edit_message(embed=self.crear_embed(), view=self)
+
+    @discord.ui.button(label="Siguiente ▶️", style=discord.ButtonStyle.secondary)
+    async def posterior(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if self.pagina + 1 == len(self.cursores):
+            self.cursores.append(self.siguiente)
+        self.pagina += 1
+        await interaction.response.edit_message(embed=self.crear_embed(), view=self)
+
+    async def on_timeout(self):
+        for boton in self.children:
+            boton.disabled = True
+        if self.mensaje is not None:
+            try:
+                await self.mensaje.edit(view=self)
+            except discord.HTTPException:
+                pass
+
+@discord.app_commands.command(name="mis_sistemas", description="Lista los sistemas que has explorado y guardado")
+async def mis_sistemas_slash(interaction: discord.Interaction):
+    """Comando slash para listar, paginados, los sistemas guardados por el usuario"""
+    try:
+        vista = PaginasSistemas(interaction.client.database.particion(interaction.guild_id), interaction.user)
+        await interaction.response.send_message(embed=vista.crear_embed(), view=vista)
+        vista.mensaje = await interaction.original_response()
+
+        guild_name = interaction.guild.name if interaction.guild else "DM"
+        logging.info(f"Sistemas de {interaction.user.name} consultados en {guild_name}")
+
+    except SistemaIrreconstruible as e:
+        logging.error(str(e))
+        await interaction.response.send_message(
+            "❌ Alguno de tus sistemas se guardó con unas reglas de generación que ya no están disponibles.",
+            ephemeral=True
+        )
+    except Exception as e:
+        logging.error(f"Error al listar sistemas del explorador: {e}")
+        await interaction.response.send_message(
+            "❌ Ocurrió un error al consultar tus sistemas.",
+            ephemeral=True
+        )
+
 # This function is no longer needed - commands are registered in setup_hook
\ No newline at end of file
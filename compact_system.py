@@ -0,0 +1,279 @@
+"""
+Representación compacta en memoria de los sistemas guardados
+
+Los sistemas cargados de la base de datos se guardan como registros con
+__slots__ y códigos enteros pequeños en lugar de diccionarios anidados con
+cadenas repetidas. Los campos se decodifican al leerlos, y el registro se
+convierte de vuelta exactamente al mismo diccionario que se cargó del JSON.
+"""
+
+import json
+import re
+import threading
+from collections.abc import Mapping
+from solar_system_generator import CLAVES_DIFERIDAS, CLAVES_INHABITABLES, CLAVES_NUCLEO
+
+MENSAJE_SIN_DEPOSITOS = "No hay ningún depósito de recursos estratégicos en el sistema"
+MENSAJE_CON_DEPOSITOS = "Recursos estratégicos presentes en el sistema"
+MENSAJE_SONDEO_EXITOSO = "Sondeo exitoso"
+MENSAJE_SONDEO_FALLIDO = "Sondeo no exitoso"
+
+_LUNA_GASEOSO = re.compile(r'Moon (\d+)([a-z])')
+
+
+class Codigos:
+    """Tabla de códigos de un tipo de valor (estrellas, recursos...)
+
+    Los códigos se asignan al primer uso y solo viven en memoria, así que una
+    cadena desconocida para el ruleset actual (p. ej. de una versión antigua)
+    también se puede codificar.
+    """
+
+    __slots__ = ('nombre', 'valores', '_indice', '_lock')
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.valores = []
+        self._indice = {}
+        self._lock = threading.Lock()
+
+    def codigo(self, valor):
+        """Devuelve el código de 'valor', asignándole uno nuevo si no lo tenía"""
+        codigo = self._indice.get(valor)
+        if codigo is None:
+            with self._lock:
+                codigo = self._indice.get(valor)
+                if codigo is None:
+                    codigo = len(self.valores)
+                    self.valores.append(valor)
+                    self._indice[valor] = codigo
+        return codigo
+
+    def codigo_opcional(self, valor):
+        """Como codigo(), pero None se codifica como -1"""
+        return -1 if valor is None else self.codigo(valor)
+
+    def valor(self, codigo):
+        return self.valores[codigo]
+
+    def valor_opcional(self, codigo):
+        return None if codigo < 0 else self.valores[codigo]
+
+
+TIPOS_SISTEMA = Codigos('tipo_sistema')
+ESTRELLAS = Codigos('estrella')
+HABITABILIDAD = Codigos('habitabilidad')
+RECURSOS = Codigos('recurso')
+EVENTOS = Codigos('evento')
+CATEGORIAS = Codigos('categoria_planeta')
+PLANETAS = Codigos('planeta')
+MEGAESTRUCTURAS = Codigos('megaestructura')
+LEVIATANES = Codigos('leviatan')
+ESPECIES = Codigos('especie')
+NIVELES = Codigos('nivel_tecnologico')
+RASGOS = Codigos('rasgo')
+
+
+def _codificar_lunas_gaseoso(lunas, num_planetas):
+    """Convierte ['Moon 1a', 'Moon 1b', 'Moon 3a'] en lunas por planeta: (2, 0, 1, ...)"""
+    conteo = [0] * num_planetas
+    for luna in lunas:
+        coincidencia = _LUNA_GASEOSO.fullmatch(luna)
+        if coincidencia is None:
+            raise ValueError(f"Nombre de luna inesperado: {luna!r}")
+        conteo[int(coincidencia.group(1)) - 1] += 1
+    return tuple(conteo)
+
+
+class SistemaCompacto(Mapping):
+    """Sistema guardado en forma compacta; se lee como el diccionario original
+
+    Los totales, los indicadores 'tiene_*' y los mensajes no se guardan: se
+    deducen de los campos codificados al leerlos.
+    """
+
+    __slots__ = (
+        'tipo', 'estrellas', 'habitabilidad', 'generar_cuerpos', 'cuerpos', 'asteroides',
+        'inhabitables', 'lunas_gaseoso', 'recurso', 'evento', 'tipos_planetas',
+        'megaestructura', 'leviatan', 'especie'
+    )
+
+    @classmethod
+    def desde_dict(cls, datos):
+        """Codifica el diccionario de un sistema; lanza KeyError/ValueError/TypeError si no encaja"""
+        sistema = cls()
+        sistema.tipo = TIPOS_SISTEMA.codigo(datos['tipo_sistema'])
+        sistema.estrellas = tuple(ESTRELLAS.codigo(e) for e in datos['estrellas'])
+        sistema.habitabilidad = HABITABILIDAD.codigo(datos['habitabilidad'])
+        sistema.generar_cuerpos = datos['generar_cuerpos']
+        # (estrella, planetas, lunas) por cada estrella con cuerpos, en orden
+        sistema.cuerpos = tuple(
+            valor
+            for estrella, cuerpos in datos['cuerpos_por_estrella'].items()
+            for valor in (ESTRELLAS.codigo(estrella), cuerpos['planetas'], cuerpos['lunas'])
+        )
+        sistema.asteroides = datos['asteroides']
+
+        if 'tipos_planetas_inhabitables' in datos:
+            sistema.inhabitables = tuple(PLANETAS.codigo(p) for p in datos['tipos_planetas_inhabitables'])
+            sistema.lunas_gaseoso = _codificar_lunas_gaseoso(
+                datos['lunas_planeta_gaseoso'], len(sistema.inhabitables)
+            )
+        else:
+            sistema.inhabitables = None
+            sistema.lunas_gaseoso = None
+
+        sistema.recurso = RECURSOS.codigo_opcional(datos['depositos']['recurso'])
+        sistema.evento = EVENTOS.codigo_opcional(datos['evento_especial']['tipo_evento'])
+        sistema.tipos_planetas = tuple(
+            valor
+            for planeta in datos['tipos_planetas']
+            for valor in (CATEGORIAS.codigo(planeta['categoria']), PLANETAS.codigo(planeta['tipo']))
+        )
+        sistema.megaestructura = MEGAESTRUCTURAS.codigo_opcional(datos['sondeo']['megaestructura'])
+        sistema.leviatan = LEVIATANES.codigo_opcional(datos['leviatanes']['leviatan'])
+
+        especies = datos['especies']
+        if especies['tiene_especies']:
+            sistema.especie = (
+                ESPECIES.codigo(especies['tipo_especie']),
+                NIVELES.codigo(especies['nivel_tecnologico']),
+                tuple(RASGOS.codigo(r) for r in especies['rasgos_positivos']),
+                tuple(RASGOS.codigo(r) for r in especies['rasgos_negativos'])
+            )
+        else:
+            sistema.especie = None
+        return sistema
+
+    def _claves(self):
+        if self.inhabitables is None:
+            return CLAVES_NUCLEO + CLAVES_DIFERIDAS
+        return CLAVES_NUCLEO + CLAVES_INHABITABLES + CLAVES_DIFERIDAS
+
+    def __getitem__(self, clave):
+        decodificar = _DECODIFICADORES.get(clave)
+        if decodificar is None or (clave in CLAVES_INHABITABLES and self.inhabitables is None):
+            raise KeyError(clave)
+        return decodificar(self)
+
+    def __contains__(self, clave):
+        return clave in self._claves()
+
+    def __iter__(self):
+        return iter(self._claves())
+
+    def __len__(self):
+        return len(self._claves())
+
+    def __repr__(self):
+        return f"<SistemaCompacto {self['tipo_sistema']} {self['estrellas']}>"
+
+    def a_dict(self):
+        """Decodifica el sistema completo al diccionario original"""
+        return {clave: self[clave] for clave in self._claves()}
+
+
+def _cuerpos_por_estrella(s):
+    c = s.cuerpos
+    return {
+        ESTRELLAS.valor(c[i]): {'planetas': c[i + 1], 'lunas': c[i + 2]}
+        for i in range(0, len(c), 3)
+    }
+
+
+def _lunas_planeta_gaseoso(s):
+    return [
+        f"Moon {i + 1}{chr(97 + j)}"
+        for i, num_lunas in enumerate(s.lunas_gaseoso)
+        for j in range(num_lunas)
+    ]
+
+
+def _depositos(s):
+    if s.recurso < 0:
+        return {'tiene_depositos': False, 'recurso': None, 'mensaje': MENSAJE_SIN_DEPOSITOS}
+    return {'tiene_depositos': True, 'recurso': RECURSOS.valor(s.recurso), 'mensaje': MENSAJE_CON_DEPOSITOS}
+
+
+def _sondeo(s):
+    if s.megaestructura < 0:
+        return {'sondeo_exitoso': False, 'megaestructura': None, 'mensaje': MENSAJE_SONDEO_FALLIDO}
+    return {
+        'sondeo_exitoso': True,
+        'megaestructura': MEGAESTRUCTURAS.valor(s.megaestructura),
+        'mensaje': MENSAJE_SONDEO_EXITOSO
+    }
+
+
+def _especies(s):
+    if s.especie is None:
+        return {
+            'tiene_especies': False,
+            'tipo_especie': None,
+            'nivel_tecnologico': None,
+            'rasgos_positivos': [],
+            'rasgos_negativos': []
+        }
+    especie, nivel, positivos, negativos = s.especie
+    return {
+        'tiene_especies': True,
+        'tipo_especie': ESPECIES.valor(especie),
+        'nivel_tecnologico': NIVELES.valor(nivel),
+        'rasgos_positivos': [RASGOS.valor(r) for r in positivos],
+        'rasgos_negativos': [RASGOS.valor(r) for r in negativos]
+    }
+
+
+_DECODIFICADORES = {
+    'tipo_sistema': lambda s: TIPOS_SISTEMA.valor(s.tipo),
+    'estrellas': lambda s: [ESTRELLAS.valor(e) for e in s.estrellas],
+    'habitabilidad': lambda s: HABITABILIDAD.valor(s.habitabilidad),
+    'generar_cuerpos': lambda s: s.generar_cuerpos,
+    'cuerpos_por_estrella': _cuerpos_por_estrella,
+    'asteroides': lambda s: s.asteroides,
+    'total_planetas': lambda s: sum(s.cuerpos[1::3]),
+    'total_lunas': lambda s: sum(s.cuerpos[2::3]),
+    'tipos_planetas_inhabitables': lambda s: [PLANETAS.valor(p) for p in s.inhabitables],
+    'lunas_planeta_gaseoso': _lunas_planeta_gaseoso,
+    'depositos': _depositos,
+    'evento_especial': lambda s: {
+        'tiene_evento': s.evento >= 0,
+        'tipo_evento': EVENTOS.valor_opcional(s.evento)
+    },
+    'planetas_habitables': lambda s: len(s.tipos_planetas) // 2,
+    'tipos_planetas': lambda s: [
+        {'categoria': CATEGORIAS.valor(s.tipos_planetas[i]), 'tipo': PLANETAS.valor(s.tipos_planetas[i + 1])}
+        for i in range(0, len(s.tipos_planetas), 2)
+    ],
+    'sondeo': _sondeo,
+    'leviatanes': lambda s: {
+        'tiene_leviatanes': s.leviatan >= 0,
+        'leviatan': LEVIATANES.valor_opcional(s.leviatan)
+    },
+    'especies': _especies
+}
+
+
+def compactar(datos):
+    """Devuelve un SistemaCompacto equivalente a 'datos', o 'datos' tal cual si no es representable
+
+    Solo se compacta si el registro se decodifica exactamente al mismo JSON
+    (mismas claves, mismo orden y mismos valores), de modo que guardar la base
+    de datos nunca altera un sistema.
+    """
+    if isinstance(datos, SistemaCompacto):
+        return datos
+    try:
+        sistema = SistemaCompacto.desde_dict(datos)
+        if json.dumps(sistema.a_dict(), ensure_ascii=False) != json.dumps(datos, ensure_ascii=False):
+            return datos
+    except (KeyError, IndexError, TypeError, ValueError, AttributeError):
+        return datos
+    return sistema
+
+
+def serializar(objeto):
+    """Función 'default' de json.dump para guardar sistemas compactos o perezosos como diccionarios"""
+    if isinstance(objeto, Mapping):
+        return dict(objeto)
+    raise TypeError(f"Object of type {type(objeto).__name__} is not JSON serializable")
@@ -0,0 +1,278 @@
+"""
+Generación condicionada exacta: sistemas que cumplen unas restricciones sin repetir tiradas
+
+En lugar de generar sistemas hasta que uno cumpla las condiciones, se calcula
+la distribución de (tipo de sistema, estrellas) condicionada a las
+restricciones enumerando todas las combinaciones posibles, se muestrea de
+ella con una tabla alias y después se generan las secciones restringidas
+directamente en su resultado favorable. El coste no depende de lo rara que
+sea la combinación pedida.
+"""
+
+import itertools
+import math
+from fractions import Fraction
+from functools import lru_cache
+from samplers import AliasSampler
+from ruleset import NUM_ESTRELLAS_POR_TIPO
+
+CAMPOS_RESTRICCIONES = (
+    'tipo_sistema', 'habitable', 'estrella', 'megaestructura', 'leviatan', 'especies', 'recurso', 'evento'
+)
+
+# Sección que cada restricción fija a su resultado favorable
+SECCION_POR_RESTRICCION = {
+    'recurso': 'depositos',
+    'evento': 'evento',
+    'megaestructura': 'sondeo',
+    'leviatan': 'leviatanes',
+    'especies': 'especies'
+}
+
+
+class Restricciones:
+    """Condiciones que debe cumplir un sistema generado
+
+    None significa sin condición. tipo_sistema y estrella aceptan un nombre;
+    habitable y especies aceptan True o False; megaestructura y leviatan aceptan
+    True (cualquiera), False (ninguno) o un nombre concreto; recurso y evento
+    aceptan True (cualquiera) o un nombre concreto.
+    """
+
+    __slots__ = CAMPOS_RESTRICCIONES
+
+    def __init__(self, tipo_sistema=None, habitable=None, estrella=None, megaestructura=None,
+                 leviatan=None, especies=None, recurso=None, evento=None):
+        self.tipo_sistema = tipo_sistema
+        self.habitable = habitable
+        self.estrella = estrella
+        self.megaestructura = megaestructura
+        self.leviatan = leviatan
+        self.especies = especies
+        self.recurso = recurso
+        self.evento = evento
+
+    def clave(self):
+        return tuple(getattr(self, campo) for campo in CAMPOS_RESTRICCIONES)
+
+    def __bool__(self):
+        return any(valor is not None for valor in self.clave())
+
+    def __repr__(self):
+        activas = ', '.join(
+            f"{campo}={getattr(self, campo)!r}" for campo in CAMPOS_RESTRICCIONES if getattr(self, campo) is not None
+        )
+        return f"Restricciones({activas})"
+
+    def validar(self, ruleset):
+        """Comprueba que los valores existen en el ruleset; lanza ValueError si no"""
+        def comprobar(campo, conocidos, admite_true=False, admite_false=False):
+            valor = getattr(self, campo)
+            if valor is None or (admite_true and valor is True) or (admite_false and valor is False):
+                return
+            if valor not in conocidos:
+                raise ValueError(f"{campo} desconocido: {valor!r}")
+
+        comprobar('tipo_sistema', ruleset.tipos_sistema)
+        comprobar('estrella', ruleset.estrellas)
+        comprobar('megaestructura', ruleset.megaestructuras, admite_true=True, admite_false=True)
+        comprobar('leviatan', ruleset.leviatanes, admite_true=True, admite_false=True)
+        comprobar('recurso', ruleset.sampler_recursos.opciones + ruleset.recursos_agujero_negro, admite_true=True)
+        comprobar('evento', ruleset.eventos, admite_true=True)
+        if self.habitable not in (None, True, False):
+            raise ValueError("habitable debe ser True, False o None")
+        if self.especies not in (None, True, False):
+            raise ValueError("especies debe ser True, False o None")
+
+
+class TablaCondicionada:
+    """Combinaciones (tipo, estrellas) posibles y su distribución condicionada a las restricciones"""
+
+    __slots__ = ('combinaciones', 'sampler', 'probabilidad')
+
+    def __init__(self, combinaciones, pesos):
+        self.combinaciones = combinaciones
+        # Probabilidad exacta de que un sistema sin restricciones las cumpla
+        self.probabilidad = sum(pesos, Fraction(0))
+        # Pasar las fracciones a enteros con un denominador común para la tabla alias
+        denominador = math.lcm(*(p.denominator for p in pesos))
+        self.sampler = AliasSampler(
+            range(len(combinaciones)), [p.numerator * (denominador // p.denominator) for p in pesos]
+        )
+
+
+@lru_cache(maxsize=8)
+def combinaciones_estrellas(ruleset):
+    """Todas las secuencias (tipo, estrellas) que puede producir el generador, con su probabilidad exacta"""
+    sampler_tipo = ruleset.sampler_tipo_sistema
+    sampler_estrellas = ruleset.sampler_estrellas
+    p_estrella = {
+        estrella: Fraction(sampler_estrellas.pesos[i], sampler_estrellas.total)
+        for i, estrella in enumerate(sampler_estrellas.opciones)
+    }
+    combinaciones = []
+    for i, tipo in enumerate(sampler_tipo.opciones):
+        p_tipo = Fraction(sampler_tipo.pesos[i], sampler_tipo.total)
+        if not p_tipo:
+            continue
+        for estrellas in itertools.product(sampler_estrellas.opciones, repeat=NUM_ESTRELLAS_POR_TIPO[tipo]):
+            p = p_tipo
+            for estrella in estrellas:
+                p *= p_estrella[estrella]
+            if p:
+                combinaciones.append((tipo, estrellas, p))
+    return tuple(combinaciones)
+
+
+def verosimilitud(generator, restricciones, tipo, estrellas):
+    """Probabilidad exacta de cumplir las restricciones dado el tipo de sistema y sus estrellas
+
+    Reproduce las tiradas del generador sección a sección: cada restricción
+    multiplica la probabilidad de que su sección salga como se pide.
+    """
+    r = restricciones
+    ruleset = generator.ruleset
+
+    if r.tipo_sistema is not None and tipo != r.tipo_sistema:
+        return Fraction(0)
+    if r.estrella is not None and r.estrella not in estrellas:
+        return Fraction(0)
+
+    habitable = generator.determinar_habitabilidad(estrellas) == "Habitable"
+    if r.habitable is not None and habitable != r.habitable:
+        return Fraction(0)
+
+    p = Fraction(1)
+    if r.especies is not None:
+        p_especies = Fraction(ruleset.prob_especies, 100) if habitable else Fraction(0)
+        p *= p_especies if r.especies else 1 - p_especies
+
+    if r.megaestructura is False:
+        p *= 1 - Fraction(ruleset.prob_sondeo, 100)
+    elif r.megaestructura is not None:
+        p *= Fraction(ruleset.prob_sondeo, 100)
+        if r.megaestructura is not True:
+            sampler, _ = ruleset.elegibles(estrellas)
+            if sampler is None:
+                genericas = ruleset.megaestructuras_genericas
+                p *= Fraction(genericas.count(r.megaestructura), len(genericas))
+            else:
+                peso = sum(w for o, w in zip(sampler.opciones, sampler.pesos) if o == r.megaestructura)
+                p *= Fraction(peso, sampler.total)
+
+    if r.leviatan is False:
+        # Sin leviatanes elegibles, el sistema nunca tiene uno
+        _, disponibles = ruleset.elegibles(estrellas)
+        if disponibles:
+            p *= 1 - Fraction(ruleset.prob_leviatanes, 100)
+    elif r.leviatan is not None:
+        _, disponibles = ruleset.elegibles(estrellas)
+        if not disponibles:
+            return Fraction(0)
+        p *= Fraction(ruleset.prob_leviatanes, 100)
+        if r.leviatan is not True:
+            p *= Fraction(disponibles.count(r.leviatan), len(disponibles))
+
+    if r.recurso is not None:
+        p *= Fraction(ruleset.prob_depositos, 100)
+        if r.recurso is not True:
+            if 'Agujero Negro' in estrellas:
+                p *= 1 if r.recurso == ruleset.recursos_agujero_negro[0] else 0
+            else:
+                sampler = ruleset.sampler_recursos
+                peso = sum(w for o, w in zip(sampler.opciones, sampler.pesos) if o == r.recurso)
+                p *= Fraction(peso, sampler.total)
+
+    if r.evento is not None:
+        p *= Fraction(ruleset.prob_evento, 100)
+        if r.evento is not True:
+            p *= Fraction(ruleset.eventos.count(r.evento), len(ruleset.eventos))
+
+    return p
+
+
+@lru_cache(maxsize=64)
+def _tabla(ruleset, clave):
+    from solar_system_generator import SolarSystemGenerator
+
+    generator = SolarSystemGenerator(ruleset)
+    restricciones = Restricciones(*clave)
+    combinaciones = []
+    pesos = []
+    for tipo, estrellas, p in combinaciones_estrellas(ruleset):
+        peso = p * verosimilitud(generator, restricciones, tipo, estrellas)
+        if peso:
+            combinaciones.append((tipo, estrellas))
+            pesos.append(peso)
+    if not combinaciones:
+        raise ValueError(f"Ningún sistema puede cumplir {restricciones!r} con las reglas v{generator.ruleset_version}")
+    return TablaCondicionada(tuple(combinaciones), pesos)
+
+
+def tabla_condicionada(ruleset, restricciones):
+    """Tabla de combinaciones condicionada a las restricciones (se calcula una vez por ruleset y se reutiliza)"""
+    restricciones.validar(ruleset)
+    return _tabla(ruleset, restricciones.clave())
+
+
+def generar_sistema_condicionado(generator, restricciones, rngs):
+    """Genera un sistema con la distribución exacta de los sistemas que cumplen las restricciones"""
+    from solar_system_generator import SECCIONES_DIFERIDAS, claves_sistema
+
+    r = restricciones
+    ruleset = generator.ruleset
+    tabla = tabla_condicionada(ruleset, r)
+
+    rng = rngs['nucleo']
+    tipo, estrellas = tabla.combinaciones[tabla.sampler.elegir_indice(rng.randrange)]
+    estrellas = list(estrellas)
+    nucleo = generator._completar_nucleo(tipo, estrellas, rng)
+    campos = dict(nucleo)
+
+    # Las secciones sin restricción se generan como siempre
+    restringidas = {
+        SECCION_POR_RESTRICCION[campo] for campo in SECCION_POR_RESTRICCION if getattr(r, campo) is not None
+    }
+    for seccion in SECCIONES_DIFERIDAS:
+        if seccion not in restringidas:
+            campos.update(generator._generar_seccion(seccion, nucleo, rngs[seccion]))
+
+    # Las restringidas se generan directamente en su resultado favorable (False: la sección vacía)
+    if r.recurso is not None:
+        depositos = generator.crear_deposito(estrellas, rngs['depositos'])
+        if r.recurso is not True:
+            depositos['recurso'] = r.recurso
+        campos['depositos'] = depositos
+
+    if r.evento is not None:
+        evento = r.evento if r.evento is not True else rngs['evento'].choice(ruleset.eventos)
+        campos['evento_especial'] = {'tiene_evento': True, 'tipo_evento': evento}
+
+    if r.megaestructura is False:
+        campos['sondeo'] = {'sondeo_exitoso': False, 'megaestructura': None, 'mensaje': "Sondeo no exitoso"}
+    elif r.megaestructura is not None:
+        sondeo = generator.crear_sondeo(estrellas, rngs['sondeo'])
+        if r.megaestructura is not True:
+            sondeo['megaestructura'] = r.megaestructura
+        campos['sondeo'] = sondeo
+
+    if r.leviatan is False:
+        campos['leviatanes'] = {'tiene_leviatanes': False, 'leviatan': None}
+    elif r.leviatan is not None:
+        leviatanes = generator.crear_leviatan(estrellas, rngs['leviatanes'])
+        if r.leviatan is not True:
+            leviatanes['leviatan'] = r.leviatan
+        campos['leviatanes'] = leviatanes
+
+    if r.especies:
+        campos['especies'] = generator.crear_especie(rngs['especies'])
+    elif r.especies is False:
+        campos['especies'] = {
+            'tiene_especies': False,
+            'tipo_especie': None,
+            'nivel_tecnologico': None,
+            'rasgos_positivos': [],
+            'rasgos_negativos': []
+        }
+
+    return {clave: campos[clave] for clave in claves_sistema(nucleo)}
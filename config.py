@@ -2,6 +2,10 @@
 Configuración de probabilidades y constantes para el generador de sistemas solares
 """
 
+# Versión de las reglas de generación. Los sistemas guardados solo con su semilla
+# se reconstruyen con estas tablas: incrementar al cambiar cualquier probabilidad.
+RULESET_VERSION = 1
+
 # Probabilidades de tipos de sistema (deben sumar a 100 para facilidad de cálculo)
 SYSTEM_PROBABILITIES = [50, 25, 25]  # Unario, Binario, Trinario
 
@@ -220,6 +224,14 @@ PLANETS_RANGE = (1, 16)
 MOONS_RANGE = (1, 27)
 ASTEROID_BELTS_RANGE = (0, 3)
 
+# Tipos de planetas para sistemas inhabitables
+TIPOS_PLANETAS_INHABITABLES = [
+    "Planeta Gaseoso", "Mundo Fragmentado", "Mundo toxico",
+    "Mundo Volcanico", "Mundo congelado", "Mundo yermo", "Mundo frio"
+]
+PLANETAS_INHABITABLES_MAX = 5  # Máximo de planetas inhabitables listados
+LUNAS_GASEOSO_RANGE = (1, 3)   # Lunas de cada planeta gaseoso
+
 # Configuración de Especies
 ESPECIES_PROBABILITY = 10  # 10% chance de especies (muy, muy raro)
 
@@ -299,6 +311,26 @@ LOG_FILE = 'solar_system_bot.log'
 BOT_DESCRIPTION = 'Bot generador de sistemas solares para roleplay de naciones espaciales'
 COMMAND_PREFIX = '!'
 
+# Generador aleatorio del bot: 'rapido' (PRNG con semilla) o 'sistema' (entropía del SO)
+RNG_BACKEND = 'rapido'
+
+# Almacenamiento de los sistemas guardados: 'json' (systems_database.json), 'sqlite'
+# (systems_database.sqlite3; la primera vez importa systems_database.json) o 'guilds'
+# (un archivo por servidor en systems_guilds/, cargado con el primer comando del servidor)
+DATABASE_BACKEND = 'json'
+# Con 'guilds': memoria estimada máxima de los servidores cargados antes de descargar los inactivos
+DATABASE_MEMORIA_MB = 256
+
+# Pool de sistemas pregenerados para /generar_sistema y !generar
+POOL_SISTEMAS_TAMANO = 32   # Sistemas listos en el búfer
+POOL_SISTEMAS_RITMO = 50    # Sistemas por segundo al rellenar en segundo plano
+
+# Galaxia procedimental (/explorar_sector): cambiar la semilla crea otra galaxia
+GALAXIA_SEMILLA = 1
+GALAXIA_TAMANO_SECTOR = 8      # Celdas por lado de cada sector
+GALAXIA_DENSIDAD = 20          # % de celdas con sistema
+GALAXIA_CACHE_SECTORES = 256   # Sectores recientes en memoria
+
 # Colores para embeds de Discord (en hexadecimal)
 EMBED_COLORS = {
     'success': 0x4CAF50,      # Verde
@@ -1,24 +1,192 @@
 
 import json
+import logging
 import os
+import threading
 from datetime import datetime
+from background_writer import EscritorSegundoPlano
+from binary_system import desde_persistencia, serializar_binario
+from compact_system import compactar
+from indexes import IndiceBusqueda, IndiceExploradores, IndiceNombres, normalizar_nombre
+from leaderboard import Clasificacion
+from ruleset import obtener_ruleset, ruleset_actual, ruleset_archivado
 
-class SystemDatabase:
-    def __init__(self, db_file='systems_database.json'):
+BACKENDS_DATABASE = ('json', 'sqlite', 'guilds')
+
+# Journal de altas del backend JSON
+JOURNAL_SUFIJO = '.journal'
+JOURNAL_ROTADO = '.1'
+UMBRAL_COMPACTACION = 1 << 20  # bytes de journal antes de volcarlo en una instantánea nueva
+
+
+def leer_database_json(db_file):
+    """Datos de una base JSON (instantánea y journal) como los carga SystemDatabase, sin modificar nada
+
+    Para migrar o inspeccionar una base sin abrirla: SystemDatabase crearía el
+    journal, recortaría una última línea a medio escribir y arrancaría su hilo
+    escritor. Esa línea incompleta aquí simplemente se ignora.
+    """
+    data = SystemDatabase.create_empty_database()
+    if os.path.exists(db_file):
+        try:
+            with open(db_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            # Los sistemas completos se guardan en memoria en forma compacta (en disco, en binario)
+            for entrada in data['systems'].values():
+                if 'system_data' in entrada:
+                    entrada['system_data'] = desde_persistencia(entrada['system_data'])
+        except (json.JSONDecodeError, FileNotFoundError):
+            data = SystemDatabase.create_empty_database()
+
+    # Primero el journal rotado por una compactación que no llegó a terminar
+    journal = db_file + JOURNAL_SUFIJO
+    for ruta in (journal + JOURNAL_ROTADO, journal):
+        if os.path.exists(ruta):
+            with open(ruta, 'r', encoding='utf-8') as f:
+                contenido = f.read()
+            _reproducir_journal(data, ruta, contenido[:contenido.rfind('\n') + 1])
+    return data
+
+
+def _reproducir_journal(data, ruta, contenido):
+    """Aplica las altas de las líneas completas de un journal"""
+    for numero, linea in enumerate(contenido.splitlines(), 1):
+        try:
+            registro = json.loads(linea)
+        except json.JSONDecodeError:
+            logging.warning(f"Journal {ruta}: línea {numero} ilegible, se ignora")
+            continue
+        entrada = registro['entrada']
+        if 'system_data' in entrada:
+            entrada['system_data'] = desde_persistencia(entrada['system_data'])
+        # Las claves no se reutilizan: si ya está, la instantánea incluye esta alta
+        if registro['key'] not in data['systems']:
+            SystemDatabase._aplicar_alta(data, registro['key'], entrada)
+
+
+def clasificaciones_por_guild(entradas):
+    """Clasificación de cada servidor con las entradas guardadas con guild_id"""
+    clasificaciones = {}
+    for entrada in entradas:
+        guild_id = entrada.get('guild_id')
+        if guild_id is not None:
+            if guild_id not in clasificaciones:
+                clasificaciones[guild_id] = Clasificacion()
+            clasificaciones[guild_id].registrar(str(entrada['explorer_id']), entrada['explorer_name'])
+    return clasificaciones
+
+
+class SistemaIrreconstruible(ValueError):
+    """Un sistema guardado solo con su semilla no se puede reconstruir porque faltan sus reglas"""
+
+
+class BaseSystemDatabase:
+    """Lógica común a los backends: reconstruir los sistemas guardados solo con su semilla"""
+
+    def __init__(self, generator=None):
+        # Generador usado para reconstruir los sistemas guardados solo con su semilla
+        self._generator = generator
+
+    def close(self):
+        """Escribe lo pendiente y libera los recursos del backend"""
+
+    def estadisticas_persistencia(self):
+        """Contadores de la escritura a disco, si el backend escribe en segundo plano"""
+        return None
+
+    def particion(self, guild_id):
+        """Base de datos con los sistemas de un servidor; sin particiones, todos comparten la misma"""
+        return self
+
+    @property
+    def generator(self):
+        """Generador para reconstruir sistemas; se crea al primer uso"""
+        if self._generator is None:
+            from solar_system_generator import SolarSystemGenerator
+            self._generator = SolarSystemGenerator()
+        return self._generator
+
+    def materializar_sistema(self, entrada):
+        """Devuelve una copia de la entrada con 'system_data' reconstruido si solo se guardó la semilla"""
+        if 'system_data' in entrada:
+            return entrada
+
+        # Las entradas anteriores al versionado se generaron con la versión 1
+        ruleset_version = entrada.get('ruleset_version', 1)
+        # Las reglas activas se compilan fuera del try: un config.py inválido lanza RulesetError
+        # (un ValueError), que es un error de configuración y no de este sistema
+        ruleset_actual()
+        try:
+            obtener_ruleset(ruleset_version)
+        except ValueError as e:
+            # Con otras reglas saldría un sistema distinto: nunca se reconstruye con las actuales
+            raise SistemaIrreconstruible(
+                f"El sistema '{entrada['original_name']}' se guardó con las reglas v{ruleset_version}, "
+                f"que no están disponibles: {e}"
+            ) from e
+        materializado = dict(entrada)
+        # Las secciones que no se consulten (depósitos, especies...) no llegan a generarse
+        materializado['system_data'] = self.generator.generar_sistema(
+            semilla=entrada['semilla'], ruleset_version=ruleset_version
+        )
+        return materializado
+
+    def _guardar_solo_semilla(self, ruleset_version):
+        """Si un sistema de esa versión de reglas se puede guardar solo con su semilla
+
+        Solo cuando las reglas están archivadas: si no, tras reiniciar no se
+        podría reconstruir y se guarda el sistema completo.
+        """
+        if ruleset_archivado(ruleset_version):
+            return True
+        logging.warning(f"Reglas v{ruleset_version} sin archivar: el sistema se guarda completo")
+        return False
+
+
+class SystemDatabase(BaseSystemDatabase):
+    """Base de datos en un archivo JSON"""
+
+    def __init__(self, db_file='systems_database.json', generator=None, umbral_compactacion=UMBRAL_COMPACTACION):
+        super().__init__(generator)
         self.db_file = db_file
+        # Cada alta se añade al journal; al pasar del umbral se vuelca todo en una nueva instantánea
+        self.journal_file = db_file + JOURNAL_SUFIJO
+        self.umbral_compactacion = umbral_compactacion
+        self._lock = threading.Lock()
+        # Protege el archivo del journal entre el escritor y la rotación al compactar
+        self._lock_journal = threading.Lock()
+        self._compactacion = None
         self.data = self.load_data()
+        self.indice_nombres = IndiceNombres(self.data['systems'].values())
+        self.indice_exploradores = IndiceExploradores(self.data['systems'].values())
+        self.indice_busqueda = IndiceBusqueda(entrada['original_name'] for entrada in self.data['systems'].values())
+        # Clasificaciones global y por servidor, actualizadas en cada alta
+        self.clasificacion = Clasificacion(self.data['stats']['top_explorers'])
+        self.clasificaciones_guild = clasificaciones_por_guild(self.data['systems'].values())
+        self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        # Las líneas del journal se escriben desde un hilo, juntando las ráfagas en una sola escritura
+        self._escritor = EscritorSegundoPlano(self._escribir_journal, nombre='journal')
     
     def load_data(self):
-        """Carga la base de datos desde el archivo JSON"""
-        if os.path.exists(self.db_file):
-            try:
-                with open(self.db_file, 'r', encoding='utf-8') as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
-                return self.create_empty_database()
-        return self.create_empty_database()
+        """Carga la última instantánea JSON y aplica encima las altas del journal"""
+        for ruta in (self.journal_file + JOURNAL_ROTADO, self.journal_file):
+            if os.path.exists(ruta):
+                self._recortar_journal(ruta)
+        return leer_database_json(self.db_file)
+
+    @staticmethod
+    def _recortar_journal(ruta):
+        """Descarta una última línea a medio escribir, para que las altas nuevas empiecen en una línea limpia"""
+        with open(ruta, 'r+', encoding='utf-8') as f:
+            contenido = f.read()
+            completo = contenido.rfind('\n') + 1
+            if completo < len(contenido):
+                logging.warning(f"Journal {ruta}: se descarta una línea incompleta al final")
+                f.seek(0)
+                f.truncate(len(contenido[:completo].encode('utf-8')))
     
-    def create_empty_database(self):
+    @staticmethod
+    def create_empty_database():
         """Crea una base de datos vacía"""
         return {
             'systems': {},
@@ -28,89 +196,224 @@ class SystemDatabase:
             }
         }
     
-    def save_data(self):
-        """Guarda la base de datos al archivo JSON"""
+    def _escribir_instantanea(self, data):
+        """Escribe la instantánea en un archivo temporal y lo renombra: el archivo anterior sigue válido hasta el final"""
+        temporal = self.db_file + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'), default=serializar_binario)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, self.db_file)
+
+    def _copiar_datos(self):
+        """Copia consistente de los datos para escribirla fuera del lock (las entradas no se modifican tras el alta)"""
+        stats = self.data['stats']
+        return {
+            'systems': dict(self.data['systems']),
+            'stats': {
+                'total_systems': stats['total_systems'],
+                'top_explorers': {k: dict(v) for k, v in stats['top_explorers'].items()}
+            }
+        }
+
+    def _compactar(self, data):
         try:
-            with open(self.db_file, 'w', encoding='utf-8') as f:
-                json.dump(self.data, f, ensure_ascii=False, indent=2)
+            self._escribir_instantanea(data)
+            rotado = self.journal_file + JOURNAL_ROTADO
+            if os.path.exists(rotado):
+                os.remove(rotado)
         except Exception as e:
-            print(f"Error saving database: {e}")
+            logging.error(f"Error al compactar la base de datos: {e}")
+
+    def compactar_journal(self, en_segundo_plano=False):
+        """Vuelca el estado actual en una nueva instantánea y vacía el journal
+
+        El journal se rota antes de copiar los datos, así que las altas que
+        lleguen durante la escritura van al journal nuevo.
+        """
+        with self._lock:
+            if self._compactacion is not None and self._compactacion.is_alive():
+                if not en_segundo_plano:
+                    self._compactacion.join()
+                else:
+                    return self._compactacion
+            rotado = self.journal_file + JOURNAL_ROTADO
+            # Si una compactación anterior falló, su journal rotado sigue haciendo falta: no se pisa
+            if not os.path.exists(rotado):
+                with self._lock_journal:
+                    self._journal.close()
+                    os.replace(self.journal_file, rotado)
+                    self._journal = open(self.journal_file, 'a', encoding='utf-8')
+            data = self._copiar_datos()
+            if en_segundo_plano:
+                self._compactacion = threading.Thread(target=self._compactar, args=(data,), daemon=True)
+                self._compactacion.start()
+                return self._compactacion
+        self._compactar(data)
+
+    def save_data(self):
+        """Guarda la base de datos completa (instantánea nueva y journal vacío)"""
+        self._escritor.vaciar()
+        self.compactar_journal()
+
+    def _escribir_journal(self, lineas):
+        """Escribe un lote de líneas con un solo fsync (se ejecuta en el hilo del escritor)"""
+        with self._lock_journal:
+            self._journal.write(''.join(lineas))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            compactar_ya = self._journal.tell() >= self.umbral_compactacion
+        if compactar_ya:
+            self.compactar_journal(en_segundo_plano=True)
+
+    def close(self):
+        """Escribe las altas pendientes, espera a la compactación en curso y cierra el journal
+
+        Si alguna escritura del journal falló, sus altas solo están en memoria: antes
+        de cerrar se guardan en una instantánea completa.
+        """
+        self._escritor.detener()
+        compactacion = self._compactacion
+        if compactacion is not None:
+            compactacion.join()
+        if self._escritor.errores:
+            logging.warning(f"Journal {self.journal_file}: hubo escrituras fallidas, se compacta al cerrar")
+            self.compactar_journal()
+        with self._lock_journal:
+            self._journal.close()
+
+    def estadisticas_persistencia(self):
+        """Contadores del escritor del journal: cola, escrituras agrupadas y latencia"""
+        return self._escritor.estadisticas()
     
     def system_exists(self, system_name):
         """Verifica si un sistema ya existe"""
-        return system_name.lower() in self.data['systems']
-    
-    def add_system(self, system_name, user_id, user_name, system_data):
-        """Añade un nuevo sistema a la base de datos"""
-        timestamp = datetime.now().isoformat()
-        
-        # Crear clave única para evitar colisiones
-        base_key = system_name.lower()
-        unique_key = base_key
-        counter = 1
-        
-        # Si ya existe, agregar un sufijo numérico
-        while unique_key in self.data['systems']:
-            unique_key = f"{base_key}_{counter}"
-            counter += 1
-        
-        # Añadir sistema con clave única
-        self.data['systems'][unique_key] = {
-            'original_name': system_name,
-            'explorer_id': user_id,
-            'explorer_name': user_name,
-            'timestamp': timestamp,
-            'system_data': system_data,
-            'unique_key': unique_key
-        }
+        return normalizar_nombre(system_name) in self.data['systems']
+
+    @staticmethod
+    def _aplicar_alta(data, unique_key, entrada):
+        """Añade la entrada y actualiza las estadísticas (alta nueva o reproducida del journal)"""
+        data['systems'][unique_key] = entrada
         
         # Actualizar estadísticas
-        self.data['stats']['total_systems'] += 1
+        data['stats']['total_systems'] += 1
         
         # Actualizar top explorers
-        if str(user_id) not in self.data['stats']['top_explorers']:
-            self.data['stats']['top_explorers'][str(user_id)] = {
+        user_id = str(entrada['explorer_id'])
+        user_name = entrada['explorer_name']
+        if user_id not in data['stats']['top_explorers']:
+            data['stats']['top_explorers'][user_id] = {
                 'name': user_name,
                 'systems_explored': 0
             }
         
-        self.data['stats']['top_explorers'][str(user_id)]['systems_explored'] += 1
-        self.data['stats']['top_explorers'][str(user_id)]['name'] = user_name  # Update name in case it changed
+        data['stats']['top_explorers'][user_id]['systems_explored'] += 1
+        data['stats']['top_explorers'][user_id]['name'] = user_name  # Update name in case it changed
+    
+    def _clasificacion_guild(self, guild_id):
+        clasificacion = self.clasificaciones_guild.get(guild_id)
+        if clasificacion is None:
+            clasificacion = self.clasificaciones_guild[guild_id] = Clasificacion()
+        return clasificacion
+
+    def add_system(self, system_name, user_id, user_name, system_data, semilla=None, ruleset_version=None,
+                   guild_id=None):
+        """Añade un nuevo sistema a la base de datos
+
+        Si se indica la semilla con la que se generó, solo se guarda (semilla, versión de reglas)
+        y el sistema se reconstruye al consultarlo. En disco solo se añade una línea al journal,
+        desde el hilo del escritor. guild_id es el servidor donde se exploró (None en mensajes directos).
+        """
+        timestamp = datetime.now().isoformat()
         
-        self.save_data()
+        if semilla is not None:
+            ruleset_version = ruleset_version if ruleset_version is not None else self.generator.ruleset_version
+            if system_data is None or self._guardar_solo_semilla(ruleset_version):
+                datos = {'semilla': semilla, 'ruleset_version': ruleset_version}
+            else:
+                datos = {'system_data': compactar(dict(system_data))}
+        else:
+            datos = {'system_data': compactar(system_data)}
+
+        with self._lock:
+            # Clave única para evitar colisiones: si ya existe, con un sufijo numérico
+            unique_key = self.indice_nombres.clave_libre(system_name, self.data['systems'])
+            entrada = {
+                'original_name': system_name,
+                'explorer_id': user_id,
+                'explorer_name': user_name,
+                'timestamp': timestamp,
+                'unique_key': unique_key,
+                **datos
+            }
+            if guild_id is not None:
+                entrada['guild_id'] = guild_id
+            self._aplicar_alta(self.data, unique_key, entrada)
+            self.clasificacion.actualizar(str(user_id))
+            if guild_id is not None:
+                self._clasificacion_guild(guild_id).registrar(str(user_id), user_name)
+            self.indice_nombres.añadir(entrada)
+            self.indice_exploradores.añadir(entrada)
+            self.indice_busqueda.añadir(system_name)
+        linea = json.dumps(
+            {'key': unique_key, 'entrada': entrada}, ensure_ascii=False, separators=(',', ':'), default=serializar_binario
+        )
+        # El alta ya es visible en memoria; la escritura a disco no bloquea a quien llama
+        self._escritor.encolar(linea + '\n')
     
     def get_system(self, system_name):
         """Obtiene información de un sistema específico - devuelve el más reciente si hay duplicados"""
-        base_key = system_name.lower()
-        
-        # Buscar sistemas que coincidan con el nombre base
-        matching_systems = []
-        for key, system_data in self.data['systems'].items():
-            if key == base_key or key.startswith(f"{base_key}_"):
-                if system_data['original_name'].lower() == base_key:
-                    matching_systems.append((key, system_data))
-        
-        if not matching_systems:
+        entrada = self.indice_nombres.mas_reciente(system_name)
+        if entrada is None:
             return None
-        
-        # Devolver el sistema más reciente
-        matching_systems.sort(key=lambda x: x[1]['timestamp'], reverse=True)
-        return matching_systems[0][1]
+        return self.materializar_sistema(entrada)
     
-    def get_top_explorers(self, limit=10):
-        """Obtiene los mejores exploradores"""
-        explorers = list(self.data['stats']['top_explorers'].items())
-        explorers.sort(key=lambda x: x[1]['systems_explored'], reverse=True)
-        return explorers[:limit]
+    def get_top_explorers(self, limit=10, guild_id=None):
+        """Obtiene los mejores exploradores, globales o de un servidor"""
+        if guild_id is None:
+            return self.clasificacion.top(limit)
+        clasificacion = self.clasificaciones_guild.get(guild_id)
+        return clasificacion.top(limit) if clasificacion else []
     
-    def get_total_systems(self):
-        """Obtiene el número total de sistemas explorados"""
-        return self.data['stats']['total_systems']
+    def get_total_systems(self, guild_id=None):
+        """Obtiene el número total de sistemas explorados, globales o de un servidor"""
+        if guild_id is None:
+            return self.data['stats']['total_systems']
+        clasificacion = self.clasificaciones_guild.get(guild_id)
+        return clasificacion.total_systems if clasificacion else 0
     
     def get_systems_by_explorer(self, user_id):
         """Obtiene todos los sistemas explorados por un usuario específico"""
-        user_systems = []
-        for system_data in self.data['systems'].values():
-            if system_data['explorer_id'] == user_id:
-                user_systems.append(system_data)
-        return sorted(user_systems, key=lambda x: x['timestamp'], reverse=True)
+        entradas = self.indice_exploradores.entradas(user_id)
+        return [self.materializar_sistema(entrada) for entrada in reversed(entradas)]
+
+    def get_systems_page(self, user_id, limit=10, cursor=None):
+        """Página de sistemas de un explorador, del más reciente al más antiguo
+
+        Devuelve (sistemas, cursor); el cursor se pasa tal cual para obtener la
+        página siguiente y es None en la última.
+        """
+        entradas, siguiente = self.indice_exploradores.pagina(user_id, limit, cursor)
+        return [self.materializar_sistema(entrada) for entrada in entradas], siguiente
+
+    def count_systems_by_explorer(self, user_id):
+        """Número de sistemas explorados por un usuario"""
+        return self.indice_exploradores.cantidad(user_id)
+
+    def buscar_nombres(self, texto, limite=25):
+        """Nombres de sistemas guardados que empiezan por el texto o se le parecen, para el autocompletado"""
+        with self._lock:
+            return self.indice_busqueda.sugerencias(texto, limite)
+
+
+def crear_database(backend='json', generator=None, **opciones):
+    """Crea la base de datos del backend indicado ('json', 'sqlite' o 'guilds')"""
+    if backend == 'json':
+        return SystemDatabase(generator=generator, **opciones)
+    if backend == 'sqlite':
+        from sqlite_database import SQLiteSystemDatabase
+        return SQLiteSystemDatabase(generator=generator, **opciones)
+    if backend == 'guilds':
+        from sharded_database import ShardedSystemDatabase
+        return ShardedSystemDatabase(generator=generator, **opciones)
+    raise ValueError(f"Backend de base de datos desconocido: {backend!r} (disponibles: {', '.join(BACKENDS_DATABASE)})")
@@ -0,0 +1,304 @@
+"""
+Exportación masiva de sistemas generados a JSONL o CSV, por bloques y en streaming
+
+Los sistemas se generan y se escriben bloque a bloque, así que la memoria no
+depende de la cantidad exportada. Cada sistema depende solo de la semilla de
+la serie y de su índice (igual que generar_sistemas_multiples con semilla), de
+modo que una exportación interrumpida se puede reanudar donde se quedó.
+
+Uso:
+    python export.py -n 10000000 --semilla 42 -o sistemas.jsonl.gz
+    python export.py -n 10000000 --semilla 42 -o sistemas.jsonl.gz --reanudar
+    python export.py -n 500000 --semilla 42 -o sistemas.csv --desde 250000
+
+Con gzip, cada bloque se escribe como un miembro gzip independiente: si el
+proceso se corta, solo se pierde el bloque a medio escribir.
+"""
+
+import argparse
+import csv
+import gzip
+import io
+import json
+import os
+import sys
+import time
+import zlib
+from solar_system_generator import SolarSystemGenerator, derivar_semilla
+
+FORMATOS = ('jsonl', 'csv')
+LOTE_POR_DEFECTO = 1000
+TAMANO_LECTURA = 1 << 20
+# El nivel por defecto de gzip: el 9 de gzip.compress tarda el doble y comprime apenas un 9% más
+NIVEL_GZIP = 6
+
+COLUMNAS_CSV = (
+    'indice', 'semilla', 'ruleset_version', 'tipo_sistema', 'estrellas', 'habitabilidad', 'generar_cuerpos',
+    'total_planetas', 'total_lunas', 'asteroides', 'planetas_habitables', 'tipos_planetas', 'recurso',
+    'evento', 'megaestructura', 'leviatan', 'tipo_especie', 'nivel_tecnologico', 'rasgos_positivos',
+    'rasgos_negativos'
+)
+SEPARADOR_LISTAS = ';'
+
+
+def fila_csv(indice, semilla, ruleset_version, sistema):
+    """Aplana un sistema en una fila con las columnas de COLUMNAS_CSV"""
+    especies = sistema['especies']
+    return (
+        indice, semilla, ruleset_version, sistema['tipo_sistema'],
+        SEPARADOR_LISTAS.join(sistema['estrellas']), sistema['habitabilidad'], sistema['generar_cuerpos'],
+        sistema['total_planetas'], sistema['total_lunas'], sistema['asteroides'],
+        sistema.get('planetas_habitables', 0),
+        SEPARADOR_LISTAS.join(f"{p['categoria']}:{p['tipo']}" for p in sistema.get('tipos_planetas', ())),
+        sistema['depositos']['recurso'] or '', sistema['evento_especial']['tipo_evento'] or '',
+        sistema['sondeo']['megaestructura'] or '', sistema['leviatanes']['leviatan'] or '',
+        especies['tipo_especie'] or '', especies['nivel_tecnologico'] or '',
+        SEPARADOR_LISTAS.join(especies['rasgos_positivos']), SEPARADOR_LISTAS.join(especies['rasgos_negativos'])
+    )
+
+
+def linea_jsonl(indice, semilla, ruleset_version, sistema):
+    registro = {'indice': indice, 'semilla': semilla, 'ruleset_version': ruleset_version}
+    registro.update(sistema)
+    return json.dumps(registro, ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def _escribir_bloque(formato, bloque):
+    """Texto de un bloque de (índice, semilla, versión, sistema)"""
+    if formato == 'jsonl':
+        return ''.join(linea_jsonl(*elemento) for elemento in bloque)
+    texto = io.StringIO()
+    escritor = csv.writer(texto, lineterminator='\n')
+    escritor.writerows(fila_csv(*elemento) for elemento in bloque)
+    return texto.getvalue()
+
+
+def _cabecera(formato):
+    if formato != 'csv':
+        return ''
+    texto = io.StringIO()
+    csv.writer(texto, lineterminator='\n').writerow(COLUMNAS_CSV)
+    return texto.getvalue()
+
+
+def _lineas_completas(ruta, comprimido):
+    """Cuenta las líneas completas de un archivo ya exportado
+
+    Devuelve (líneas, bytes válidos, última línea). En texto plano los bytes
+    válidos terminan en el último salto de línea; con gzip, al final del último
+    miembro completo. Lo que quede detrás es un bloque a medio escribir.
+    """
+    lineas = 0
+    validos = 0
+    ultima = b''
+    with open(ruta, 'rb') as f:
+        if not comprimido:
+            posicion = 0
+            pendiente = b''
+            while datos := f.read(TAMANO_LECTURA):
+                corte = datos.rfind(b'\n')
+                if corte >= 0:
+                    lineas += datos.count(b'\n')
+                    validos = posicion + corte + 1
+                    ultima = (pendiente + datos[:corte]).rsplit(b'\n', 1)[-1]
+                    pendiente = datos[corte + 1:]
+                else:
+                    pendiente += datos
+                posicion += len(datos)
+            return lineas, validos, ultima
+
+        # Un descompresor por miembro gzip; unused_data marca dónde empieza el siguiente
+        posicion = 0
+        descompresor = zlib.decompressobj(wbits=31)
+        lineas_miembro = 0
+        ultima_miembro = b''
+        while datos := f.read(TAMANO_LECTURA):
+            inicio = posicion
+            posicion += len(datos)
+            while datos:
+                texto = descompresor.decompress(datos)
+                if texto:
+                    lineas_miembro += texto.count(b'\n')
+                    ultima_miembro = (ultima_miembro + texto).rstrip(b'\n').rsplit(b'\n', 1)[-1]
+                if not descompresor.eof:
+                    break
+                sobrante = descompresor.unused_data
+                validos = inicio + len(datos) - len(sobrante)
+                inicio = validos
+                lineas += lineas_miembro
+                ultima = ultima_miembro
+                descompresor = zlib.decompressobj(wbits=31)
+                lineas_miembro = 0
+                ultima_miembro = b''
+                datos = sobrante
+    return lineas, validos, ultima
+
+
+def _semilla_fila(formato, linea):
+    """Semilla del sistema guardada en una línea exportada"""
+    texto = linea.decode('utf-8')
+    if formato == 'jsonl':
+        return json.loads(texto)['semilla']
+    return int(next(csv.reader([texto]))[COLUMNAS_CSV.index('semilla')])
+
+
+def preparar_reanudacion(ruta, formato, comprimido, semilla):
+    """Índice por el que continuar una exportación existente
+
+    Descarta el bloque incompleto del final (si lo hay) y comprueba que la
+    última fila corresponde a la misma serie de semillas. Lanza ValueError si no.
+    """
+    lineas, validos, ultima = _lineas_completas(ruta, comprimido)
+    filas = lineas - 1 if formato == 'csv' and lineas else lineas
+    if filas > 0 and _semilla_fila(formato, ultima) != derivar_semilla(semilla, filas - 1):
+        raise ValueError(
+            f"{ruta} no es una exportación de la semilla {semilla} (o tiene filas de otra serie); no se puede reanudar"
+        )
+    if validos != os.path.getsize(ruta):
+        with open(ruta, 'r+b') as f:
+            f.truncate(validos)
+    return filas, lineas > 0
+
+
+class Progreso:
+    """Informa en stderr de las filas escritas, el ritmo y el tiempo restante"""
+
+    def __init__(self, total, desde, activo=True, intervalo=1.0):
+        self.total = total
+        self.desde = desde
+        self.activo = activo
+        self.intervalo = intervalo
+        self.inicio = time.perf_counter()
+        self._ultimo = 0.0
+
+    def actualizar(self, hechas, final=False):
+        if not self.activo:
+            return
+        ahora = time.perf_counter()
+        if not final and ahora - self._ultimo < self.intervalo:
+            return
+        self._ultimo = ahora
+        transcurrido = ahora - self.inicio
+        ritmo = (hechas - self.desde) / transcurrido if transcurrido > 0 else 0.0
+        restante = (self.total - hechas) / ritmo if ritmo else 0.0
+        porcentaje = 100 * hechas / self.total if self.total else 100.0
+        sys.stderr.write(
+            f"\r{hechas}/{self.total} ({porcentaje:.1f}%)  {ritmo:,.0f} sistemas/s  quedan {restante:,.0f} s   "
+        )
+        if final:
+            sys.stderr.write('\n')
+        sys.stderr.flush()
+
+
+def exportar(generator, destino, cantidad, semilla, formato='jsonl', comprimido=False, desde=0,
+             cabecera=True, lote=LOTE_POR_DEFECTO, ruleset_version=None, progreso=None):
+    """Escribe los sistemas [desde, cantidad) de la serie en 'destino' (archivo binario abierto)
+
+    Devuelve el número de filas escritas.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconocido: {formato!r} (disponibles: {', '.join(FORMATOS)})")
+    if lote <= 0:
+        raise ValueError("El tamaño de bloque debe ser mayor que cero")
+    ruleset_version = generator.ruleset_version if ruleset_version is None else ruleset_version
+
+    def volcar(texto):
+        datos = texto.encode('utf-8')
+        destino.write(gzip.compress(datos, compresslevel=NIVEL_GZIP, mtime=0) if comprimido else datos)
+        destino.flush()
+
+    if cabecera and formato == 'csv':
+        volcar(_cabecera(formato))
+
+    escritas = 0
+    bloque = []
+    for indice, semilla_sistema, sistema in generator.iterar_sistemas(
+            cantidad, semilla, desde=desde, ruleset_version=ruleset_version):
+        bloque.append((indice, semilla_sistema, ruleset_version, sistema))
+        if len(bloque) == lote:
+            volcar(_escribir_bloque(formato, bloque))
+            escritas += len(bloque)
+            bloque.clear()
+            if progreso:
+                progreso.actualizar(desde + escritas)
+    if bloque:
+        volcar(_escribir_bloque(formato, bloque))
+        escritas += len(bloque)
+    if progreso:
+        progreso.actualizar(desde + escritas, final=True)
+    return escritas
+
+
+def _deducir_formato(ruta):
+    nombre = ruta[:-3] if ruta.endswith('.gz') else ruta
+    return 'csv' if nombre.endswith('.csv') else 'jsonl'
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exporta sistemas generados a JSONL o CSV en streaming")
+    parser.add_argument('-n', '--cantidad', type=int, required=True, help="número total de sistemas de la serie")
+    parser.add_argument('--semilla', type=int, required=True, help="semilla de la serie")
+    parser.add_argument('-o', '--salida', default='-', help="archivo de salida ('-' para la salida estándar)")
+    parser.add_argument('--formato', choices=FORMATOS, help="por defecto se deduce de la extensión")
+    parser.add_argument('--gzip', action='store_true', help="comprimir (por defecto si la salida termina en .gz)")
+    parser.add_argument('--lote', type=int, default=LOTE_POR_DEFECTO, help="sistemas por bloque escrito")
+    parser.add_argument('--desde', type=int, default=0, help="índice del primer sistema a exportar")
+    parser.add_argument('--reanudar', action='store_true',
+                        help="continuar una exportación existente desde su última fila completa")
+    parser.add_argument('--ruleset-version', type=int, help="versión de las reglas (por defecto, la activa)")
+    parser.add_argument('--silencioso', action='store_true', help="no mostrar el progreso")
+    args = parser.parse_args(argv)
+
+    if args.cantidad < 0:
+        parser.error("--cantidad no puede ser negativa")
+    if args.lote <= 0:
+        parser.error("--lote debe ser mayor que cero")
+    if not 0 <= args.desde <= args.cantidad:
+        parser.error("--desde debe estar entre 0 y --cantidad")
+
+    a_stdout = args.salida == '-'
+    if a_stdout and args.reanudar:
+        parser.error("--reanudar necesita un archivo de salida")
+    formato = args.formato or ('jsonl' if a_stdout else _deducir_formato(args.salida))
+    comprimido = args.gzip or (not a_stdout and args.salida.endswith('.gz'))
+
+    desde = args.desde
+    cabecera = desde == 0
+    if args.reanudar and os.path.exists(args.salida):
+        try:
+            desde, con_contenido = preparar_reanudacion(args.salida, formato, comprimido, args.semilla)
+        except (ValueError, zlib.error) as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 1
+        cabecera = not con_contenido
+        if desde >= args.cantidad:
+            print(f"{args.salida} ya contiene los {args.cantidad} sistemas", file=sys.stderr)
+            return 0
+        print(f"Reanudando {args.salida} desde el sistema {desde}", file=sys.stderr)
+
+    generator = SolarSystemGenerator()
+    progreso = Progreso(args.cantidad, desde, activo=not args.silencioso)
+    try:
+        if a_stdout:
+            escritas = exportar(generator, sys.stdout.buffer, args.cantidad, args.semilla, formato, comprimido,
+                                desde, cabecera, args.lote, args.ruleset_version, progreso)
+        else:
+            # Se añade al final si se continúa una exportación; si no, se empieza de cero
+            modo = 'ab' if desde > 0 or args.reanudar else 'wb'
+            with open(args.salida, modo) as destino:
+                escritas = exportar(generator, destino, args.cantidad, args.semilla, formato, comprimido,
+                                    desde, cabecera, args.lote, args.ruleset_version, progreso)
+    except KeyboardInterrupt:
+        print("\nExportación interrumpida; puede continuarse con --reanudar", file=sys.stderr)
+        return 130
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    if not args.silencioso:
+        print(f"{escritas} sistemas exportados", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Galaxia procedimental direccionada por coordenadas
+
+Cada celda (x, y) de la galaxia tiene su propia semilla derivada de la semilla
+de la galaxia, así que cualquier sistema existe sin guardarlo: basta con sus
+coordenadas. Las celdas se agrupan en sectores cuadrados que se generan la
+primera vez que se consultan y se guardan en una caché LRU.
+"""
+
+import threading
+from collections import OrderedDict
+from rng_backends import RNGRapido
+from solar_system_generator import SolarSystemGenerator, derivar_semilla
+
+
+class Sector:
+    """Sector generado: sus sistemas ordenados por coordenadas de celda"""
+
+    __slots__ = ('x', 'y', 'sistemas')
+
+    def __init__(self, x, y, sistemas):
+        self.x = x
+        self.y = y
+        # {(x, y) de la celda: SistemaPerezoso}
+        self.sistemas = sistemas
+
+    def __len__(self):
+        return len(self.sistemas)
+
+    def __iter__(self):
+        return iter(self.sistemas.items())
+
+
+class Galaxia:
+    """Universo procedimental: sector (x, y) -> sistemas, generados bajo demanda
+
+    Con la misma semilla, tamaño de sector, densidad y versión de reglas, la
+    galaxia es siempre la misma. Los sistemas son SistemaPerezoso, de modo
+    que recorrer sectores filtrando por estrellas no genera el resto de secciones.
+    """
+
+    def __init__(self, semilla, generator=None, tamano_sector=8, densidad=20, cache_sectores=256,
+                 ruleset_version=None):
+        if tamano_sector <= 0:
+            raise ValueError("El tamaño de sector debe ser mayor que cero")
+        if not 0 <= densidad <= 100:
+            raise ValueError("La densidad debe estar entre 0 y 100")
+        if cache_sectores < 0:
+            raise ValueError("El tamaño de la caché no puede ser negativo")
+        self.semilla = semilla
+        self.generator = generator or SolarSystemGenerator()
+        self.tamano_sector = tamano_sector
+        self.densidad = densidad
+        self.cache_sectores = cache_sectores
+        # La galaxia queda fijada a las reglas con las que se creó
+        self.ruleset_version = self.generator.ruleset_version if ruleset_version is None else ruleset_version
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def sector_de(self, x, y):
+        """Coordenadas del sector que contiene la celda (x, y)"""
+        return x // self.tamano_sector, y // self.tamano_sector
+
+    def semilla_sector(self, sx, sy):
+        return derivar_semilla(self.semilla, 'sector', sx, sy)
+
+    def semilla_celda(self, x, y):
+        return derivar_semilla(self.semilla, 'celda', x, y)
+
+    def _generar_sector(self, sx, sy):
+        """Genera el sector sin pasar por la caché"""
+        rng = RNGRapido(self.semilla_sector(sx, sy))
+        tamano = self.tamano_sector
+        sistemas = {}
+        for dy in range(tamano):
+            for dx in range(tamano):
+                if rng.randrange(100) < self.densidad:
+                    x, y = sx * tamano + dx, sy * tamano + dy
+                    sistemas[(x, y)] = self.generator.generar_sistema(
+                        semilla=self.semilla_celda(x, y), ruleset_version=self.ruleset_version
+                    )
+        return Sector(sx, sy, sistemas)
+
+    def sector(self, sx, sy):
+        """Devuelve el sector (sx, sy), generándolo la primera vez que se consulta"""
+        clave = (sx, sy)
+        with self._lock:
+            sector = self._cache.get(clave)
+            if sector is not None:
+                self._cache.move_to_end(clave)
+                self.aciertos += 1
+                return sector
+            self.fallos += 1
+
+        sector = self._generar_sector(sx, sy)
+        if self.cache_sectores:
+            with self._lock:
+                self._cache[clave] = sector
+                self._cache.move_to_end(clave)
+                while len(self._cache) > self.cache_sectores:
+                    self._cache.popitem(last=False)
+        return sector
+
+    def sistema(self, x, y):
+        """Sistema de la celda (x, y), o None si la celda está vacía"""
+        return self.sector(*self.sector_de(x, y)).sistemas.get((x, y))
+
+    def iterar_region(self, x0, y0, x1, y1):
+        """Itera (coordenadas, sistema) de las celdas en [x0, x1] x [y0, y1], sector a sector
+
+        Los sectores se generan al vuelo y no se guardan en la caché, de modo que
+        recorrer regiones enormes usa memoria constante.
+        """
+        if x1 < x0 or y1 < y0:
+            raise ValueError("La región está vacía: las coordenadas finales deben ser mayores o iguales")
+        sx0, sy0 = self.sector_de(x0, y0)
+        sx1, sy1 = self.sector_de(x1, y1)
+        for sy in range(sy0, sy1 + 1):
+            for sx in range(sx0, sx1 + 1):
+                clave = (sx, sy)
+                with self._lock:
+                    sector = self._cache.get(clave)
+                if sector is None:
+                    sector = self._generar_sector(sx, sy)
+                for (x, y), sistema in sector:
+                    if x0 <= x <= x1 and y0 <= y <= y1:
+                        yield (x, y), sistema
+
+    def estadisticas(self):
+        """Contadores de la caché de sectores"""
+        return {
+            'sectores_en_cache': len(self._cache),
+            'capacidad': self.cache_sectores,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos
+        }
@@ -0,0 +1,280 @@
+"""
+Índices en memoria de la base de datos JSON
+
+- IndiceNombres: entradas por nombre normalizado (original_name en minúsculas),
+  ordenadas por fecha, y el siguiente sufijo libre de cada nombre
+- IndiceExploradores: entradas de cada explorador ordenadas por fecha, con
+  paginación por cursor
+- IndiceBusqueda: nombres por prefijo y por trigramas, sin distinguir
+  mayúsculas ni tildes, para el autocompletado
+
+Se construyen al cargar la base de datos y se actualizan en cada alta, para
+que las consultas no recorran todos los sistemas.
+"""
+
+import unicodedata
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter
+from itertools import islice
+
+
+def normalizar_nombre(nombre):
+    """Forma del nombre con la que se agrupan los sistemas y se construyen las claves"""
+    return nombre.lower()
+
+
+def normalizar_busqueda(texto):
+    """Forma del texto para buscar: sin tildes, sin mayúsculas y con los espacios simplificados"""
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_tildes = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_tildes.casefold().split())
+
+
+def trigramas(texto):
+    """Trigramas de un texto ya normalizado, con relleno para que cuenten el principio y el final"""
+    relleno = f"  {texto} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class IndiceCronologico:
+    """Clave -> entradas ordenadas por timestamp; a igual timestamp, en orden de llegada"""
+
+    def __init__(self):
+        # clave -> (timestamps, entradas), ambas listas en el mismo orden
+        self._grupos = {}
+
+    def __contains__(self, clave):
+        return clave in self._grupos
+
+    def __len__(self):
+        return len(self._grupos)
+
+    def _añadir(self, clave, entrada):
+        timestamps, entradas = self._grupos.setdefault(clave, ([], []))
+        # Las altas llegan casi siempre en orden, así que la inserción suele ser al final
+        posicion = bisect_right(timestamps, entrada['timestamp'])
+        timestamps.insert(posicion, entrada['timestamp'])
+        entradas.insert(posicion, entrada)
+
+    def _mas_reciente(self, clave):
+        grupo = self._grupos.get(clave)
+        if grupo is None:
+            return None
+        timestamps, entradas = grupo
+        return entradas[bisect_left(timestamps, timestamps[-1])]
+
+    def _entradas(self, clave):
+        grupo = self._grupos.get(clave)
+        return list(grupo[1]) if grupo else []
+
+    def _cantidad(self, clave):
+        grupo = self._grupos.get(clave)
+        return len(grupo[1]) if grupo else 0
+
+    def _pagina(self, clave, limite, cursor=None):
+        """Página de entradas de la más reciente a la más antigua
+
+        El cursor es (timestamp, vistas): el timestamp de la última entrada
+        mostrada y cuántas entradas con ese mismo timestamp se han mostrado ya.
+        Devuelve (entradas, cursor de la página siguiente o None). Solo se
+        recorren las entradas de la página.
+        """
+        grupo = self._grupos.get(clave)
+        if grupo is None:
+            return [], None
+        timestamps, entradas = grupo
+        if cursor is None:
+            fin = len(entradas)
+        else:
+            timestamp, vistas = cursor
+            fin = bisect_right(timestamps, timestamp) - vistas
+        inicio = max(0, fin - limite)
+        pagina = entradas[inicio:fin][::-1]
+        if inicio == 0:
+            return pagina, None
+        ultimo = timestamps[inicio]
+        return pagina, (ultimo, bisect_right(timestamps, ultimo) - inicio)
+
+
+class IndiceNombres(IndiceCronologico):
+    """Nombre normalizado -> entradas ordenadas por timestamp"""
+
+    def __init__(self, entradas=()):
+        super().__init__()
+        # nombre -> primer sufijo que puede estar libre (los anteriores están ocupados)
+        self._sufijos = {}
+        for entrada in entradas:
+            self.añadir(entrada)
+
+    def __contains__(self, nombre):
+        return normalizar_nombre(nombre) in self._grupos
+
+    def añadir(self, entrada):
+        """Indexa una entrada por su nombre"""
+        self._añadir(normalizar_nombre(entrada['original_name']), entrada)
+
+    def mas_reciente(self, nombre):
+        """Entrada más reciente con ese nombre, o None
+
+        Si varias comparten el timestamp más reciente, devuelve la primera que
+        llegó, igual que la ordenación estable que hacía get_system.
+        """
+        return self._mas_reciente(normalizar_nombre(nombre))
+
+    def entradas(self, nombre):
+        """Entradas con ese nombre, de la más antigua a la más reciente"""
+        return self._entradas(normalizar_nombre(nombre))
+
+    def clave_libre(self, nombre, claves):
+        """Clave única para un sistema nuevo: nombre, nombre_1, nombre_2...
+
+        Devuelve la primera libre en 'claves', como el bucle original, pero sin
+        volver a probar los sufijos ya asignados: las claves no se borran nunca.
+        """
+        base_key = normalizar_nombre(nombre)
+        if base_key not in claves:
+            return base_key
+        contador = self._sufijos.get(base_key, 1)
+        while f"{base_key}_{contador}" in claves:
+            contador += 1
+        self._sufijos[base_key] = contador + 1
+        return f"{base_key}_{contador}"
+
+
+class IndiceExploradores(IndiceCronologico):
+    """explorer_id -> entradas del explorador ordenadas por timestamp"""
+
+    def __init__(self, entradas=()):
+        super().__init__()
+        for entrada in entradas:
+            self.añadir(entrada)
+
+    def añadir(self, entrada):
+        """Indexa una entrada por su explorador"""
+        self._añadir(entrada['explorer_id'], entrada)
+
+    def entradas(self, explorer_id):
+        """Entradas del explorador, de la más antigua a la más reciente"""
+        return self._entradas(explorer_id)
+
+    def cantidad(self, explorer_id):
+        return self._cantidad(explorer_id)
+
+    def pagina(self, explorer_id, limite, cursor=None):
+        """Página de sistemas del explorador, del más reciente al más antiguo; ver IndiceCronologico._pagina"""
+        return self._pagina(explorer_id, limite, cursor)
+
+
+class IndiceBusqueda:
+    """Búsqueda de nombres de sistemas para el autocompletado
+
+    Los nombres normalizados se guardan ordenados, de modo que los que empiezan
+    por un prefijo forman un tramo contiguo que se localiza con una búsqueda
+    binaria (el recorrido de un trie, sin un objeto por nodo). Para los errores
+    de escritura, un índice invertido de trigramas da los nombres parecidos.
+    """
+
+    # Máximo de apariciones de trigramas que se suman por búsqueda, incluida la primera lista;
+    # con 100.000 nombres la búsqueda más lenta se queda en ~0,25 ms
+    PRESUPUESTO_TRIGRAMAS = 300
+    SIMILITUD_MINIMA = 0.3
+
+    def __init__(self, nombres=()):
+        # nombre normalizado -> {nombre en minúsculas: nombre tal como se guardó}
+        self._variantes = {}
+        # trigrama -> nombres normalizados que lo contienen
+        self._trigramas = {}
+        # nombre normalizado -> número de trigramas distintos, para la similitud
+        self._num_trigramas = {}
+        for nombre in nombres:
+            self._registrar(nombre)
+        self._ordenados = sorted(self._variantes)
+
+    def __len__(self):
+        return len(self._variantes)
+
+    def _registrar(self, nombre):
+        """Guarda el nombre; devuelve su forma normalizada si es nueva"""
+        clave = normalizar_busqueda(nombre)
+        variantes = self._variantes.get(clave)
+        nueva = variantes is None
+        if nueva:
+            variantes = self._variantes[clave] = {}
+            trigramas_clave = trigramas(clave)
+            self._num_trigramas[clave] = len(trigramas_clave)
+            for trigrama in trigramas_clave:
+                self._trigramas.setdefault(trigrama, set()).add(clave)
+        # get_system distingue por minúsculas: se ofrece cada variante una vez
+        variantes.setdefault(normalizar_nombre(nombre), nombre)
+        return clave if nueva else None
+
+    def añadir(self, nombre):
+        """Indexa el nombre de un sistema recién guardado"""
+        clave = self._registrar(nombre)
+        if clave is not None:
+            insort(self._ordenados, clave)
+
+    def _expandir(self, claves, limite, vistos):
+        resultado = []
+        for clave in claves:
+            for nombre in self._variantes[clave].values():
+                if nombre not in vistos:
+                    vistos.add(nombre)
+                    resultado.append(nombre)
+                    if len(resultado) >= limite:
+                        return resultado
+        return resultado
+
+    def por_prefijo(self, texto, limite=25):
+        """Claves normalizadas que empiezan por el texto, en orden alfabético"""
+        prefijo = normalizar_busqueda(texto)
+        ordenados = self._ordenados
+        claves = []
+        i = bisect_left(ordenados, prefijo)
+        while i < len(ordenados) and len(claves) < limite and ordenados[i].startswith(prefijo):
+            claves.append(ordenados[i])
+            i += 1
+        return claves
+
+    def parecidos(self, texto, limite=25):
+        """Claves normalizadas con más trigramas en común con el texto, de más a menos parecidas"""
+        consulta = normalizar_busqueda(texto)
+        if not consulta:
+            return []
+        trigramas_consulta = trigramas(consulta)
+        listas = [self._trigramas[t] for t in trigramas_consulta if t in self._trigramas]
+        # Los trigramas de borde de palabra (con espacios) son los más repetidos: solo
+        # sirven para buscar candidatos si la consulta no tiene otros
+        interiores = [t for t in trigramas_consulta if ' ' not in t]
+        fuentes = [self._trigramas[t] for t in interiores if t in self._trigramas] if interiores else listas
+
+        # Se empieza por los trigramas más raros, que son los que más discriminan
+        candidatos = Counter()
+        restantes = self.PRESUPUESTO_TRIGRAMAS
+        for lista in sorted(fuentes, key=len):
+            if len(lista) > restantes:
+                # Solo una parte de la lista: la búsqueda queda acotada aunque el trigrama sea común
+                candidatos.update(islice(lista, restantes))
+                break
+            candidatos.update(lista)
+            restantes -= len(lista)
+
+        puntuados = []
+        for clave, _ in candidatos.most_common(limite * 2):
+            # Coeficiente de Dice sobre los trigramas completos de ambos
+            comunes = sum(1 for lista in listas if clave in lista)
+            similitud = 2 * comunes / (len(trigramas_consulta) + self._num_trigramas[clave])
+            if similitud >= self.SIMILITUD_MINIMA:
+                puntuados.append((-similitud, clave))
+        puntuados.sort()
+        return [clave for _, clave in puntuados[:limite]]
+
+    def sugerencias(self, texto, limite=25):
+        """Nombres guardados para autocompletar el texto: primero por prefijo, después parecidos"""
+        vistos = set()
+        if not normalizar_busqueda(texto):
+            return self._expandir(self._ordenados[:limite], limite, vistos)
+        resultado = self._expandir(self.por_prefijo(texto, limite), limite, vistos)
+        if len(resultado) < limite:
+            resultado += self._expandir(self.parecidos(texto, limite), limite - len(resultado), vistos)
+        return resultado
@@ -0,0 +1,69 @@
+"""
+Clasificaciones de exploradores mantenidas en cada alta
+
+Los contadores de sistemas solo suben de uno en uno, así que basta con
+guardar los K mejores: un explorador fuera del top solo puede entrar cuando
+sube su propio contador. Consultar el top cuesta O(K), sin ordenar a todos
+los exploradores.
+"""
+
+TOP_MAXIMO = 25
+
+
+class Clasificacion:
+    """Top-K de exploradores por sistemas explorados
+
+    'exploradores' es el diccionario {explorer_id: {'name', 'systems_explored'}}
+    de las estadísticas; a igual número de sistemas se ordenan por orden de
+    aparición en él, como la ordenación estable que hacía get_top_explorers.
+    """
+
+    def __init__(self, exploradores=None, k=TOP_MAXIMO):
+        self.exploradores = {} if exploradores is None else exploradores
+        self.k = k
+        self.total_systems = 0
+        self._orden = {explorer_id: i for i, explorer_id in enumerate(self.exploradores)}
+        # [(-sistemas, orden de aparición, explorer_id)], ordenada y con como mucho k elementos
+        self._top = sorted(
+            (-datos['systems_explored'], self._orden[explorer_id], explorer_id)
+            for explorer_id, datos in self.exploradores.items()
+        )[:k]
+
+    def __len__(self):
+        return len(self.exploradores)
+
+    def actualizar(self, explorer_id):
+        """Recoloca a un explorador cuyo contador acaba de subir en 'exploradores'"""
+        orden = self._orden.setdefault(explorer_id, len(self._orden))
+        clave = (-self.exploradores[explorer_id]['systems_explored'], orden, explorer_id)
+        top = self._top
+        for i, elemento in enumerate(top):
+            if elemento[2] == explorer_id:
+                del top[i]
+                break
+        else:
+            if len(top) >= self.k and clave >= top[-1]:
+                return
+        # K es pequeño: insertar recorriendo la lista es suficiente
+        posicion = len(top)
+        while posicion > 0 and top[posicion - 1] > clave:
+            posicion -= 1
+        top.insert(posicion, clave)
+        del top[self.k:]
+
+    def registrar(self, explorer_id, nombre):
+        """Suma un sistema al explorador (para clasificaciones que son dueñas de su diccionario)"""
+        datos = self.exploradores.setdefault(explorer_id, {'name': nombre, 'systems_explored': 0})
+        datos['systems_explored'] += 1
+        datos['name'] = nombre
+        self.total_systems += 1
+        self.actualizar(explorer_id)
+
+    def top(self, limite=10):
+        """Los 'limite' mejores como [(explorer_id, {'name', 'systems_explored'})]"""
+        if limite > self.k:
+            # Más allá del top mantenido hay que ordenar a todos
+            explorers = list(self.exploradores.items())
+            explorers.sort(key=lambda x: x[1]['systems_explored'], reverse=True)
+            return explorers[:limite]
+        return [(explorer_id, self.exploradores[explorer_id]) for _, _, explorer_id in self._top[:limite]]
@@ -0,0 +1,81 @@
+"""
+Generación masiva en paralelo: reparte la galaxia en shards entre varios procesos
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from rng_backends import crear_rng
+from solar_system_generator import SolarSystemGenerator, derivar_semilla
+
+TAMANO_SHARD = 10000
+
+# Generador propio de cada proceso trabajador
+_generador_proceso = None
+
+
+def _inicializar_proceso():
+    """Crea el generador del proceso trabajador una sola vez"""
+    global _generador_proceso
+    _generador_proceso = SolarSystemGenerator()
+
+
+def _generar_shard(cantidad, semilla, columnar):
+    """Genera un shard completo dentro del proceso trabajador
+
+    Sin columnar, el shard es un único flujo aleatorio sembrado con su semilla:
+    los sistemas de un shard no se direccionan uno a uno, así que no hace falta
+    derivar una semilla y siete generadores por sistema como en iterar_sistemas.
+    """
+    if _generador_proceso is None:
+        _inicializar_proceso()
+    if columnar:
+        return _generador_proceso.generar_lote(cantidad, semilla)
+    generador = SolarSystemGenerator(_generador_proceso.ruleset, rng=crear_rng(semilla=semilla))
+    return [generador.generar_sistema_completo() for _ in range(cantidad)]
+
+
+def semilla_shard(semilla, indice):
+    """Semilla derivada del shard indicado; no depende del número de procesos"""
+    return derivar_semilla(semilla, 'shard', indice)
+
+
+def iterar_shards(cantidad, semilla, procesos=None, tamano_shard=TAMANO_SHARD, columnar=False):
+    """Genera 'cantidad' sistemas en shards y los devuelve en orden, shard a shard
+
+    Cada shard se genera con su propia semilla derivada, así que el resultado
+    combinado es el mismo con cualquier número de procesos. Solo hay unos pocos
+    shards en vuelo a la vez, de modo que la memoria no crece con 'cantidad'.
+    Con columnar=True cada shard es un LoteSistemas en lugar de una lista.
+    """
+    procesos = procesos or os.cpu_count() or 1
+    shards = [
+        (min(tamano_shard, cantidad - inicio), semilla_shard(semilla, indice))
+        for indice, inicio in enumerate(range(0, cantidad, tamano_shard))
+    ]
+
+    if procesos == 1:
+        for cantidad_shard, semilla_del_shard in shards:
+            yield _generar_shard(cantidad_shard, semilla_del_shard, columnar)
+        return
+
+    with ProcessPoolExecutor(max_workers=procesos, initializer=_inicializar_proceso) as executor:
+        pendientes = deque()
+        siguientes = iter(shards)
+        try:
+            for cantidad_shard, semilla_del_shard in siguientes:
+                pendientes.append(executor.submit(_generar_shard, cantidad_shard, semilla_del_shard, columnar))
+                # Limitar los shards en vuelo y entregar en orden
+                if len(pendientes) >= procesos * 2:
+                    yield pendientes.popleft().result()
+            while pendientes:
+                yield pendientes.popleft().result()
+        finally:
+            for futuro in pendientes:
+                futuro.cancel()
+
+
+def generar_galaxia(cantidad, semilla, procesos=None, tamano_shard=TAMANO_SHARD):
+    """Itera sobre 'cantidad' sistemas generados en paralelo, en orden y con el formato habitual"""
+    for shard in iterar_shards(cantidad, semilla, procesos, tamano_shard, columnar=False):
+        yield from shard
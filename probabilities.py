@@ -0,0 +1,255 @@
+"""
+Probabilidades exactas de los resultados del generador, calculadas a partir del ruleset
+
+Las probabilidades se obtienen enumerando todas las combinaciones de tipo de
+sistema y estrellas y recorriendo la lógica del generador con programación
+dinámica, sin muestrear: los resultados son fracciones exactas.
+
+Uso:
+    python probabilities.py                # resumen
+    python probabilities.py --estrellas 20 # además, las 20 combinaciones de estrellas más probables
+    python probabilities.py --json         # todo en JSON
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+from fractions import Fraction
+from functools import lru_cache
+from conditional_generator import Restricciones, combinaciones_estrellas, tabla_condicionada
+from ruleset import ruleset_actual
+
+
+def _habitable(ruleset, estrellas):
+    """Misma regla que SolarSystemGenerator.determinar_habitabilidad"""
+    if any(e in ruleset.estrellas_peligrosas for e in estrellas):
+        return False
+    return any(e in ruleset.estrellas_habitables for e in estrellas)
+
+
+def _con_cuerpos(ruleset, estrellas):
+    return not any(e in ruleset.estrellas_sin_cuerpos for e in estrellas)
+
+
+@lru_cache(maxsize=64)
+def _distribucion_reparto(rango, holgura, num_estrellas, contadas):
+    """Distribución exacta del total que reparte generar_cuerpos_celestes
+
+    Reproduce el reparto entre estrellas: cada estrella salvo la última recibe
+    randint(0, max(1, restante // num_estrellas + holgura)) y la última el resto. Si
+    un tipo de estrella se repite, el diccionario del sistema conserva solo el
+    valor de su última aparición, así que solo suman las posiciones 'contadas'.
+    """
+    minimo, maximo = rango
+    p_total = Fraction(1, maximo - minimo + 1)
+    estados = defaultdict(Fraction)  # (restante, suma contada) -> probabilidad
+    for total in range(minimo, maximo + 1):
+        estados[(total, 0)] += p_total
+
+    for i in range(num_estrellas - 1):
+        siguientes = defaultdict(Fraction)
+        for (restante, suma), p in estados.items():
+            tope = max(1, restante // num_estrellas + holgura)
+            p_valor = p / (tope + 1)
+            for valor in range(tope + 1):
+                siguientes[(restante - valor, suma + valor if i in contadas else suma)] += p_valor
+        estados = siguientes
+
+    ultima = num_estrellas - 1
+    resultado = defaultdict(Fraction)
+    for (restante, suma), p in estados.items():
+        resultado[suma + max(0, restante) if ultima in contadas else suma] += p
+    return dict(resultado)
+
+
+def _posiciones_contadas(estrellas):
+    """Posiciones cuyo valor queda en cuerpos_por_estrella (la última aparición de cada tipo)"""
+    return frozenset(i for i, e in enumerate(estrellas) if e not in estrellas[i + 1:])
+
+
+class Probabilidades:
+    """Probabilidades exactas de un ruleset (todas como Fraction)"""
+
+    def __init__(self, ruleset):
+        self.ruleset = ruleset
+        self._combinaciones = combinaciones_estrellas(ruleset)
+
+    def _suma(self, funcion):
+        return sum((p * funcion(tipo, estrellas) for tipo, estrellas, p in self._combinaciones), Fraction(0))
+
+    def tipos_sistema(self):
+        """P(tipo de sistema)"""
+        sampler = self.ruleset.sampler_tipo_sistema
+        return {o: Fraction(w, sampler.total) for o, w in zip(sampler.opciones, sampler.pesos)}
+
+    def habitable(self):
+        """P(sistema habitable)"""
+        return self._suma(lambda tipo, estrellas: _habitable(self.ruleset, estrellas))
+
+    def con_cuerpos(self):
+        """P(el sistema tiene planetas, lunas y asteroides)"""
+        return self._suma(lambda tipo, estrellas: _con_cuerpos(self.ruleset, estrellas))
+
+    def depositos(self):
+        return Fraction(self.ruleset.prob_depositos, 100)
+
+    def evento(self):
+        return Fraction(self.ruleset.prob_evento, 100)
+
+    def megaestructura(self):
+        """P(sondeo exitoso con megaestructura); siempre hay alguna disponible"""
+        return Fraction(self.ruleset.prob_sondeo, 100)
+
+    def leviatan(self):
+        """P(algún leviatán)"""
+        return self.restricciones(Restricciones(leviatan=True))
+
+    def especies(self):
+        """P(especies inteligentes)"""
+        return self.restricciones(Restricciones(especies=True))
+
+    def restricciones(self, restricciones):
+        """P(un sistema cumpla las restricciones de conditional_generator.Restricciones)"""
+        try:
+            return tabla_condicionada(self.ruleset, restricciones).probabilidad
+        except ValueError:
+            restricciones.validar(self.ruleset)
+            return Fraction(0)
+
+    def megaestructuras(self):
+        """P(cada megaestructura concreta)"""
+        return {
+            m: self.restricciones(Restricciones(megaestructura=m))
+            for m in dict.fromkeys(self.ruleset.megaestructuras)
+        }
+
+    def leviatanes(self):
+        """P(cada leviatán concreto)"""
+        return {l: self.restricciones(Restricciones(leviatan=l)) for l in self.ruleset.leviatanes}
+
+    def recursos(self):
+        """P(cada recurso estratégico)"""
+        recursos = self.ruleset.sampler_recursos.opciones + self.ruleset.recursos_agujero_negro
+        return {r: self.restricciones(Restricciones(recurso=r)) for r in dict.fromkeys(recursos)}
+
+    def combinaciones_estrellas(self):
+        """P(cada combinación de estrellas), sin tener en cuenta el orden"""
+        resultado = defaultdict(Fraction)
+        for tipo, estrellas, p in self._combinaciones:
+            resultado[(tipo, tuple(sorted(estrellas)))] += p
+        return dict(sorted(resultado.items(), key=lambda x: x[1], reverse=True))
+
+    def estrellas(self):
+        """P(el sistema tiene al menos una estrella de cada tipo)"""
+        return {e: self._suma(lambda tipo, estrellas, e=e: e in estrellas) for e in self.ruleset.estrellas}
+
+    def _distribucion_cuerpos(self, rango, holgura):
+        resultado = defaultdict(Fraction)
+        for tipo, estrellas, p in self._combinaciones:
+            if not _con_cuerpos(self.ruleset, estrellas):
+                resultado[0] += p
+                continue
+            reparto = _distribucion_reparto(rango, holgura, len(estrellas), _posiciones_contadas(estrellas))
+            for valor, q in reparto.items():
+                resultado[valor] += p * q
+        return dict(sorted(resultado.items()))
+
+    def total_planetas(self):
+        """Distribución exacta de total_planetas"""
+        return self._distribucion_cuerpos(self.ruleset.rango_planetas, 2)  # misma holgura que generar_cuerpos_celestes
+
+    def total_lunas(self):
+        """Distribución exacta de total_lunas"""
+        return self._distribucion_cuerpos(self.ruleset.rango_lunas, 5)  # misma holgura que generar_cuerpos_celestes
+
+    def resumen(self):
+        """Probabilidades principales en un diccionario"""
+        return {
+            'habitable': self.habitable(),
+            'con_cuerpos': self.con_cuerpos(),
+            'depositos': self.depositos(),
+            'evento': self.evento(),
+            'megaestructura': self.megaestructura(),
+            'leviatan': self.leviatan(),
+            'especies': self.especies()
+        }
+
+
+def probabilidades(ruleset=None):
+    """Motor de probabilidades del ruleset indicado (por defecto, el activo)"""
+    # El ruleset activo se resuelve fuera de la caché: tras /recargar_reglas cambia
+    return _probabilidades(ruleset or ruleset_actual())
+
+
+@lru_cache(maxsize=8)
+def _probabilidades(ruleset):
+    return Probabilidades(ruleset)
+
+
+def media(distribucion):
+    return sum((valor * p for valor, p in distribucion.items()), Fraction(0))
+
+
+def porcentaje(p):
+    """Formatea una probabilidad como porcentaje legible, también las muy pequeñas"""
+    valor = float(p) * 100
+    if valor == 0:
+        return "0%"
+    if valor < 0.01:
+        return f"{valor:.2e}%"
+    return f"{valor:.3f}%"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Probabilidades exactas del generador de sistemas solares")
+    parser.add_argument('--estrellas', type=int, default=10, help="combinaciones de estrellas a mostrar")
+    parser.add_argument('--json', action='store_true', help="imprimir todas las probabilidades en JSON")
+    args = parser.parse_args(argv)
+
+    motor = probabilidades()
+    if args.json:
+        def flotantes(tabla):
+            return {str(clave): float(p) for clave, p in tabla.items()}
+        informe = {
+            'ruleset_version': motor.ruleset.version,
+            'resumen': flotantes(motor.resumen()),
+            'tipos_sistema': flotantes(motor.tipos_sistema()),
+            'estrellas': flotantes(motor.estrellas()),
+            'combinaciones_estrellas': {
+                f"{tipo}: {', '.join(estrellas)}": float(p)
+                for (tipo, estrellas), p in motor.combinaciones_estrellas().items()
+            },
+            'megaestructuras': flotantes(motor.megaestructuras()),
+            'leviatanes': flotantes(motor.leviatanes()),
+            'recursos': flotantes(motor.recursos()),
+            'total_planetas': flotantes(motor.total_planetas()),
+            'total_lunas': flotantes(motor.total_lunas())
+        }
+        print(json.dumps(informe, ensure_ascii=False, indent=2))
+        return 0
+
+    print(f"Probabilidades exactas (reglas v{motor.ruleset.version})\n")
+    for nombre, p in motor.resumen().items():
+        print(f"  {nombre:<28}{porcentaje(p):>14}")
+
+    for titulo, tabla in (('Megaestructuras', motor.megaestructuras()),
+                          ('Leviatanes', motor.leviatanes()),
+                          ('Recursos', motor.recursos())):
+        print(f"\n{titulo}")
+        for nombre, p in sorted(tabla.items(), key=lambda x: x[1], reverse=True):
+            print(f"  {nombre:<40}{porcentaje(p):>14}")
+
+    print("\nCombinaciones de estrellas más probables")
+    for (tipo, estrellas), p in list(motor.combinaciones_estrellas().items())[:args.estrellas]:
+        print(f"  {tipo + ': ' + ', '.join(estrellas):<60}{porcentaje(p):>14}")
+
+    planetas = motor.total_planetas()
+    print(f"\nTotal de planetas (media {float(media(planetas)):.3f})")
+    for valor, p in planetas.items():
+        print(f"  {valor:>3}{porcentaje(p):>14}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,417 @@
+"""
+Reglas de generación compiladas a partir de config.py, con recarga en caliente
+
+Cada versión de reglas que se registra se archiva en rulesets/v<N>.json (las
+tablas validadas), de modo que los sistemas guardados solo con su semilla se
+pueden reconstruir con sus reglas aunque config.py haya cambiado desde entonces.
+Los archivos van en el repositorio junto a config.py: al desplegar una versión
+nueva de las reglas, las anteriores siguen disponibles.
+"""
+
+import hashlib
+import itertools
+import json
+import logging
+import os
+import threading
+import types
+from types import MappingProxyType
+from samplers import AliasSampler, TraitSampler
+
+# Tipos de sistema y número de estrellas de cada uno (en el orden de SYSTEM_PROBABILITIES)
+TIPOS_SISTEMA = ('Unario', 'Binario', 'Trinario')
+NUM_ESTRELLAS_POR_TIPO = MappingProxyType({'Unario': 1, 'Binario': 2, 'Trinario': 3})
+MAX_ESTRELLAS = 3
+
+# Tablas de config.py que intervienen en la generación
+TABLAS_GENERACION = (
+    'SYSTEM_PROBABILITIES', 'STAR_PROBABILITIES', 'HABITABLE_STARS', 'DANGEROUS_STARS', 'NO_BODIES_STARS',
+    'EVENTO_ESPECIAL_PROBABILITY', 'DEPOSITOS_PROBABILITY', 'RECURSOS_ESTRATEGICOS', 'RECURSOS_AGUJERO_NEGRO',
+    'EVENTOS_ESPECIALES', 'SONDEO_PROBABILITY', 'LEVIATANES_PROBABILITY', 'LEVIATANES',
+    'LEVIATANES_RESTRICCIONES', 'MEGAESTRUCTURAS', 'MEGAESTRUCTURAS_RESTRICCIONES',
+    'PLANETAS_HABITABLES_RANGE', 'TIPOS_PLANETAS', 'PLANETS_RANGE', 'MOONS_RANGE', 'ASTEROID_BELTS_RANGE',
+    'TIPOS_PLANETAS_INHABITABLES', 'PLANETAS_INHABITABLES_MAX', 'LUNAS_GASEOSO_RANGE',
+    'ESPECIES_PROBABILITY', 'TIPOS_ESPECIES', 'NIVELES_TECNOLOGICOS', 'RASGOS_POSITIVOS',
+    'RASGOS_NEGATIVOS', 'RASGOS_EXCLUSIVOS'
+)
+
+RUTA_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.py')
+# Archivo de las versiones de reglas registradas (relativo al directorio de trabajo, como las bases de datos)
+DIRECTORIO_RULESETS = 'rulesets'
+
+
+class RulesetError(ValueError):
+    """Las tablas de configuración no son válidas"""
+
+
+def _porcentaje(config, nombre):
+    valor = getattr(config, nombre)
+    if not isinstance(valor, int) or isinstance(valor, bool) or not 0 <= valor <= 100:
+        raise RulesetError(f"{nombre} debe ser un entero entre 0 y 100 (es {valor!r})")
+    return valor
+
+
+def _rango(config, nombre):
+    valor = getattr(config, nombre)
+    if (not isinstance(valor, (tuple, list)) or len(valor) != 2
+            or not all(isinstance(v, int) for v in valor) or not 0 <= valor[0] <= valor[1]):
+        raise RulesetError(f"{nombre} debe ser un par (mínimo, máximo) de enteros no negativos")
+    return tuple(valor)
+
+
+def _lista_no_vacia(config, nombre):
+    valor = getattr(config, nombre)
+    if not valor:
+        raise RulesetError(f"{nombre} no puede estar vacío")
+    return tuple(valor)
+
+
+def _comprobar_conocidos(nombre, valores, conocidos):
+    desconocidos = [v for v in valores if v not in conocidos]
+    if desconocidos:
+        raise RulesetError(f"{nombre} hace referencia a valores desconocidos: {', '.join(map(str, desconocidos))}")
+
+
+def _sampler(nombre, opciones, pesos):
+    try:
+        return AliasSampler(opciones, pesos)
+    except ValueError as e:
+        raise RulesetError(f"{nombre}: {e}") from e
+
+
+class Ruleset:
+    """Tablas de generación validadas, normalizadas e inmutables
+
+    Se compila una vez a partir del módulo config (o cualquier objeto con los
+    mismos nombres) y contiene los muestreadores listos para usar. Un Ruleset
+    no cambia nunca: recargar la configuración crea uno nuevo.
+    """
+
+    def __init__(self, config):
+        s = lambda nombre, valor: object.__setattr__(self, nombre, valor)
+
+        version = getattr(config, 'RULESET_VERSION', None)
+        if not isinstance(version, int) or isinstance(version, bool):
+            raise RulesetError("RULESET_VERSION debe ser un entero")
+        s('version', version)
+
+        # Tipos de sistema y estrellas
+        if len(config.SYSTEM_PROBABILITIES) != len(TIPOS_SISTEMA):
+            raise RulesetError(f"SYSTEM_PROBABILITIES debe tener {len(TIPOS_SISTEMA)} valores")
+        s('tipos_sistema', TIPOS_SISTEMA)
+        s('sampler_tipo_sistema', _sampler('SYSTEM_PROBABILITIES', TIPOS_SISTEMA, config.SYSTEM_PROBABILITIES))
+        s('sampler_estrellas', _sampler('STAR_PROBABILITIES', config.STAR_PROBABILITIES.keys(),
+                                        config.STAR_PROBABILITIES.values()))
+        estrellas = self.sampler_estrellas.opciones
+        s('estrellas', estrellas)
+        for nombre in ('HABITABLE_STARS', 'DANGEROUS_STARS', 'NO_BODIES_STARS'):
+            _comprobar_conocidos(nombre, getattr(config, nombre), estrellas)
+        s('estrellas_habitables', frozenset(config.HABITABLE_STARS))
+        s('estrellas_peligrosas', frozenset(config.DANGEROUS_STARS))
+        s('estrellas_sin_cuerpos', frozenset(config.NO_BODIES_STARS))
+        s('bit_estrella', MappingProxyType({estrella: 1 << i for i, estrella in enumerate(estrellas)}))
+
+        # Cuerpos celestes
+        s('rango_planetas', _rango(config, 'PLANETS_RANGE'))
+        s('rango_lunas', _rango(config, 'MOONS_RANGE'))
+        s('rango_asteroides', _rango(config, 'ASTEROID_BELTS_RANGE'))
+        s('tipos_planetas_inhabitables', _lista_no_vacia(config, 'TIPOS_PLANETAS_INHABITABLES'))
+        s('planetas_inhabitables_max', config.PLANETAS_INHABITABLES_MAX)
+        s('rango_lunas_gaseoso', _rango(config, 'LUNAS_GASEOSO_RANGE'))
+
+        # Depósitos y eventos
+        s('prob_depositos', _porcentaje(config, 'DEPOSITOS_PROBABILITY'))
+        s('sampler_recursos', _sampler('RECURSOS_ESTRATEGICOS', config.RECURSOS_ESTRATEGICOS.keys(),
+                                       config.RECURSOS_ESTRATEGICOS.values()))
+        s('recursos_agujero_negro', _lista_no_vacia(config, 'RECURSOS_AGUJERO_NEGRO'))
+        s('prob_evento', _porcentaje(config, 'EVENTO_ESPECIAL_PROBABILITY'))
+        s('eventos', _lista_no_vacia(config, 'EVENTOS_ESPECIALES'))
+
+        # Planetas habitables
+        s('rango_planetas_habitables', _rango(config, 'PLANETAS_HABITABLES_RANGE'))
+        for categoria, datos in config.TIPOS_PLANETAS.items():
+            if not datos.get('planetas'):
+                raise RulesetError(f"La categoría de planetas '{categoria}' no tiene planetas")
+        s('sampler_categorias_planetas', _sampler(
+            'TIPOS_PLANETAS', config.TIPOS_PLANETAS.keys(),
+            [datos.get('probabilidad') for datos in config.TIPOS_PLANETAS.values()]
+        ))
+        s('planetas_por_categoria', MappingProxyType(
+            {categoria: tuple(datos['planetas']) for categoria, datos in config.TIPOS_PLANETAS.items()}
+        ))
+
+        # Sondeo y megaestructuras
+        s('prob_sondeo', _porcentaje(config, 'SONDEO_PROBABILITY'))
+        megaestructuras = []
+        for categoria, datos in config.MEGAESTRUCTURAS.items():
+            if not isinstance(datos.get('probabilidad'), int) or datos['probabilidad'] < 0:
+                raise RulesetError(f"MEGAESTRUCTURAS['{categoria}'] necesita una probabilidad entera")
+            megaestructuras.extend(datos['estructuras'])
+        s('megaestructuras', tuple(megaestructuras))
+        _comprobar_conocidos('MEGAESTRUCTURAS_RESTRICCIONES', config.MEGAESTRUCTURAS_RESTRICCIONES, megaestructuras)
+        for estructura, permitidas in config.MEGAESTRUCTURAS_RESTRICCIONES.items():
+            _comprobar_conocidos(f"MEGAESTRUCTURAS_RESTRICCIONES['{estructura}']", permitidas, estrellas)
+        s('megaestructuras_genericas', tuple(
+            e for e in config.MEGAESTRUCTURAS.get('comunes', {}).get('estructuras', [])
+            if e not in config.MEGAESTRUCTURAS_RESTRICCIONES
+        ))
+        if not self.megaestructuras_genericas:
+            raise RulesetError("MEGAESTRUCTURAS['comunes'] necesita al menos una estructura sin restricciones")
+
+        # Leviatanes
+        s('prob_leviatanes', _porcentaje(config, 'LEVIATANES_PROBABILITY'))
+        s('leviatanes', _lista_no_vacia(config, 'LEVIATANES'))
+        _comprobar_conocidos('LEVIATANES_RESTRICCIONES', config.LEVIATANES_RESTRICCIONES, self.leviatanes)
+        for leviatan, restriccion in config.LEVIATANES_RESTRICCIONES.items():
+            _comprobar_conocidos(f"LEVIATANES_RESTRICCIONES['{leviatan}']",
+                                 restriccion.get('prohibidos', []) + restriccion.get('solo_en', []), estrellas)
+
+        # Especies y rasgos
+        s('prob_especies', _porcentaje(config, 'ESPECIES_PROBABILITY'))
+        s('tipos_especies', _lista_no_vacia(config, 'TIPOS_ESPECIES'))
+        s('niveles_tecnologicos', _lista_no_vacia(config, 'NIVELES_TECNOLOGICOS'))
+        for nombre in ('RASGOS_POSITIVOS', 'RASGOS_NEGATIVOS'):
+            for rasgo, especies_permitidas in getattr(config, nombre).items():
+                _comprobar_conocidos(f"{nombre}['{rasgo}']", especies_permitidas, self.tipos_especies)
+        _comprobar_conocidos('RASGOS_EXCLUSIVOS', config.RASGOS_EXCLUSIVOS, config.RASGOS_POSITIVOS)
+        for rasgo, excluidos in config.RASGOS_EXCLUSIVOS.items():
+            _comprobar_conocidos(f"RASGOS_EXCLUSIVOS['{rasgo}']", excluidos, config.RASGOS_POSITIVOS)
+        s('sampler_rasgos_positivos',
+          TraitSampler(config.RASGOS_POSITIVOS, self.tipos_especies, config.RASGOS_EXCLUSIVOS, 3))
+        s('sampler_rasgos_negativos', TraitSampler(config.RASGOS_NEGATIVOS, self.tipos_especies, {}, 2))
+
+        # Elegibilidad de megaestructuras y leviatanes por conjunto de estrellas (máscara de bits)
+        s('_config_megaestructuras', config.MEGAESTRUCTURAS)
+        s('_restricciones_megaestructuras', config.MEGAESTRUCTURAS_RESTRICCIONES)
+        s('_restricciones_leviatanes', config.LEVIATANES_RESTRICCIONES)
+        megaestructuras_por_mascara = {}
+        leviatanes_por_mascara = {}
+        for num_estrellas in range(1, MAX_ESTRELLAS + 1):
+            for combinacion in itertools.combinations(estrellas, num_estrellas):
+                mascara = self.mascara_estrellas(combinacion)
+                disponibles, probabilidades = self._megaestructuras_disponibles(combinacion)
+                megaestructuras_por_mascara[mascara] = AliasSampler(disponibles, probabilidades) if disponibles else None
+                leviatanes_por_mascara[mascara] = tuple(self._leviatanes_disponibles(combinacion))
+        s('megaestructuras_por_mascara', MappingProxyType(megaestructuras_por_mascara))
+        s('leviatanes_por_mascara', MappingProxyType(leviatanes_por_mascara))
+
+        # Tablas tal como se archivan (JSON), para reconstruir este ruleset en otro proceso
+        s('tablas', json.loads(json.dumps({nombre: getattr(config, nombre) for nombre in TABLAS_GENERACION})))
+        s('huella', self._calcular_huella(self.tablas))
+
+    def __setattr__(self, nombre, valor):
+        raise AttributeError("Un Ruleset es inmutable; recarga la configuración para cambiarlo")
+
+    def __repr__(self):
+        return f"<Ruleset v{self.version} {self.huella[:12]}>"
+
+    @staticmethod
+    def _calcular_huella(tablas):
+        """Huella de las tablas, para detectar cambios sin incrementar RULESET_VERSION
+
+        Se calcula sobre su forma JSON, así que un ruleset archivado tiene la
+        misma huella que el original (las tuplas se archivan como listas).
+        """
+        contenido = json.dumps([(nombre, tablas[nombre]) for nombre in TABLAS_GENERACION], ensure_ascii=False)
+        return hashlib.sha256(contenido.encode('utf-8')).hexdigest()
+
+    def mascara_estrellas(self, estrellas):
+        """Máscara de bits del conjunto de tipos de estrella; None si hay tipos desconocidos"""
+        mascara = 0
+        for estrella in estrellas:
+            bit = self.bit_estrella.get(estrella)
+            if bit is None:
+                return None
+            mascara |= bit
+        return mascara
+
+    def _megaestructuras_disponibles(self, estrellas):
+        """Devuelve las megaestructuras permitidas para las estrellas dadas y sus probabilidades"""
+        megaestructuras_disponibles = []
+        probabilidades = []
+
+        for categoria, datos in self._config_megaestructuras.items():
+            for estructura in datos['estructuras']:
+                # Verificar restricciones
+                if estructura in self._restricciones_megaestructuras:
+                    tipos_permitidos = self._restricciones_megaestructuras[estructura]
+                    if not any(estrella in tipos_permitidos for estrella in estrellas):
+                        continue  # Saltar esta megaestructura
+
+                megaestructuras_disponibles.append(estructura)
+                probabilidades.append(datos['probabilidad'])
+
+        return megaestructuras_disponibles, probabilidades
+
+    def _leviatanes_disponibles(self, estrellas):
+        """Devuelve los leviatanes que pueden aparecer con las estrellas dadas"""
+        leviatanes_disponibles = []
+
+        for leviatan in self.leviatanes:
+            restriccion = self._restricciones_leviatanes.get(leviatan, {})
+
+            # Prohibido si alguna estrella del sistema está en 'prohibidos'
+            if any(estrella in restriccion.get('prohibidos', ()) for estrella in estrellas):
+                continue
+
+            # Con 'solo_en', alguna estrella del sistema debe estar en la lista
+            if 'solo_en' in restriccion and not any(estrella in restriccion['solo_en'] for estrella in estrellas):
+                continue
+
+            leviatanes_disponibles.append(leviatan)
+
+        return leviatanes_disponibles
+
+    def elegibles(self, estrellas):
+        """Devuelve (sampler de megaestructuras o None, leviatanes) permitidos para las estrellas dadas"""
+        mascara = self.mascara_estrellas(estrellas)
+        leviatanes = self.leviatanes_por_mascara.get(mascara)
+        if leviatanes is not None:
+            return self.megaestructuras_por_mascara[mascara], leviatanes
+
+        # Combinaciones fuera de la tabla (tipos desconocidos o más de tres estrellas)
+        disponibles, probabilidades = self._megaestructuras_disponibles(estrellas)
+        sampler = AliasSampler(disponibles, probabilidades) if disponibles else None
+        return sampler, tuple(self._leviatanes_disponibles(estrellas))
+
+
+def leer_config(ruta=RUTA_CONFIG):
+    """Ejecuta un archivo de configuración en un módulo nuevo, sin tocar el config importado"""
+    modulo = types.ModuleType('config')
+    modulo.__file__ = ruta
+    with open(ruta, 'r', encoding='utf-8') as f:
+        codigo = compile(f.read(), ruta, 'exec')
+    exec(codigo, modulo.__dict__)
+    return modulo
+
+
+_lock = threading.Lock()
+_rulesets_por_version = {}
+_ruleset_actual = None
+
+
+def _ruta_archivo(version):
+    return os.path.join(DIRECTORIO_RULESETS, f"v{version}.json")
+
+
+def _leer_archivo(version):
+    """Contenido archivado de una versión de reglas, o None si no está archivada"""
+    try:
+        with open(_ruta_archivo(version), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except json.JSONDecodeError as e:
+        raise RulesetError(f"El archivo de las reglas v{version} está dañado: {e}") from e
+
+
+def _archivar(ruleset):
+    """Guarda las tablas de un ruleset; si ya estaban archivadas, comprueba que son las mismas"""
+    try:
+        archivado = _leer_archivo(ruleset.version)
+        if archivado is not None:
+            if archivado['huella'] != ruleset.huella:
+                raise RulesetError(
+                    f"Las tablas cambiaron pero RULESET_VERSION sigue siendo {ruleset.version} "
+                    f"(archivada en {_ruta_archivo(ruleset.version)}); "
+                    "increméntala para no alterar los sistemas guardados"
+                )
+            return
+        os.makedirs(DIRECTORIO_RULESETS, exist_ok=True)
+        temporal = _ruta_archivo(ruleset.version) + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({'version': ruleset.version, 'huella': ruleset.huella, 'tablas': ruleset.tablas},
+                      f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporal, _ruta_archivo(ruleset.version))
+    except OSError as e:
+        # Sin archivo, los sistemas de esta versión se guardan completos en lugar de solo con su semilla
+        logging.warning(f"No se pudieron archivar las reglas v{ruleset.version}: {e}")
+
+
+def ruleset_archivado(version):
+    """True si las reglas de esa versión están archivadas y se podrán cargar tras reiniciar"""
+    return os.path.exists(_ruta_archivo(version))
+
+
+def _cargar_archivado(version):
+    """Compila un ruleset desde su archivo; devuelve None si esa versión no está archivada"""
+    archivado = _leer_archivo(version)
+    if archivado is None:
+        return None
+    ruleset = Ruleset(types.SimpleNamespace(RULESET_VERSION=version, **archivado['tablas']))
+    if ruleset.huella != archivado['huella']:
+        raise RulesetError(f"El archivo de las reglas v{version} está dañado (la huella no coincide)")
+    return ruleset
+
+
+def _registrar(ruleset):
+    """Registra y archiva un ruleset por versión; la misma versión no puede tener tablas distintas"""
+    anterior = _rulesets_por_version.get(ruleset.version)
+    if anterior is not None and anterior.huella != ruleset.huella:
+        raise RulesetError(
+            f"Las tablas cambiaron pero RULESET_VERSION sigue siendo {ruleset.version}; "
+            "increméntala para no alterar los sistemas guardados"
+        )
+    if anterior is None:
+        _archivar(ruleset)
+        _rulesets_por_version[ruleset.version] = ruleset
+    return _rulesets_por_version[ruleset.version]
+
+
+def ruleset_actual():
+    """Devuelve el ruleset en uso, compilándolo desde config la primera vez"""
+    if _ruleset_actual is None:
+        with _lock:
+            if _ruleset_actual is None:
+                import config
+                _activar(Ruleset(config))
+    return _ruleset_actual
+
+
+def _activar(ruleset):
+    global _ruleset_actual
+    _ruleset_actual = _registrar(ruleset)
+    return _ruleset_actual
+
+
+def obtener_ruleset(version):
+    """Devuelve el ruleset de una versión, cargándolo de su archivo si no está en este proceso"""
+    ruleset_actual()
+    ruleset = _rulesets_por_version.get(version)
+    if ruleset is None:
+        with _lock:
+            ruleset = _rulesets_por_version.get(version)
+            if ruleset is None:
+                archivado = _cargar_archivado(version)
+                if archivado is not None:
+                    ruleset = _registrar(archivado)
+    if ruleset is None:
+        raise ValueError(
+            f"Versión de reglas {version} no disponible (actual: {_ruleset_actual.version}) "
+            f"ni archivada en {DIRECTORIO_RULESETS}"
+        )
+    return ruleset
+
+
+def cargar_ruleset(ruta=RUTA_CONFIG):
+    """Relee config.py del disco, lo valida y lo activa de forma atómica
+
+    Las generaciones en curso terminan con el ruleset anterior, que queda
+    registrado por versión para reconstruir sistemas guardados con él.
+    Si la configuración no es válida se lanza RulesetError y no cambia nada.
+    """
+    try:
+        config = leer_config(ruta)
+    except (OSError, SyntaxError) as e:
+        raise RulesetError(f"No se pudo leer {ruta}: {e}") from e
+
+    try:
+        nuevo = Ruleset(config)
+    except (AttributeError, KeyError, TypeError) as e:
+        raise RulesetError(f"Configuración incompleta: {e}") from e
+
+    ruleset_actual()
+    with _lock:
+        return _activar(nuevo)
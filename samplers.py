@@ -0,0 +1,153 @@
+"""
+Muestreadores precompilados para las tablas de probabilidad del generador
+"""
+
+import secrets
+
+
+class AliasSampler:
+    """Selección ponderada en tiempo constante mediante una tabla alias (Walker/Vose)
+
+    La tabla se construye una sola vez con aritmética entera, de modo que cada
+    opción sale exactamente con probabilidad peso / total. Cada extracción usa
+    un único número aleatorio y no reserva memoria.
+    """
+
+    __slots__ = ('opciones', 'pesos', 'total', '_n', '_cortes', '_alias', '_opciones_alias')
+
+    def __init__(self, opciones, pesos):
+        opciones = tuple(opciones)
+        pesos = tuple(pesos)
+
+        if not opciones:
+            raise ValueError("AliasSampler necesita al menos una opción")
+        if len(opciones) != len(pesos):
+            raise ValueError("El número de opciones y de pesos no coincide")
+        for peso in pesos:
+            if not isinstance(peso, int) or isinstance(peso, bool) or peso < 0:
+                raise ValueError(f"Peso inválido: {peso!r} (se esperan enteros no negativos)")
+
+        total = sum(pesos)
+        if total <= 0:
+            raise ValueError("La suma de los pesos debe ser mayor que cero")
+
+        n = len(opciones)
+        self.opciones = opciones
+        self.pesos = pesos
+        self.total = total
+        self._n = n
+
+        # Cada columna mide 'total'; el peso escalado de cada opción es peso * n
+        escalados = [peso * n for peso in pesos]
+        umbral = [total] * n
+        alias = list(range(n))
+        pequenos = [i for i, p in enumerate(escalados) if p < total]
+        grandes = [i for i, p in enumerate(escalados) if p >= total]
+
+        while pequenos and grandes:
+            pequeno = pequenos.pop()
+            grande = grandes[-1]
+            umbral[pequeno] = escalados[pequeno]
+            alias[pequeno] = grande
+            escalados[grande] -= total - escalados[pequeno]
+            if escalados[grande] < total:
+                grandes.pop()
+                pequenos.append(grande)
+
+        # La columna i ocupa el rango [i * total, (i + 1) * total)
+        self._cortes = tuple(i * total + umbral[i] for i in range(n))
+        self._alias = tuple(alias)
+        self._opciones_alias = tuple(opciones[a] for a in alias)
+
+    @classmethod
+    def desde_dict(cls, tabla):
+        """Construye el muestreador a partir de un diccionario {opción: peso}"""
+        return cls(tabla.keys(), tabla.values())
+
+    def __len__(self):
+        return self._n
+
+    def elegir_indice(self, randbelow=secrets.randbelow):
+        """Devuelve el índice de una opción según los pesos"""
+        r = randbelow(self._n * self.total)
+        i = r // self.total
+        if r < self._cortes[i]:
+            return i
+        return self._alias[i]
+
+    def elegir(self, randbelow=secrets.randbelow):
+        """Devuelve una opción según los pesos"""
+        r = randbelow(self._n * self.total)
+        i = r // self.total
+        if r < self._cortes[i]:
+            return self.opciones[i]
+        return self._opciones_alias[i]
+
+    def tabla_alias(self):
+        """Devuelve (cortes, alias) para muestrear en bloque fuera de esta clase"""
+        return self._cortes, self._alias
+
+    def probabilidad(self, indice):
+        """Probabilidad exacta de la opción en la posición indicada"""
+        return self.pesos[indice] / self.total
+
+
+class TraitSampler:
+    """Selección sin reemplazo de rasgos de especie con máscaras de bits
+
+    Para cada especie se precalcula una máscara con los rasgos que puede tener y,
+    para cada rasgo, la máscara de rasgos que excluye. Cada extracción elige el
+    k-ésimo bit disponible, lo que equivale a elegir al azar de la lista de rasgos
+    restantes sin construirla ni modificarla.
+    """
+
+    __slots__ = ('rasgos', 'cantidad', 'exclusiones', '_pools', '_pool_libre')
+
+    def __init__(self, rasgos, especies, exclusivos, cantidad):
+        """rasgos: {rasgo: especies permitidas (vacío = todas)}; exclusivos: {rasgo: rasgos excluidos}"""
+        self.rasgos = tuple(rasgos)
+        self.cantidad = cantidad
+        indice = {rasgo: i for i, rasgo in enumerate(self.rasgos)}
+
+        exclusiones = [0] * len(self.rasgos)
+        for rasgo, excluidos in exclusivos.items():
+            if rasgo in indice:
+                for excluido in excluidos:
+                    if excluido in indice:
+                        exclusiones[indice[rasgo]] |= 1 << indice[excluido]
+        self.exclusiones = tuple(exclusiones)
+
+        # Rasgos sin restricción de especie
+        self._pool_libre = 0
+        for i, especies_permitidas in enumerate(rasgos.values()):
+            if not especies_permitidas:
+                self._pool_libre |= 1 << i
+
+        self._pools = {}
+        for especie in especies:
+            pool = self._pool_libre
+            for i, especies_permitidas in enumerate(rasgos.values()):
+                if especie in especies_permitidas:
+                    pool |= 1 << i
+            self._pools[especie] = pool
+
+    def pool(self, especie):
+        """Máscara de rasgos que puede tener la especie"""
+        return self._pools.get(especie, self._pool_libre)
+
+    def elegir(self, especie, randbelow=secrets.randbelow):
+        """Elige hasta 'cantidad' rasgos únicos para la especie respetando exclusiones"""
+        disponibles = self._pools.get(especie, self._pool_libre)
+        seleccionados = []
+
+        while len(seleccionados) < self.cantidad and disponibles:
+            # Localizar el k-ésimo rasgo disponible (en el orden de la tabla)
+            mascara = disponibles
+            for _ in range(randbelow(disponibles.bit_count())):
+                mascara &= mascara - 1
+            i = (mascara & -mascara).bit_length() - 1
+
+            seleccionados.append(self.rasgos[i])
+            disponibles &= ~((1 << i) | self.exclusiones[i])
+
+        return seleccionados
@@ -0,0 +1,245 @@
+"""
+Backend de la base de datos particionado por servidor
+
+Cada servidor (guild) tiene su propia base de datos JSON con journal
+(SystemDatabase) en un directorio: guild_<id>.json, y sin_servidor.json para
+los mensajes directos y los sistemas guardados antes de que se registrara el
+servidor. Al arrancar solo se lee resumen.json, con las estadísticas
+globales, así que el arranque no depende del número de servidores.
+
+La partición de un servidor se carga con su primer comando. Cuando la memoria
+estimada de las particiones cargadas supera el presupuesto, se descargan las
+que llevan más tiempo sin usarse (escribiendo antes sus altas pendientes).
+
+La primera vez, si existe systems_database.json, se reparte entre las
+particiones según el guild_id de cada sistema.
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from background_writer import EscritorSegundoPlano
+from binary_system import serializar_binario
+from database import JOURNAL_SUFIJO, BaseSystemDatabase, SystemDatabase, leer_database_json
+from leaderboard import Clasificacion
+
+RESUMEN = 'resumen.json'
+PARTICION_SIN_SERVIDOR = 'sin_servidor.json'
+# Memoria aproximada de un sistema cargado (entrada, índices y clasificaciones), medida con tracemalloc
+BYTES_POR_SISTEMA = 2500
+PRESUPUESTO_MEMORIA = 256 << 20
+
+
+def archivo_particion(guild_id):
+    """Nombre del archivo de la partición de un servidor (None: mensajes directos)"""
+    return PARTICION_SIN_SERVIDOR if guild_id is None else f"guild_{guild_id}.json"
+
+
+def _escribir_json(ruta, data):
+    """Escribe en un archivo temporal y lo renombra, como las instantáneas de SystemDatabase"""
+    temporal = ruta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'), default=serializar_binario)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temporal, ruta)
+
+
+class ParticionServidor(SystemDatabase):
+    """Sistemas de un servidor
+
+    Los nombres que no están en el servidor se buscan también en la partición
+    sin servidor, donde quedan los sistemas anteriores al particionado.
+    """
+
+    def __init__(self, db_file, generator, almacen, guild_id):
+        super().__init__(db_file, generator)
+        self._almacen = almacen
+        self.guild_id = guild_id
+
+    def system_exists(self, system_name):
+        if super().system_exists(system_name):
+            return True
+        return self.guild_id is not None and self._almacen.particion(None).system_exists(system_name)
+
+    def get_system(self, system_name):
+        sistema = super().get_system(system_name)
+        if sistema is None and self.guild_id is not None:
+            return self._almacen.particion(None).get_system(system_name)
+        return sistema
+
+    def buscar_nombres(self, texto, limite=25):
+        nombres = super().buscar_nombres(texto, limite)
+        if len(nombres) < limite and self.guild_id is not None:
+            vistos = set(nombres)
+            compartidos = self._almacen.particion(None).buscar_nombres(texto, limite)
+            nombres += [nombre for nombre in compartidos if nombre not in vistos][:limite - len(nombres)]
+        return nombres
+
+    def memoria_estimada(self):
+        return len(self.data['systems']) * BYTES_POR_SISTEMA
+
+
+class ShardedSystemDatabase(BaseSystemDatabase):
+    """Base de datos con una partición por servidor, cargadas bajo demanda
+
+    Las altas se hacen con add_system del almacén, que mantiene también el
+    resumen global. Las consultas de un servidor van a particion(guild_id);
+    una partición descargada sigue sirviendo para consultas, pero no admite
+    altas.
+    """
+
+    def __init__(self, directorio='systems_guilds', generator=None, presupuesto_memoria=PRESUPUESTO_MEMORIA,
+                 migrar_desde='systems_database.json'):
+        super().__init__(generator)
+        self.directorio = directorio
+        self.presupuesto_memoria = presupuesto_memoria
+        # Reentrante: la búsqueda en la partición sin servidor puede cargarla mientras se usa otra
+        self._lock = threading.RLock()
+        # guild_id -> ParticionServidor, de la usada hace más tiempo a la más reciente
+        self._particiones = OrderedDict()
+        self.cargas = 0
+        self.descargas = 0
+        os.makedirs(directorio, exist_ok=True)
+        self.resumen_file = os.path.join(directorio, RESUMEN)
+        if not os.path.exists(self.resumen_file):
+            # Las altas más recientes de la base JSON pueden estar solo en su journal
+            if migrar_desde and (os.path.exists(migrar_desde) or os.path.exists(migrar_desde + JOURNAL_SUFIJO)):
+                migrados = self.migrar_json(migrar_desde)
+                logging.info(f"{migrados} sistemas de {migrar_desde} repartidos por servidor en {directorio}")
+            else:
+                _escribir_json(self.resumen_file, {'total_systems': 0, 'top_explorers': {}})
+
+        with open(self.resumen_file, 'r', encoding='utf-8') as f:
+            resumen = json.load(f)
+        self.clasificacion = Clasificacion(resumen['top_explorers'])
+        self.clasificacion.total_systems = resumen['total_systems']
+        # El resumen se reescribe entero desde un hilo; una ráfaga de altas cuesta una sola escritura
+        self._escritor = EscritorSegundoPlano(self._escribir_resumen, nombre='resumen')
+
+    def migrar_json(self, json_file):
+        """Reparte una base de datos JSON de SystemDatabase (instantánea y journal) en particiones
+
+        Devuelve el número de sistemas repartidos.
+        """
+        # Solo se lee: la base JSON queda como estaba
+        data = leer_database_json(json_file)
+
+        particiones = {}
+        for unique_key, entrada in data['systems'].items():
+            guild_id = entrada.get('guild_id')
+            if guild_id not in particiones:
+                particiones[guild_id] = SystemDatabase.create_empty_database()
+            SystemDatabase._aplicar_alta(particiones[guild_id], unique_key, entrada)
+        for guild_id, datos in particiones.items():
+            _escribir_json(os.path.join(self.directorio, archivo_particion(guild_id)), datos)
+        # El resumen se escribe al final: si falta, la migración no terminó y se repite
+        _escribir_json(self.resumen_file, data['stats'])
+        return len(data['systems'])
+
+    def _escribir_resumen(self, _):
+        with self._lock:
+            resumen = {
+                'total_systems': self.clasificacion.total_systems,
+                'top_explorers': {k: dict(v) for k, v in self.clasificacion.exploradores.items()}
+            }
+        _escribir_json(self.resumen_file, resumen)
+
+    def particion(self, guild_id):
+        """Partición de un servidor (None: mensajes directos); la carga si no está en memoria"""
+        with self._lock:
+            particion = self._particiones.get(guild_id)
+            if particion is not None:
+                self._particiones.move_to_end(guild_id)
+                return particion
+            particion = ParticionServidor(
+                os.path.join(self.directorio, archivo_particion(guild_id)), self.generator, self, guild_id
+            )
+            self._particiones[guild_id] = particion
+            self.cargas += 1
+            self._liberar_memoria()
+            return particion
+
+    def memoria_estimada(self):
+        """Memoria aproximada de las particiones cargadas, en bytes"""
+        with self._lock:
+            return sum(particion.memoria_estimada() for particion in self._particiones.values())
+
+    def _liberar_memoria(self):
+        """Descarga las particiones menos usadas hasta quedar dentro del presupuesto (nunca la última usada)"""
+        while len(self._particiones) > 1 and self.memoria_estimada() > self.presupuesto_memoria:
+            guild_id, particion = self._particiones.popitem(last=False)
+            particion.close()
+            self.descargas += 1
+            logging.info(f"Partición {archivo_particion(guild_id)} descargada por falta de memoria")
+
+    def close(self):
+        """Escribe lo pendiente de todas las particiones cargadas y del resumen"""
+        with self._lock:
+            for particion in self._particiones.values():
+                particion.close()
+            self._particiones.clear()
+        self._escritor.detener()
+
+    def estadisticas_persistencia(self):
+        """Particiones cargadas, cargas y descargas, y el escritor del resumen"""
+        with self._lock:
+            return {
+                'particiones_cargadas': len(self._particiones),
+                'memoria_estimada_mb': self.memoria_estimada() / (1 << 20),
+                'cargas': self.cargas,
+                'descargas': self.descargas,
+                'resumen': self._escritor.estadisticas()
+            }
+
+    def system_exists(self, system_name, guild_id=None):
+        """Verifica si un sistema ya existe en el servidor"""
+        return self.particion(guild_id).system_exists(system_name)
+
+    def add_system(self, system_name, user_id, user_name, system_data, semilla=None, ruleset_version=None,
+                   guild_id=None):
+        """Añade un nuevo sistema a la partición de su servidor y al resumen global"""
+        with self._lock:
+            # Bajo el lock del almacén la partición no puede descargarse a mitad del alta
+            self.particion(guild_id).add_system(
+                system_name, user_id, user_name, system_data, semilla=semilla, ruleset_version=ruleset_version,
+                guild_id=guild_id
+            )
+            self.clasificacion.registrar(str(user_id), user_name)
+            self._liberar_memoria()
+        self._escritor.encolar(None)
+
+    def get_system(self, system_name, guild_id=None):
+        """Obtiene información de un sistema del servidor - devuelve el más reciente si hay duplicados"""
+        return self.particion(guild_id).get_system(system_name)
+
+    def buscar_nombres(self, texto, limite=25, guild_id=None):
+        """Nombres de sistemas del servidor que empiezan por el texto o se le parecen"""
+        return self.particion(guild_id).buscar_nombres(texto, limite)
+
+    def get_systems_by_explorer(self, user_id, guild_id=None):
+        """Obtiene todos los sistemas explorados por un usuario en el servidor"""
+        return self.particion(guild_id).get_systems_by_explorer(user_id)
+
+    def get_systems_page(self, user_id, limit=10, cursor=None, guild_id=None):
+        """Página de sistemas de un explorador en el servidor; ver SystemDatabase.get_systems_page"""
+        return self.particion(guild_id).get_systems_page(user_id, limit, cursor)
+
+    def count_systems_by_explorer(self, user_id, guild_id=None):
+        """Número de sistemas explorados por un usuario en el servidor"""
+        return self.particion(guild_id).count_systems_by_explorer(user_id)
+
+    def get_top_explorers(self, limit=10, guild_id=None):
+        """Obtiene los mejores exploradores, globales o de un servidor"""
+        if guild_id is None:
+            with self._lock:
+                return self.clasificacion.top(limit)
+        return self.particion(guild_id).get_top_explorers(limit, guild_id)
+
+    def get_total_systems(self, guild_id=None):
+        """Obtiene el número total de sistemas explorados, globales o de un servidor"""
+        if guild_id is None:
+            return self.clasificacion.total_systems
+        return self.particion(guild_id).get_total_systems(guild_id)
@@ -1,73 +1,177 @@
-import random
-import secrets
-from config import (STAR_PROBABILITIES, SYSTEM_PROBABILITIES, HABITABLE_STARS, DANGEROUS_STARS, 
-                   NO_BODIES_STARS, DEPOSITOS_PROBABILITY, RECURSOS_ESTRATEGICOS, 
-                   RECURSOS_AGUJERO_NEGRO, EVENTO_ESPECIAL_PROBABILITY, EVENTOS_ESPECIALES,
-                   PLANETAS_HABITABLES_RANGE, TIPOS_PLANETAS, SONDEO_PROBABILITY,
-                   MEGAESTRUCTURAS, MEGAESTRUCTURAS_RESTRICCIONES, LEVIATANES_PROBABILITY,
-                   LEVIATANES, LEVIATANES_RESTRICCIONES, ESPECIES_PROBABILITY, TIPOS_ESPECIES,
-                   NIVELES_TECNOLOGICOS, RASGOS_POSITIVOS, RASGOS_NEGATIVOS, RASGOS_EXCLUSIVOS)
+import hashlib
+import struct
+from collections.abc import Mapping
+from rng_backends import RNGSeccion, crear_rng
+from ruleset import NUM_ESTRELLAS_POR_TIPO, obtener_ruleset, ruleset_actual
+
+# Secciones del sistema que se generan con su propia sub-semilla
+SECCIONES_SISTEMA = ('nucleo', 'planetas', 'depositos', 'evento', 'sondeo', 'leviatanes', 'especies')
+# Secciones que un SistemaPerezoso genera solo cuando se leen
+SECCIONES_DIFERIDAS = ('depositos', 'evento', 'planetas', 'sondeo', 'leviatanes', 'especies')
+
+# Sección diferida que genera cada campo
+SECCION_POR_CLAVE = {
+    'depositos': 'depositos',
+    'evento_especial': 'evento',
+    'planetas_habitables': 'planetas',
+    'tipos_planetas': 'planetas',
+    'tipos_planetas_inhabitables': 'planetas',
+    'lunas_planeta_gaseoso': 'planetas',
+    'sondeo': 'sondeo',
+    'leviatanes': 'leviatanes',
+    'especies': 'especies'
+}
+
+CLAVES_NUCLEO = (
+    'tipo_sistema', 'estrellas', 'habitabilidad', 'generar_cuerpos',
+    'cuerpos_por_estrella', 'asteroides', 'total_planetas', 'total_lunas'
+)
+CLAVES_INHABITABLES = ('tipos_planetas_inhabitables', 'lunas_planeta_gaseoso')
+CLAVES_DIFERIDAS = (
+    'depositos', 'evento_especial', 'planetas_habitables', 'tipos_planetas',
+    'sondeo', 'leviatanes', 'especies'
+)
+
+def derivar_semilla(semilla, *etiquetas):
+    """Deriva una sub-semilla estable de 64 bits a partir de una semilla y unas etiquetas"""
+    texto = ':'.join(str(parte) for parte in (semilla, *etiquetas))
+    digest = hashlib.blake2b(texto.encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+_SUB_SEMILLAS = struct.Struct(f'>{len(SECCIONES_SISTEMA)}Q')
+
+def semillas_secciones(semilla):
+    """Sub-semilla de 64 bits de cada sección de un sistema, todas de un mismo hash de la semilla"""
+    digest = hashlib.blake2b(str(semilla).encode('utf-8'), digest_size=8 * len(SECCIONES_SISTEMA)).digest()
+    return dict(zip(SECCIONES_SISTEMA, _SUB_SEMILLAS.unpack(digest)))
+
+def claves_sistema(nucleo):
+    """Claves del diccionario del sistema, en el orden de generar_sistema_completo"""
+    if nucleo['habitabilidad'] == "Inhabitable" and nucleo['generar_cuerpos']:
+        return CLAVES_NUCLEO + CLAVES_INHABITABLES + CLAVES_DIFERIDAS
+    return CLAVES_NUCLEO + CLAVES_DIFERIDAS
+
+class SistemaPerezoso(Mapping):
+    """Sistema generado cuyas secciones poco frecuentes se calculan al leerlas
+
+    Se comporta como el diccionario de generar_sistema_completo (mismas claves,
+    mismo orden y mismos valores para la misma semilla), pero solo genera por
+    adelantado los campos básicos. Cada sección diferida tiene su propia
+    sub-semilla, así que el resultado no depende del orden en que se lean.
+    """
+
+    __slots__ = ('semilla', '_generator', '_semillas', '_datos', '_claves', '_pendientes')
+
+    def __init__(self, generator, semilla):
+        self.semilla = semilla
+        self._generator = generator
+        self._semillas = semillas_secciones(semilla)
+        self._datos = generator._generar_nucleo(RNGSeccion(self._semillas['nucleo']))
+        self._claves = claves_sistema(self._datos)
+        self._pendientes = set(SECCIONES_DIFERIDAS)
+
+    def _materializar(self, seccion):
+        rng = RNGSeccion(self._semillas[seccion])
+        self._datos.update(self._generator._generar_seccion(seccion, self._datos, rng))
+        self._pendientes.discard(seccion)
+
+    def __getitem__(self, clave):
+        if clave not in self._datos:
+            seccion = SECCION_POR_CLAVE.get(clave)
+            if seccion not in self._pendientes or clave not in self._claves:
+                raise KeyError(clave)
+            self._materializar(seccion)
+        return self._datos[clave]
+
+    def __contains__(self, clave):
+        return clave in self._claves
+
+    def __iter__(self):
+        return iter(self._claves)
+
+    def __len__(self):
+        return len(self._claves)
+
+    def __repr__(self):
+        pendientes = ', '.join(sorted(self._pendientes)) or 'ninguna'
+        return f"<SistemaPerezoso {self._datos['tipo_sistema']} {self._datos['estrellas']} (pendientes: {pendientes})>"
+
+    @property
+    def materializado(self):
+        """True si ya se generaron todas las secciones"""
+        return not self._pendientes
+
+    def a_dict(self):
+        """Genera las secciones pendientes y devuelve el diccionario completo"""
+        return {clave: self[clave] for clave in self._claves}
 
 class SolarSystemGenerator:
-    def __init__(self):
-        """Inicializa el generador de sistemas solares"""
-        self.system_types = ['Unario', 'Binario', 'Trinario']
-        self.system_probabilities = SYSTEM_PROBABILITIES
-        self.star_probabilities = STAR_PROBABILITIES
-        self.habitable_stars = HABITABLE_STARS
-        self.dangerous_stars = DANGEROUS_STARS
-        self.no_bodies_stars = NO_BODIES_STARS
-
-    def _weighted_choice(self, choices, weights):
-        """Selección aleatoria basada en pesos/probabilidades"""
-        # Usar secrets para mayor seguridad en la aleatoriedad
-        total = sum(weights)
-        r = secrets.randbelow(total)
-        upto = 0
-        for choice, weight in zip(choices, weights):
-            if upto + weight >= r:
-                return choice
-            upto += weight
-        return choices[-1]  # Fallback
-
-    def generar_tipo_sistema(self):
+    def __init__(self, ruleset=None, rng=None):
+        """Inicializa el generador de sistemas solares
+
+        Sin ruleset, el generador sigue al ruleset activo (ver ruleset.cargar_ruleset);
+        con uno concreto, queda fijado a esas reglas. 'rng' es el generador aleatorio
+        de las generaciones sin semilla y de las semillas nuevas (ver rng_backends);
+        por defecto, un PRNG rápido propio de esta instancia. Las generaciones con
+        semilla usan siempre el PRNG con semilla para ser reproducibles.
+        """
+        self._ruleset_fijo = ruleset
+        self.rng = rng if rng is not None else crear_rng()
+        # Generador fijado al ruleset de la generación en curso
+        self._fijado = None
+        # Motores en bloque (NumPy) por ruleset, se crean al primer uso
+        self._batch = None
+
+    @property
+    def ruleset(self):
+        """Reglas de generación en uso"""
+        return self._ruleset_fijo or ruleset_actual()
+
+    @property
+    def ruleset_version(self):
+        """Versión de las reglas en uso"""
+        return self.ruleset.version
+
+    def _fijar(self, ruleset):
+        """Devuelve un generador fijado a 'ruleset' que comparte el rng de este"""
+        if ruleset is self._ruleset_fijo:
+            return self
+        fijado = self._fijado
+        if fijado is None or fijado._ruleset_fijo is not ruleset:
+            fijado = SolarSystemGenerator(ruleset, rng=self.rng)
+            self._fijado = fijado
+        return fijado
+
+    def generar_tipo_sistema(self, rng=None):
         """Genera el tipo de sistema solar (Unario, Binario, Trinario)"""
-        return self._weighted_choice(
-            self.system_types, 
-            self.system_probabilities
-        )
+        rng = rng or self.rng
+        return self.ruleset.sampler_tipo_sistema.elegir(rng.randrange)
 
-    def generar_estrella(self):
+    def generar_estrella(self, rng=None):
         """Genera una estrella individual con probabilidades específicas"""
-        estrellas = list(self.star_probabilities.keys())
-        probabilidades = list(self.star_probabilities.values())
+        rng = rng or self.rng
+        return self.ruleset.sampler_estrellas.elegir(rng.randrange)
 
-        return self._weighted_choice(estrellas, probabilidades)
-
-    def generar_estrellas_sistema(self, tipo_sistema):
+    def generar_estrellas_sistema(self, tipo_sistema, rng=None):
         """Genera las estrellas para un sistema según su tipo"""
-        num_estrellas = {
-            'Unario': 1,
-            'Binario': 2,
-            'Trinario': 3
-        }
-
         estrellas = []
-        for _ in range(num_estrellas[tipo_sistema]):
-            estrellas.append(self.generar_estrella())
+        for _ in range(NUM_ESTRELLAS_POR_TIPO[tipo_sistema]):
+            estrellas.append(self.generar_estrella(rng))
 
         return estrellas
 
     def determinar_habitabilidad(self, estrellas):
         """Determina si el sistema es habitable o inhabitable"""
+        ruleset = self.ruleset
+
         # Verificar si hay estrellas peligrosas
         for estrella in estrellas:
-            if estrella in self.dangerous_stars:
+            if estrella in ruleset.estrellas_peligrosas:
                 return "Inhabitable"
 
         # Verificar si hay estrellas habitables
         for estrella in estrellas:
-            if estrella in self.habitable_stars:
+            if estrella in ruleset.estrellas_habitables:
                 return "Habitable"
 
         # Si no hay estrellas habitables ni peligrosas, es inhabitable
@@ -75,16 +179,19 @@ class SolarSystemGenerator:
 
     def puede_generar_cuerpos(self, estrellas):
         """Determina si se pueden generar planetas, lunas y asteroides"""
+        sin_cuerpos = self.ruleset.estrellas_sin_cuerpos
         for estrella in estrellas:
-            if estrella in self.no_bodies_stars:
+            if estrella in sin_cuerpos:
                 return False
         return True
 
-    def generar_cuerpos_celestes(self, estrellas):
+    def generar_cuerpos_celestes(self, estrellas, rng=None):
         """Genera planetas, lunas y cinturones de asteroides organizados por estrella"""
-        total_planetas = random.randint(1, 16)
-        total_lunas = random.randint(1, 27)
-        asteroides = random.randint(0, 3)
+        rng = rng or self.rng
+        ruleset = self.ruleset
+        total_planetas = rng.randint(*ruleset.rango_planetas)
+        total_lunas = rng.randint(*ruleset.rango_lunas)
+        asteroides = rng.randint(*ruleset.rango_asteroides)
 
         # Distribuir planetas entre las estrellas
         cuerpos_por_estrella = {}
@@ -97,8 +204,8 @@ class SolarSystemGenerator:
                 lunas_estrella = total_lunas
             else:
                 # Distribuir proporcionalmente
-                planetas_estrella = random.randint(0, max(1, total_planetas // num_estrellas + 2))
-                lunas_estrella = random.randint(0, max(1, total_lunas // num_estrellas + 5))
+                planetas_estrella = rng.randint(0, max(1, total_planetas // num_estrellas + 2))
+                lunas_estrella = rng.randint(0, max(1, total_lunas // num_estrellas + 5))
                 total_planetas -= planetas_estrella
                 total_lunas -= lunas_estrella
 
@@ -114,14 +221,24 @@ class SolarSystemGenerator:
             'total_lunas': sum(data['lunas'] for data in cuerpos_por_estrella.values())
         }
 
-    def generar_sistema_completo(self):
-        """Genera un sistema solar completo con todas sus características"""
+    def _rngs_secciones(self, semilla):
+        """Devuelve un generador aleatorio por sección; con semilla cada sección tiene su propio flujo"""
+        if semilla is None:
+            return dict.fromkeys(SECCIONES_SISTEMA, self.rng)
+        return {seccion: RNGSeccion(sub_semilla) for seccion, sub_semilla in semillas_secciones(semilla).items()}
+
+    def _generar_nucleo(self, rng):
+        """Genera los campos básicos del sistema: tipo, estrellas, habitabilidad y cuerpos"""
         # Generar tipo de sistema
-        tipo_sistema = self.generar_tipo_sistema()
+        tipo_sistema = self.generar_tipo_sistema(rng)
 
         # Generar estrellas
-        estrellas = self.generar_estrellas_sistema(tipo_sistema)
+        estrellas = self.generar_estrellas_sistema(tipo_sistema, rng)
 
+        return self._completar_nucleo(tipo_sistema, estrellas, rng)
+
+    def _completar_nucleo(self, tipo_sistema, estrellas, rng):
+        """Completa los campos básicos a partir del tipo de sistema y sus estrellas"""
         # Determinar habitabilidad
         habitabilidad = self.determinar_habitabilidad(estrellas)
 
@@ -129,7 +246,7 @@ class SolarSystemGenerator:
         generar_cuerpos = self.puede_generar_cuerpos(estrellas)
 
         # Crear el resultado base
-        resultado = {
+        nucleo = {
             'tipo_sistema': tipo_sistema,
             'estrellas': estrellas,
             'habitabilidad': habitabilidad,
@@ -138,52 +255,138 @@ class SolarSystemGenerator:
 
         # Generar cuerpos celestes si es posible
         if generar_cuerpos:
-            cuerpos = self.generar_cuerpos_celestes(estrellas)
-            resultado.update(cuerpos)
+            nucleo.update(self.generar_cuerpos_celestes(estrellas, rng))
         else:
-            resultado.update({
+            nucleo.update({
                 'cuerpos_por_estrella': {},
                 'asteroides': 0,
                 'total_planetas': 0,
                 'total_lunas': 0
             })
 
-        # Generar eventos y recursos
-        depositos = self.generar_depositos_recursos(estrellas)
-        evento = self.generar_evento_especial()
-        planetas_habitables = self.generar_planetas_habitables(habitabilidad)
-        tipos_planetas = self.generar_tipos_planetas(planetas_habitables)
-        sondeo = self.generar_sondeo(estrellas)
-        leviatanes = self.generar_leviatanes(estrellas)
-        especies = self.generar_especies(habitabilidad)
-
-        # Generar tipos de planetas inhabitables si es necesario
-        if habitabilidad == "Inhabitable" and generar_cuerpos:
-            total_planetas = resultado.get('total_planetas', 0)
-            tipos_planetas_inhabitables, lunas_gaseoso = self.generar_tipos_planetas_inhabitables(habitabilidad, total_planetas)
-            resultado.update({
-                'tipos_planetas_inhabitables': tipos_planetas_inhabitables,
-                'lunas_planeta_gaseoso': lunas_gaseoso
-            })
-
-        resultado.update({
-            'depositos': depositos,
-            'evento_especial': evento,
+        return nucleo
+
+    def _generar_seccion(self, seccion, nucleo, rng):
+        """Genera los campos de una sección diferida a partir de los campos básicos"""
+        estrellas = nucleo['estrellas']
+        habitabilidad = nucleo['habitabilidad']
+
+        if seccion == 'depositos':
+            return {'depositos': self.generar_depositos_recursos(estrellas, rng)}
+        if seccion == 'evento':
+            return {'evento_especial': self.generar_evento_especial(rng)}
+        if seccion == 'sondeo':
+            return {'sondeo': self.generar_sondeo(estrellas, rng)}
+        if seccion == 'leviatanes':
+            return {'leviatanes': self.generar_leviatanes(estrellas, rng)}
+        if seccion == 'especies':
+            return {'especies': self.generar_especies(habitabilidad, rng)}
+
+        # Planetas habitables y, en sistemas inhabitables con cuerpos, sus tipos de planeta
+        planetas_habitables = self.generar_planetas_habitables(habitabilidad, rng)
+        campos = {
             'planetas_habitables': planetas_habitables,
-            'tipos_planetas': tipos_planetas,
-            'sondeo': sondeo,
-            'leviatanes': leviatanes,
-            'especies': especies
-        })
-
-        return resultado
-
-    def generar_sistemas_multiples(self, cantidad):
-        """Genera múltiples sistemas solares"""
-        sistemas = []
-        for _ in range(cantidad):
-            sistemas.append(self.generar_sistema_completo())
-        return sistemas
+            'tipos_planetas': self.generar_tipos_planetas(planetas_habitables, rng)
+        }
+        if habitabilidad == "Inhabitable" and nucleo['generar_cuerpos']:
+            tipos_planetas_inhabitables, lunas_gaseoso = self.generar_tipos_planetas_inhabitables(
+                habitabilidad, nucleo['total_planetas'], rng
+            )
+            campos['tipos_planetas_inhabitables'] = tipos_planetas_inhabitables
+            campos['lunas_planeta_gaseoso'] = lunas_gaseoso
+        return campos
+
+    def generar_sistema_completo(self, semilla=None, ruleset_version=None):
+        """Genera un sistema solar completo con todas sus características
+
+        Con la misma semilla y versión de reglas el resultado es siempre idéntico,
+        por lo que un sistema guardado puede reconstruirse solo con (semilla, versión).
+        """
+        # Fijar las reglas al empezar: una recarga no afecta a la generación en curso
+        ruleset = self.ruleset if ruleset_version is None else obtener_ruleset(ruleset_version)
+        if ruleset is not self._ruleset_fijo:
+            return self._fijar(ruleset).generar_sistema_completo(semilla)
+
+        rngs = self._rngs_secciones(semilla)
+        nucleo = self._generar_nucleo(rngs['nucleo'])
+        campos = dict(nucleo)
+        for seccion in SECCIONES_DIFERIDAS:
+            campos.update(self._generar_seccion(seccion, nucleo, rngs[seccion]))
+
+        return {clave: campos[clave] for clave in claves_sistema(nucleo)}
+
+    def generar_sistema_condicionado(self, restricciones, semilla=None, ruleset_version=None):
+        """Genera un sistema que cumple las restricciones (ver conditional_generator.Restricciones)
+
+        El resultado sigue exactamente la distribución de generar_sistema_completo
+        restringida a los sistemas que cumplen las condiciones, sin repetir tiradas.
+        Lanza ValueError si las restricciones son imposibles con las reglas actuales.
+        """
+        ruleset = self.ruleset if ruleset_version is None else obtener_ruleset(ruleset_version)
+        if ruleset is not self._ruleset_fijo:
+            return self._fijar(ruleset).generar_sistema_condicionado(restricciones, semilla)
+
+        from conditional_generator import generar_sistema_condicionado
+        return generar_sistema_condicionado(self, restricciones, self._rngs_secciones(semilla))
+
+    def generar_sistema(self, semilla=None, ruleset_version=None):
+        """Genera un sistema con los campos básicos y el resto bajo demanda
+
+        Devuelve un SistemaPerezoso: tipo, estrellas, habitabilidad y cuerpos se
+        calculan ya, y depósitos, eventos, planetas, sondeo, leviatanes y especies
+        se generan con su sub-semilla la primera vez que se leen. El resultado es
+        idéntico al de generar_sistema_completo con la misma semilla.
+        """
+        ruleset = self.ruleset if ruleset_version is None else obtener_ruleset(ruleset_version)
+        if semilla is None:
+            semilla = self.nueva_semilla()
+        return SistemaPerezoso(self._fijar(ruleset), semilla)
+
+    def nueva_semilla(self):
+        """Genera una semilla nueva para un sistema reproducible con el rng del generador"""
+        return self.rng.getrandbits(64)
+
+    def generar_lote(self, cantidad, semilla=None):
+        """Genera 'cantidad' sistemas en bloque con NumPy y devuelve un resultado columnar
+
+        La semilla siembra un único generador de NumPy para todo el lote: repite el
+        lote, pero no da los mismos sistemas que generar_sistema_completo o
+        iterar_sistemas con esa semilla.
+        """
+        ruleset = self.ruleset
+        if self._batch is None or self._batch.ruleset is not ruleset:
+            from batch_generator import BatchGenerator
+            self._batch = BatchGenerator(ruleset)
+        return self._batch.generar(cantidad, semilla)
+
+    def generar_sistemas_multiples(self, cantidad, semilla=None):
+        """Genera múltiples sistemas solares
+
+        Con semilla la generación es siempre escalar, uno a uno como
+        iterar_sistemas: cada sistema depende solo de la semilla y de su índice,
+        esté o no instalado NumPy, y el motor en bloque no se usa (no sigue las
+        sub-semillas de cada sistema). Sin semilla usa el motor en bloque de NumPy
+        si está instalado; si no, genera los sistemas uno a uno.
+        """
+        if semilla is not None:
+            return [sistema for _, _, sistema in self.iterar_sistemas(cantidad, semilla)]
+        try:
+            return self.generar_lote(cantidad).a_dicts()
+        except ImportError:
+            return [self.generar_sistema_completo() for _ in range(cantidad)]
+
+    def iterar_sistemas(self, cantidad, semilla, desde=0, ruleset_version=None):
+        """Genera los sistemas [desde, cantidad) de una serie con semilla, uno a uno
+
+        Devuelve (índice, semilla del sistema, sistema). Cada sistema depende solo
+        de la semilla de la serie y de su índice, así que se puede reanudar desde
+        cualquier posición y la memoria usada no depende de la cantidad.
+        """
+        for i in range(desde, cantidad):
+            semilla_sistema = derivar_semilla(semilla, i)
+            yield i, semilla_sistema, self.generar_sistema_completo(
+                semilla=semilla_sistema, ruleset_version=ruleset_version
+            )
 
     def obtener_estadisticas_estrella(self, estrella):
         """Obtiene información adicional sobre una estrella específica"""
@@ -261,28 +464,34 @@ class SolarSystemGenerator:
             'longevidad': 'Desconocida'
         })
 
-    def generar_depositos_recursos(self, estrellas):
+    def generar_depositos_recursos(self, estrellas, rng=None):
         """Genera depósitos de recursos estratégicos"""
+        rng = rng or self.rng
+        ruleset = self.ruleset
         # Verificar si hay chance de depósitos
-        if random.randint(1, 100) > DEPOSITOS_PROBABILITY:
+        if rng.randint(1, 100) > ruleset.prob_depositos:
             return {
                 'tiene_depositos': False,
                 'recurso': None,
                 'mensaje': "No hay ningún depósito de recursos estratégicos en el sistema"
             }
 
+        return self.crear_deposito(estrellas, rng)
+
+    def crear_deposito(self, estrellas, rng=None):
+        """Genera el depósito de un sistema que sí tiene recursos estratégicos"""
+        rng = rng or self.rng
+        ruleset = self.ruleset
         # Verificar si hay agujero negro para materia oscura
         if 'Agujero Negro' in estrellas:
             return {
                 'tiene_depositos': True,
-                'recurso': 'Materia Oscura',
+                'recurso': ruleset.recursos_agujero_negro[0],
                 'mensaje': "Recursos estratégicos presentes en el sistema"
             }
 
         # Seleccionar recurso normal
-        recursos = list(RECURSOS_ESTRATEGICOS.keys())
-        probabilidades = list(RECURSOS_ESTRATEGICOS.values())
-        recurso = self._weighted_choice(recursos, probabilidades)
+        recurso = ruleset.sampler_recursos.elegir(rng.randrange)
 
         return {
             'tiene_depositos': True,
@@ -290,48 +499,49 @@ class SolarSystemGenerator:
             'mensaje': "Recursos estratégicos presentes en el sistema"
         }
 
-    def generar_evento_especial(self):
+    def generar_evento_especial(self, rng=None):
         """Genera evento especial en el sistema"""
+        rng = rng or self.rng
+        ruleset = self.ruleset
         # 30% chance de evento especial
-        if random.randint(1, 100) > EVENTO_ESPECIAL_PROBABILITY:
+        if rng.randint(1, 100) > ruleset.prob_evento:
             return {
                 'tiene_evento': False,
                 'tipo_evento': None
             }
 
         # Seleccionar tipo de evento (50% cada uno)
-        evento = random.choice(EVENTOS_ESPECIALES)
+        evento = rng.choice(ruleset.eventos)
 
         return {
             'tiene_evento': True,
             'tipo_evento': evento
         }
 
-    def generar_planetas_habitables(self, habitabilidad):
+    def generar_planetas_habitables(self, habitabilidad, rng=None):
         """Genera número de planetas habitables si el sistema es habitable"""
         if habitabilidad != "Habitable":
             return 0
 
-        return random.randint(*PLANETAS_HABITABLES_RANGE)
+        rng = rng or self.rng
+        return rng.randint(*self.ruleset.rango_planetas_habitables)
 
-    def generar_tipos_planetas(self, num_planetas_habitables):
+    def generar_tipos_planetas(self, num_planetas_habitables, rng=None):
         """Genera los tipos de planetas habitables"""
         if num_planetas_habitables == 0:
             return []
 
+        rng = rng or self.rng
+        ruleset = self.ruleset
         tipos_planetas = []
 
-        # Obtener categorías y sus probabilidades
-        categorias = list(TIPOS_PLANETAS.keys())
-        probabilidades = [TIPOS_PLANETAS[cat]['probabilidad'] for cat in categorias]
-
         for _ in range(num_planetas_habitables):
             # Seleccionar categoría
-            categoria = self._weighted_choice(categorias, probabilidades)
+            categoria = ruleset.sampler_categorias_planetas.elegir(rng.randrange)
 
             # Seleccionar planeta específico de la categoría
-            planetas_categoria = TIPOS_PLANETAS[categoria]['planetas']
-            planeta = random.choice(planetas_categoria)
+            planetas_categoria = ruleset.planetas_por_categoria[categoria]
+            planeta = rng.choice(planetas_categoria)
 
             tipos_planetas.append({
                 'categoria': categoria,
@@ -340,18 +550,22 @@ class SolarSystemGenerator:
 
         return tipos_planetas
 
-    def generar_sondeo(self, estrellas):
+    def generar_sondeo(self, estrellas, rng=None):
         """Genera resultado de sondeo con posible megaestructura"""
+        rng = rng or self.rng
         # Muy, muy baja probabilidad de sondeo exitoso
-        if random.randint(1, 100) > SONDEO_PROBABILITY:
+        if rng.randint(1, 100) > self.ruleset.prob_sondeo:
             return {
                 'sondeo_exitoso': False,
                 'megaestructura': None,
                 'mensaje': "Sondeo no exitoso"
             }
 
-        # Sondeo exitoso - generar megaestructura
-        megaestructura = self.generar_megaestructura(estrellas)
+        return self.crear_sondeo(estrellas, rng)
+
+    def crear_sondeo(self, estrellas, rng=None):
+        """Genera el resultado de un sondeo exitoso"""
+        megaestructura = self.generar_megaestructura(estrellas, rng)
 
         return {
             'sondeo_exitoso': True,
@@ -359,68 +573,37 @@ class SolarSystemGenerator:
             'mensaje': "Sondeo exitoso"
         }
 
-    def generar_megaestructura(self, estrellas):
+    def generar_megaestructura(self, estrellas, rng=None):
         """Genera una megaestructura según las restricciones del sistema"""
-        # Obtener todas las megaestructuras disponibles
-        megaestructuras_disponibles = []
-        probabilidades = []
-
-        for categoria, datos in MEGAESTRUCTURAS.items():
-            for estructura in datos['estructuras']:
-                # Verificar restricciones
-                if estructura in MEGAESTRUCTURAS_RESTRICCIONES:
-                    tipos_permitidos = MEGAESTRUCTURAS_RESTRICCIONES[estructura]
-                    if not any(estrella in tipos_permitidos for estrella in estrellas):
-                        continue  # Saltar esta megaestructura
-
-                megaestructuras_disponibles.append(estructura)
-                probabilidades.append(datos['probabilidad'])
+        rng = rng or self.rng
+        ruleset = self.ruleset
+        sampler, _ = ruleset.elegibles(estrellas)
 
         # Si no hay megaestructuras disponibles, seleccionar una común genérica
-        if not megaestructuras_disponibles:
-            estructuras_comunes = [e for e in MEGAESTRUCTURAS['comunes']['estructuras'] 
-                                 if e not in MEGAESTRUCTURAS_RESTRICCIONES]
-            return random.choice(estructuras_comunes)
+        if sampler is None:
+            return rng.choice(ruleset.megaestructuras_genericas)
 
         # Seleccionar megaestructura con probabilidades ponderadas
-        return self._weighted_choice(megaestructuras_disponibles, probabilidades)
+        return sampler.elegir(rng.randrange)
 
-    def generar_leviatanes(self, estrellas):
+    def generar_leviatanes(self, estrellas, rng=None):
         """Genera leviatanes en el sistema según las restricciones"""
+        rng = rng or self.rng
         # Verificar probabilidad de leviatanes
-        if random.randint(1, 100) > LEVIATANES_PROBABILITY:
+        ruleset = self.ruleset
+        if rng.randint(1, 100) > ruleset.prob_leviatanes:
             return {
                 'tiene_leviatanes': False,
                 'leviatan': None
             }
 
-        # Obtener leviatanes disponibles según las estrellas del sistema
-        leviatanes_disponibles = []
+        return self.crear_leviatan(estrellas, rng)
 
-        for leviatan in LEVIATANES:
-            puede_aparecer = True
-
-            # Verificar restricciones si las hay
-            if leviatan in LEVIATANES_RESTRICCIONES:
-                restriccion = LEVIATANES_RESTRICCIONES[leviatan]
-
-                # Verificar si está prohibido en alguna estrella del sistema
-                if 'prohibidos' in restriccion:
-                    for estrella in estrellas:
-                        if estrella in restriccion['prohibidos']:
-                            puede_aparecer = False
-                            break
-
-                # Verificar si solo puede aparecer en ciertos sistemas
-                if 'solo_en' in restriccion and puede_aparecer:
-                    puede_aparecer = False
-                    for estrella in estrellas:
-                        if estrella in restriccion['solo_en']:
-                            puede_aparecer = True
-                            break
-
-            if puede_aparecer:
-                leviatanes_disponibles.append(leviatan)
+    def crear_leviatan(self, estrellas, rng=None):
+        """Genera leviatanes en un sistema que ha superado la tirada de probabilidad"""
+        rng = rng or self.rng
+        # Obtener leviatanes disponibles según las estrellas del sistema
+        _, leviatanes_disponibles = self.ruleset.elegibles(estrellas)
 
         # Si no hay leviatanes disponibles, no generar ninguno
         if not leviatanes_disponibles:
@@ -430,14 +613,14 @@ class SolarSystemGenerator:
             }
 
         # Seleccionar un leviatan aleatoriamente
-        leviatan_seleccionado = random.choice(leviatanes_disponibles)
+        leviatan_seleccionado = rng.choice(leviatanes_disponibles)
 
         return {
             'tiene_leviatanes': True,
             'leviatan': leviatan_seleccionado
         }
 
-    def generar_especies(self, habitabilidad):
+    def generar_especies(self, habitabilidad, rng=None):
         """Genera especies si el sistema es habitable y hay probabilidad"""
         # Solo puede aparecer en sistemas habitables
         if habitabilidad != "Habitable":
@@ -449,8 +632,11 @@ class SolarSystemGenerator:
                 'rasgos_negativos': []
             }
 
+        rng = rng or self.rng
+        ruleset = self.ruleset
+
         # Verificar probabilidad muy baja de especies
-        if random.randint(1, 100) > ESPECIES_PROBABILITY:
+        if rng.randint(1, 100) > ruleset.prob_especies:
             return {
                 'tiene_especies': False,
                 'tipo_especie': None,
@@ -459,11 +645,16 @@ class SolarSystemGenerator:
                 'rasgos_negativos': []
             }
 
-        # Generar especie
-        tipo_especie = random.choice(TIPOS_ESPECIES)
-        nivel_tecnologico = random.choice(NIVELES_TECNOLOGICOS)
-        rasgos_positivos = self.generar_rasgos_positivos(tipo_especie)
-        rasgos_negativos = self.generar_rasgos_negativos(tipo_especie)
+        return self.crear_especie(rng)
+
+    def crear_especie(self, rng=None):
+        """Genera la especie de un sistema que sí tiene especies inteligentes"""
+        rng = rng or self.rng
+        ruleset = self.ruleset
+        tipo_especie = rng.choice(ruleset.tipos_especies)
+        nivel_tecnologico = rng.choice(ruleset.niveles_tecnologicos)
+        rasgos_positivos = self.generar_rasgos_positivos(tipo_especie, rng)
+        rasgos_negativos = self.generar_rasgos_negativos(tipo_especie, rng)
 
         return {
             'tiene_especies': True,
@@ -473,71 +664,33 @@ class SolarSystemGenerator:
             'rasgos_negativos': rasgos_negativos
         }
 
-    def generar_rasgos_positivos(self, tipo_especie):
+    def generar_rasgos_positivos(self, tipo_especie, rng=None):
         """Genera 3 rasgos positivos únicos considerando restricciones"""
-        rasgos_disponibles = []
-
-        # Filtrar rasgos que pueden ser usados por esta especie
-        for rasgo, especies_permitidas in RASGOS_POSITIVOS.items():
-            if not especies_permitidas or tipo_especie in especies_permitidas:
-                rasgos_disponibles.append(rasgo)
-
-        rasgos_seleccionados = []
+        rng = rng or self.rng
+        return self.ruleset.sampler_rasgos_positivos.elegir(tipo_especie, rng.randrange)
 
-        # Seleccionar 3 rasgos únicos
-        while len(rasgos_seleccionados) < 3 and rasgos_disponibles:
-            rasgo = random.choice(rasgos_disponibles)
-            rasgos_disponibles.remove(rasgo)
-            rasgos_seleccionados.append(rasgo)
-
-            # Verificar exclusiones
-            if rasgo in RASGOS_EXCLUSIVOS:
-                for rasgo_excluido in RASGOS_EXCLUSIVOS[rasgo]:
-                    if rasgo_excluido in rasgos_disponibles:
-                        rasgos_disponibles.remove(rasgo_excluido)
-
-        return rasgos_seleccionados
-
-    def generar_rasgos_negativos(self, tipo_especie):
+    def generar_rasgos_negativos(self, tipo_especie, rng=None):
         """Genera 2 rasgos negativos únicos considerando restricciones"""
-        rasgos_disponibles = []
-
-        # Filtrar rasgos que pueden ser usados por esta especie
-        for rasgo, especies_permitidas in RASGOS_NEGATIVOS.items():
-            if not especies_permitidas or tipo_especie in especies_permitidas:
-                rasgos_disponibles.append(rasgo)
+        rng = rng or self.rng
+        return self.ruleset.sampler_rasgos_negativos.elegir(tipo_especie, rng.randrange)
 
-        rasgos_seleccionados = []
-
-        # Seleccionar 2 rasgos únicos
-        while len(rasgos_seleccionados) < 2 and rasgos_disponibles:
-            rasgo = random.choice(rasgos_disponibles)
-            rasgos_disponibles.remove(rasgo)
-            rasgos_seleccionados.append(rasgo)
-
-        return rasgos_seleccionados
-
-    def generar_tipos_planetas_inhabitables(self, habitabilidad, total_planetas):
+    def generar_tipos_planetas_inhabitables(self, habitabilidad, total_planetas, rng=None):
         """Genera tipos de planetas para sistemas inhabitables"""
         if habitabilidad == "Habitable" or total_planetas == 0:
             return [], []
 
-        tipos_inhabitables = [
-            "Planeta Gaseoso", "Mundo Fragmentado", "Mundo toxico", 
-            "Mundo Volcanico", "Mundo congelado", "Mundo yermo", "Mundo frio"
-        ]
-
+        rng = rng or self.rng
+        ruleset = self.ruleset
         planetas_generados = []
         lunas_gaseoso = []
 
-        for i in range(min(total_planetas, 5)):  # Máximo 5 planetas en la lista
-            tipo_planeta = random.choice(tipos_inhabitables)
+        for i in range(min(total_planetas, ruleset.planetas_inhabitables_max)):  # Máximo 5 planetas en la lista
+            tipo_planeta = rng.choice(ruleset.tipos_planetas_inhabitables)
             planetas_generados.append(tipo_planeta)
 
             # Si es planeta gaseoso, generar lunas
             if tipo_planeta == "Planeta Gaseoso":
-                num_lunas = random.randint(1, 3)
-                lunas_nombres = [f"Moon {chr(97 + j).upper()}" for j in range(num_lunas)]
+                num_lunas = rng.randint(*ruleset.rango_lunas_gaseoso)
                 lunas_gaseoso.extend([f"Moon {i+1}{chr(97 + j)}" for j in range(num_lunas)])
 
         return planetas_generados, lunas_gaseoso
\ No newline at end of file
@@ -0,0 +1,390 @@
+"""
+Backend SQLite de la base de datos de sistemas
+
+Misma interfaz que SystemDatabase (add_system, get_system, system_exists,
+get_top_explorers, get_systems_by_explorer, get_total_systems), pero cada
+inserción es una transacción pequeña en lugar de reescribir un archivo JSON
+completo. Usa WAL e índices por nombre normalizado, explorador y fecha.
+
+add_system no vuelve hasta el commit, así que el bot lo llama con
+asyncio.to_thread; la conexión se comparte entre hilos bajo un lock.
+
+La primera vez que se abre una base de datos vacía se importa
+systems_database.json si existe. También se puede migrar a mano:
+    python sqlite_database.py systems_database.json systems_database.sqlite3
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from binary_system import decodificar, para_persistencia
+from compact_system import compactar, serializar
+from database import JOURNAL_SUFIJO, BaseSystemDatabase, clasificaciones_por_guild, leer_database_json
+from indexes import IndiceBusqueda, normalizar_nombre
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS systems (
+    unique_key TEXT PRIMARY KEY,
+    base_name TEXT NOT NULL,
+    original_name TEXT NOT NULL,
+    explorer_id INTEGER NOT NULL,
+    explorer_name TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    semilla TEXT,
+    ruleset_version INTEGER,
+    system_data TEXT,
+    guild_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_systems_base_name ON systems (base_name, timestamp);
+CREATE INDEX IF NOT EXISTS idx_systems_explorer ON systems (explorer_id, timestamp);
+CREATE INDEX IF NOT EXISTS idx_systems_timestamp ON systems (timestamp);
+
+CREATE TABLE IF NOT EXISTS explorers (
+    explorer_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    systems_explored INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_explorers_systems ON explorers (systems_explored);
+
+CREATE TABLE IF NOT EXISTS guild_explorers (
+    guild_id INTEGER NOT NULL,
+    explorer_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    systems_explored INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (guild_id, explorer_id)
+);
+CREATE INDEX IF NOT EXISTS idx_guild_explorers_systems ON guild_explorers (guild_id, systems_explored);
+
+CREATE TABLE IF NOT EXISTS guilds (
+    guild_id INTEGER PRIMARY KEY,
+    total_systems INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS meta (
+    clave TEXT PRIMARY KEY,
+    valor TEXT NOT NULL
+);
+"""
+
+COLUMNAS = (
+    'unique_key', 'original_name', 'explorer_id', 'explorer_name', 'timestamp', 'semilla', 'ruleset_version',
+    'system_data', 'guild_id'
+)
+
+
+def _columna_system_data(system_data):
+    """Valor de la columna system_data: el sistema en binario (BLOB), o en JSON si no se puede codificar"""
+    valor = para_persistencia(compactar(system_data))
+    if isinstance(valor, bytes):
+        return valor
+    return json.dumps(valor, ensure_ascii=False, separators=(',', ':'), default=serializar)
+
+
+class SQLiteSystemDatabase(BaseSystemDatabase):
+    """Base de datos de sistemas en SQLite"""
+
+    def __init__(self, db_file='systems_database.sqlite3', generator=None, migrar_desde='systems_database.json'):
+        super().__init__(generator)
+        self.db_file = db_file
+        # Los comandos pueden llegar desde hilos (asyncio.to_thread); una conexión protegida por un lock
+        self._lock = threading.Lock()
+        self._conexion = sqlite3.connect(db_file, check_same_thread=False, isolation_level=None)
+        self._conexion.execute("PRAGMA journal_mode=WAL")
+        self._conexion.execute("PRAGMA synchronous=NORMAL")
+        self._conexion.executescript(ESQUEMA)
+        self._actualizar_esquema()
+        # Las altas más recientes de la base JSON pueden estar solo en su journal
+        if migrar_desde and self._vacia() and (
+                os.path.exists(migrar_desde) or os.path.exists(migrar_desde + JOURNAL_SUFIJO)):
+            migrados = self.migrar_json(migrar_desde)
+            logging.info(f"{migrados} sistemas migrados de {migrar_desde} a {db_file}")
+        # El autocompletado busca por subcadenas y con errores, algo que los índices de SQLite no cubren
+        with self._lock:
+            nombres = [fila[0] for fila in self._conexion.execute("SELECT DISTINCT original_name FROM systems")]
+        self.indice_busqueda = IndiceBusqueda(nombres)
+
+    def _actualizar_esquema(self):
+        """Añade a las bases de datos creadas con versiones anteriores las columnas que les falten"""
+        columnas = {fila[1] for fila in self._conexion.execute("PRAGMA table_info(systems)")}
+        if 'guild_id' not in columnas:
+            self._conexion.execute("ALTER TABLE systems ADD COLUMN guild_id INTEGER")
+
+    def close(self):
+        with self._lock:
+            self._conexion.close()
+
+    def _vacia(self):
+        with self._lock:
+            fila = self._conexion.execute("SELECT 1 FROM systems LIMIT 1").fetchone()
+            migrado = self._conexion.execute("SELECT 1 FROM meta WHERE clave = 'migrado_de'").fetchone()
+        return fila is None and migrado is None
+
+    def migrar_json(self, json_file):
+        """Importa una base de datos JSON de SystemDatabase (instantánea y journal) en una sola transacción
+
+        Devuelve el número de sistemas importados.
+        """
+        # Incluye también las altas de su journal; la base JSON no se modifica
+        data = leer_database_json(json_file)
+
+        filas = []
+        for unique_key, entrada in data.get('systems', {}).items():
+            system_data = entrada.get('system_data')
+            filas.append((
+                unique_key,
+                normalizar_nombre(entrada['original_name']),
+                entrada['original_name'],
+                entrada['explorer_id'],
+                entrada['explorer_name'],
+                entrada['timestamp'],
+                str(entrada['semilla']) if entrada.get('semilla') is not None else None,
+                entrada.get('ruleset_version'),
+                _columna_system_data(system_data) if system_data is not None else None,
+                entrada.get('guild_id')
+            ))
+        stats = data.get('stats', {})
+        exploradores = [
+            (explorer_id, info['name'], info['systems_explored'])
+            for explorer_id, info in stats.get('top_explorers', {}).items()
+        ]
+        clasificaciones_guild = clasificaciones_por_guild(data.get('systems', {}).values())
+        exploradores_guild = [
+            (guild_id, explorer_id, info['name'], info['systems_explored'])
+            for guild_id, clasificacion in clasificaciones_guild.items()
+            for explorer_id, info in clasificacion.exploradores.items()
+        ]
+        guilds = [(guild_id, c.total_systems) for guild_id, c in clasificaciones_guild.items()]
+
+        with self._lock, self._conexion:
+            self._conexion.execute("BEGIN")
+            self._conexion.executemany(
+                "INSERT OR IGNORE INTO systems (unique_key, base_name, original_name, explorer_id, explorer_name, "
+                "timestamp, semilla, ruleset_version, system_data, guild_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                filas
+            )
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO guild_explorers (guild_id, explorer_id, name, systems_explored) "
+                "VALUES (?, ?, ?, ?)",
+                exploradores_guild
+            )
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO guilds (guild_id, total_systems) VALUES (?, ?)", guilds
+            )
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO explorers (explorer_id, name, systems_explored) VALUES (?, ?, ?)",
+                exploradores
+            )
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO meta (clave, valor) VALUES ('total_systems', ?)",
+                (str(stats.get('total_systems', len(filas))),)
+            )
+            self._conexion.execute(
+                "INSERT OR REPLACE INTO meta (clave, valor) VALUES ('migrado_de', ?)", (json_file,)
+            )
+        return len(filas)
+
+    def _entrada(self, fila):
+        """Convierte una fila de 'systems' en el diccionario de entrada de SystemDatabase"""
+        (unique_key, original_name, explorer_id, explorer_name, timestamp, semilla, ruleset_version, system_data,
+         guild_id) = fila
+        entrada = {
+            'original_name': original_name,
+            'explorer_id': explorer_id,
+            'explorer_name': explorer_name,
+            'timestamp': timestamp,
+            'unique_key': unique_key
+        }
+        if semilla is not None:
+            entrada['semilla'] = int(semilla)
+            if ruleset_version is not None:
+                entrada['ruleset_version'] = ruleset_version
+        if isinstance(system_data, bytes):
+            entrada['system_data'] = decodificar(system_data)
+        elif system_data is not None:
+            entrada['system_data'] = json.loads(system_data)
+        if guild_id is not None:
+            entrada['guild_id'] = guild_id
+        return entrada
+
+    def system_exists(self, system_name):
+        """Verifica si un sistema ya existe"""
+        with self._lock:
+            fila = self._conexion.execute(
+                "SELECT 1 FROM systems WHERE unique_key = ?", (normalizar_nombre(system_name),)
+            ).fetchone()
+        return fila is not None
+
+    def add_system(self, system_name, user_id, user_name, system_data, semilla=None, ruleset_version=None,
+                   guild_id=None):
+        """Añade un nuevo sistema a la base de datos
+
+        Si se indica la semilla con la que se generó, solo se guarda (semilla, versión de reglas)
+        y el sistema se reconstruye al consultarlo. guild_id es el servidor donde se exploró.
+        """
+        timestamp = datetime.now().isoformat()
+        base_key = normalizar_nombre(system_name)
+        if semilla is not None:
+            ruleset_version = ruleset_version if ruleset_version is not None else self.generator.ruleset_version
+            if system_data is not None and not self._guardar_solo_semilla(ruleset_version):
+                semilla = None
+        if semilla is not None:
+            datos = None
+        else:
+            ruleset_version = None
+            datos = _columna_system_data(system_data)
+
+        with self._lock, self._conexion:
+            conexion = self._conexion
+            conexion.execute("BEGIN IMMEDIATE")
+
+            # Misma clave única que el backend JSON: nombre, nombre_1, nombre_2...
+            # Los sufijos se asignan en orden, así que los anteriores al número de repeticiones están ocupados
+            unique_key = base_key
+            if conexion.execute("SELECT 1 FROM systems WHERE unique_key = ?", (unique_key,)).fetchone():
+                repetidos = conexion.execute(
+                    "SELECT COUNT(*) FROM systems WHERE base_name = ?", (base_key,)
+                ).fetchone()[0]
+                counter = max(1, repetidos - 1)
+                while True:
+                    unique_key = f"{base_key}_{counter}"
+                    if not conexion.execute("SELECT 1 FROM systems WHERE unique_key = ?", (unique_key,)).fetchone():
+                        break
+                    counter += 1
+
+            conexion.execute(
+                "INSERT INTO systems (unique_key, base_name, original_name, explorer_id, explorer_name, timestamp, "
+                "semilla, ruleset_version, system_data, guild_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (unique_key, base_key, system_name, user_id, user_name, timestamp,
+                 str(semilla) if semilla is not None else None, ruleset_version, datos, guild_id)
+            )
+            conexion.execute(
+                "INSERT INTO meta (clave, valor) VALUES ('total_systems', '1') "
+                "ON CONFLICT (clave) DO UPDATE SET valor = CAST(valor AS INTEGER) + 1"
+            )
+            # Se actualiza el nombre por si ha cambiado
+            conexion.execute(
+                "INSERT INTO explorers (explorer_id, name, systems_explored) VALUES (?, ?, 1) "
+                "ON CONFLICT (explorer_id) DO UPDATE SET name = excluded.name, systems_explored = systems_explored + 1",
+                (str(user_id), user_name)
+            )
+            if guild_id is not None:
+                conexion.execute(
+                    "INSERT INTO guilds (guild_id, total_systems) VALUES (?, 1) "
+                    "ON CONFLICT (guild_id) DO UPDATE SET total_systems = total_systems + 1",
+                    (guild_id,)
+                )
+                conexion.execute(
+                    "INSERT INTO guild_explorers (guild_id, explorer_id, name, systems_explored) VALUES (?, ?, ?, 1) "
+                    "ON CONFLICT (guild_id, explorer_id) DO UPDATE SET name = excluded.name, "
+                    "systems_explored = systems_explored + 1",
+                    (guild_id, str(user_id), user_name)
+                )
+            self.indice_busqueda.añadir(system_name)
+
+    def get_system(self, system_name):
+        """Obtiene información de un sistema específico - devuelve el más reciente si hay duplicados"""
+        with self._lock:
+            fila = self._conexion.execute(
+                f"SELECT {', '.join(COLUMNAS)} FROM systems WHERE base_name = ? ORDER BY timestamp DESC LIMIT 1",
+                (normalizar_nombre(system_name),)
+            ).fetchone()
+        if fila is None:
+            return None
+        return self.materializar_sistema(self._entrada(fila))
+
+    def get_top_explorers(self, limit=10, guild_id=None):
+        """Obtiene los mejores exploradores, globales o de un servidor"""
+        with self._lock:
+            if guild_id is None:
+                filas = self._conexion.execute(
+                    # A igualdad, en orden de llegada, como el backend JSON
+                    "SELECT explorer_id, name, systems_explored FROM explorers "
+                    "ORDER BY systems_explored DESC, rowid LIMIT ?",
+                    (limit,)
+                ).fetchall()
+            else:
+                filas = self._conexion.execute(
+                    "SELECT explorer_id, name, systems_explored FROM guild_explorers WHERE guild_id = ? "
+                    "ORDER BY systems_explored DESC, rowid LIMIT ?",
+                    (guild_id, limit)
+                ).fetchall()
+        return [(explorer_id, {'name': name, 'systems_explored': total}) for explorer_id, name, total in filas]
+
+    def get_total_systems(self, guild_id=None):
+        """Obtiene el número total de sistemas explorados, globales o de un servidor"""
+        with self._lock:
+            if guild_id is None:
+                fila = self._conexion.execute("SELECT valor FROM meta WHERE clave = 'total_systems'").fetchone()
+            else:
+                fila = self._conexion.execute(
+                    "SELECT total_systems FROM guilds WHERE guild_id = ?", (guild_id,)
+                ).fetchone()
+        return int(fila[0]) if fila else 0
+
+    def get_systems_by_explorer(self, user_id):
+        """Obtiene todos los sistemas explorados por un usuario específico"""
+        with self._lock:
+            filas = self._conexion.execute(
+                f"SELECT {', '.join(COLUMNAS)} FROM systems WHERE explorer_id = ? ORDER BY timestamp DESC",
+                (user_id,)
+            ).fetchall()
+        return [self.materializar_sistema(self._entrada(fila)) for fila in filas]
+
+    def get_systems_page(self, user_id, limit=10, cursor=None):
+        """Página de sistemas de un explorador, del más reciente al más antiguo
+
+        Paginación por clave: el cursor es (timestamp, unique_key) de la última
+        fila devuelta, así que cada página lee solo sus filas del índice.
+        """
+        consulta = f"SELECT {', '.join(COLUMNAS)} FROM systems WHERE explorer_id = ?"
+        parametros = [user_id]
+        if cursor is not None:
+            consulta += " AND (timestamp, unique_key) < (?, ?)"
+            parametros.extend(cursor)
+        consulta += " ORDER BY timestamp DESC, unique_key DESC LIMIT ?"
+        # Una fila de más para saber si hay página siguiente
+        parametros.append(limit + 1)
+        with self._lock:
+            filas = self._conexion.execute(consulta, parametros).fetchall()
+        siguiente = None
+        if len(filas) > limit:
+            filas = filas[:limit]
+            siguiente = (filas[-1][COLUMNAS.index('timestamp')], filas[-1][COLUMNAS.index('unique_key')])
+        return [self.materializar_sistema(self._entrada(fila)) for fila in filas], siguiente
+
+    def count_systems_by_explorer(self, user_id):
+        """Número de sistemas explorados por un usuario"""
+        with self._lock:
+            return self._conexion.execute(
+                "SELECT COUNT(*) FROM systems WHERE explorer_id = ?", (user_id,)
+            ).fetchone()[0]
+
+    def buscar_nombres(self, texto, limite=25):
+        """Nombres de sistemas guardados que empiezan por el texto o se le parecen, para el autocompletado"""
+        with self._lock:
+            return self.indice_busqueda.sugerencias(texto, limite)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
+        print("Uso: python sqlite_database.py <systems_database.json> <systems_database.sqlite3>", file=sys.stderr)
+        return 2
+    json_file, sqlite_file = argv
+    database = SQLiteSystemDatabase(sqlite_file, migrar_desde=None)
+    try:
+        if not database._vacia():
+            print(f"{sqlite_file} ya contiene datos; no se migra", file=sys.stderr)
+            return 1
+        print(f"{database.migrar_json(json_file)} sistemas migrados a {sqlite_file}")
+    finally:
+        database.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Pool de sistemas pregenerados para responder a /generar_sistema sin generar en el momento
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+
+
+class PoolSistemas:
+    """Búfer circular de sistemas listos que una tarea en segundo plano mantiene lleno
+
+    Cada elemento es (semilla, versión de reglas, sistema). Los comandos sacan
+    sistemas con tomar(); si el búfer está vacío se genera uno en el momento y
+    se cuenta como fallo. La tarea de relleno genera como mucho 'ritmo'
+    sistemas por segundo para no acaparar el bucle de eventos.
+    """
+
+    def __init__(self, generator, tamano=32, ritmo=50):
+        if tamano <= 0:
+            raise ValueError("El tamaño del pool debe ser mayor que cero")
+        if ritmo <= 0:
+            raise ValueError("El ritmo de relleno debe ser mayor que cero")
+        self.generator = generator
+        self.tamano = tamano
+        self.ritmo = ritmo
+        self._bufer = deque(maxlen=tamano)
+        self._hueco = None
+        self._tarea = None
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartados = 0
+
+    def __len__(self):
+        return len(self._bufer)
+
+    def _generar(self):
+        generator = self.generator
+        semilla = generator.nueva_semilla()
+        ruleset_version = generator.ruleset_version
+        sistema = generator.generar_sistema_completo(semilla=semilla, ruleset_version=ruleset_version)
+        return semilla, ruleset_version, sistema
+
+    def tomar(self):
+        """Devuelve (semilla, versión de reglas, sistema) del búfer o recién generado si está vacío"""
+        version_actual = self.generator.ruleset_version
+        while self._bufer:
+            semilla, ruleset_version, sistema = self._bufer.popleft()
+            if self._hueco is not None:
+                self._hueco.set()
+            # Tras recargar las reglas, los sistemas pregenerados con las anteriores no se usan
+            if ruleset_version != version_actual:
+                self.descartados += 1
+                continue
+            self.aciertos += 1
+            return semilla, ruleset_version, sistema
+
+        self.fallos += 1
+        return self._generar()
+
+    def llenar(self):
+        """Rellena el búfer por completo de forma síncrona"""
+        while len(self._bufer) < self.tamano:
+            self._bufer.append(self._generar())
+
+    async def _rellenar(self):
+        intervalo = 1 / self.ritmo
+        while True:
+            if len(self._bufer) >= self.tamano:
+                self._hueco.clear()
+                await self._hueco.wait()
+                continue
+            inicio = time.perf_counter()
+            try:
+                self._bufer.append(self._generar())
+            except Exception as e:
+                logging.error(f"Error al pregenerar sistema: {e}")
+            await asyncio.sleep(max(0.0, intervalo - (time.perf_counter() - inicio)))
+
+    def iniciar(self):
+        """Arranca la tarea de relleno en el bucle de eventos actual"""
+        if self._tarea is None or self._tarea.done():
+            self._hueco = asyncio.Event()
+            self._tarea = asyncio.create_task(self._rellenar())
+        return self._tarea
+
+    async def detener(self):
+        """Cancela la tarea de relleno"""
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def estadisticas(self):
+        """Contadores del pool: tamaño, ocupación, aciertos, fallos y descartados"""
+        total = self.aciertos + self.fallos
+        return {
+            'tamano': self.tamano,
+            'disponibles': len(self._bufer),
+            'ritmo': self.ritmo,
+            'aciertos': self.aciertos,
+            'fallos': self.fallos,
+            'descartados': self.descartados,
+            'tasa_aciertos': self.aciertos / total if total else None
+        }
@@ -0,0 +1,166 @@
+"""Codificación binaria de los sistemas: ida y vuelta exacta, textos literales y datos corruptos"""
+
+import base64
+import json
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from binary_system import LIBROS, codificar, decodificar, desde_persistencia, para_persistencia, serializar_binario
+from compact_system import (
+    CATEGORIAS, ESPECIES, ESTRELLAS, EVENTOS, HABITABILIDAD, LEVIATANES, MEGAESTRUCTURAS, NIVELES, PLANETAS,
+    RASGOS, RECURSOS, TIPOS_SISTEMA, SistemaCompacto, compactar
+)
+from ruleset import ruleset_actual
+from solar_system_generator import SolarSystemGenerator
+
+LIBRO = LIBROS[1]
+
+
+def generar(semilla):
+    return SolarSystemGenerator().generar_sistema_completo(semilla=semilla)
+
+
+def primera_semilla(condicion):
+    return next(semilla for semilla in range(100000) if condicion(generar(semilla)))
+
+
+# Semillas de un sistema con especie y de uno inhabitable con lunas en el gaseoso
+SEMILLA_CON_ESPECIE = primera_semilla(lambda sistema: sistema['especies']['tiene_especies'])
+SEMILLA_INHABITABLE = primera_semilla(lambda sistema: bool(sistema.get('lunas_planeta_gaseoso')))
+
+
+def compacto(semilla):
+    sistema = compactar(generar(semilla))
+    assert isinstance(sistema, SistemaCompacto)
+    return sistema
+
+
+def con(sistema, **campos):
+    """Copia de un SistemaCompacto con algunos campos cambiados"""
+    copia = SistemaCompacto()
+    for campo in SistemaCompacto.__slots__:
+        setattr(copia, campo, campos.get(campo, getattr(sistema, campo)))
+    return copia
+
+
+# Por categoría del libro: campos del sistema base en los que aparece el valor
+VARIANTES = {
+    'tipo_sistema': lambda s, v: {'tipo': TIPOS_SISTEMA.codigo(v)},
+    'estrella': lambda s, v: {'estrellas': (ESTRELLAS.codigo(v),) + s.estrellas[1:]},
+    'habitabilidad': lambda s, v: {'habitabilidad': HABITABILIDAD.codigo(v)},
+    'recurso': lambda s, v: {'recurso': RECURSOS.codigo(v)},
+    'evento': lambda s, v: {'evento': EVENTOS.codigo(v)},
+    'categoria_planeta': lambda s, v: {'tipos_planetas': (CATEGORIAS.codigo(v), PLANETAS.codigo('Gaia'))},
+    'planeta': lambda s, v: {
+        'tipos_planetas': (CATEGORIAS.codigo('Otros'), PLANETAS.codigo(v)),
+        'inhabitables': (PLANETAS.codigo(v),),
+        'lunas_gaseoso': (2,)
+    },
+    'megaestructura': lambda s, v: {'megaestructura': MEGAESTRUCTURAS.codigo(v)},
+    'leviatan': lambda s, v: {'leviatan': LEVIATANES.codigo(v)},
+    'especie': lambda s, v: {'especie': (ESPECIES.codigo(v),) + s.especie[1:]},
+    'nivel_tecnologico': lambda s, v: {'especie': (s.especie[0], NIVELES.codigo(v)) + s.especie[2:]},
+    'rasgo': lambda s, v: {'especie': s.especie[:2] + ((RASGOS.codigo(v),), (RASGOS.codigo(v),))},
+}
+
+
+def test_variantes_cubren_todas_las_categorias():
+    assert set(VARIANTES) == set(LIBRO.tablas)
+
+
+@pytest.mark.parametrize('semilla', range(300))
+def test_ida_y_vuelta_de_sistemas_generados(semilla):
+    original = generar(semilla)
+    sistema = decodificar(codificar(compactar(original), LIBRO))
+    assert json.dumps(sistema.a_dict(), ensure_ascii=False) == json.dumps(original, ensure_ascii=False)
+
+
+@pytest.mark.parametrize('categoria', sorted(VARIANTES))
+def test_todos_los_valores_del_libro_se_guardan_como_codigo(categoria):
+    base = compacto(SEMILLA_CON_ESPECIE)
+    for valor in LIBRO.tablas[categoria]:
+        sistema = con(base, **VARIANTES[categoria](base, valor))
+        datos = codificar(sistema, LIBRO)
+        assert valor.encode('utf-8') not in datos
+        assert decodificar(datos).a_dict() == sistema.a_dict()
+
+
+@pytest.mark.parametrize('categoria', sorted(VARIANTES))
+def test_valor_fuera_del_libro_se_guarda_como_texto(categoria):
+    base = compacto(SEMILLA_CON_ESPECIE)
+    valor = f'Valor inventado ñ {categoria}'
+    sistema = con(base, **VARIANTES[categoria](base, valor))
+    datos = codificar(sistema, LIBRO)
+    assert valor.encode('utf-8') in datos
+    assert decodificar(datos).a_dict() == sistema.a_dict()
+
+
+def test_ida_y_vuelta_de_sistema_inhabitable():
+    sistema = compacto(SEMILLA_INHABITABLE)
+    assert sistema.inhabitables and any(sistema.lunas_gaseoso)
+    assert decodificar(codificar(sistema, LIBRO)).a_dict() == sistema.a_dict()
+
+
+@pytest.mark.parametrize('semilla', [SEMILLA_CON_ESPECIE, SEMILLA_INHABITABLE])
+def test_datos_truncados_lanzan_value_error(semilla):
+    datos = codificar(compacto(semilla), LIBRO)
+    for longitud in range(len(datos)):
+        with pytest.raises(ValueError):
+            decodificar(datos[:longitud])
+
+
+def test_texto_literal_truncado_lanza_value_error():
+    base = compacto(SEMILLA_CON_ESPECIE)
+    datos = codificar(con(base, leviatan=LEVIATANES.codigo('Leviatán inventado')), LIBRO)
+    for longitud in range(len(datos)):
+        with pytest.raises(ValueError):
+            decodificar(datos[:longitud])
+
+
+def test_bytes_sobrantes_lanzan_value_error():
+    datos = codificar(compacto(SEMILLA_CON_ESPECIE), LIBRO)
+    for sobrantes in (b'\x00', b'\x01\x02'):
+        with pytest.raises(ValueError, match='Sobran bytes'):
+            decodificar(datos + sobrantes)
+
+
+def test_formato_o_libro_desconocido_lanza_value_error():
+    datos = codificar(compacto(SEMILLA_CON_ESPECIE), LIBRO)
+    with pytest.raises(ValueError, match='Formato'):
+        decodificar(b'\x07' + datos[1:])
+    with pytest.raises(ValueError, match='libro de códigos'):
+        decodificar(datos[:1] + b'\x7f' + datos[2:])
+
+
+def test_persistencia_en_json_con_base64():
+    sistema = compacto(SEMILLA_CON_ESPECIE)
+    guardado = json.loads(json.dumps({'system_data': sistema}, default=serializar_binario))['system_data']
+    assert isinstance(guardado, str)
+    assert base64.b64decode(guardado) == para_persistencia(sistema)
+    assert desde_persistencia(guardado).a_dict() == sistema.a_dict()
+
+
+def test_desde_persistencia_acepta_diccionarios_completos():
+    # Bases de datos anteriores al formato binario: system_data es el diccionario entero
+    original = json.loads(json.dumps(generar(SEMILLA_CON_ESPECIE), ensure_ascii=False))
+    sistema = desde_persistencia(original)
+    assert isinstance(sistema, SistemaCompacto)
+    assert json.dumps(sistema.a_dict(), ensure_ascii=False) == json.dumps(original, ensure_ascii=False)
+
+    # Un diccionario que no encaja en el registro compacto se conserva tal cual
+    modificado = dict(original, nota='editado a mano')
+    assert desde_persistencia(modificado) is modificado
+
+
+def test_sistema_no_codificable_se_guarda_como_diccionario():
+    sistema = con(compacto(SEMILLA_CON_ESPECIE), generar_cuerpos=1)
+    assert isinstance(para_persistencia(sistema), dict)
+
+
+def test_libro_v1_tiene_todos_los_valores_del_ruleset():
+    assert LIBROS[1].faltantes(ruleset_actual()) == {}
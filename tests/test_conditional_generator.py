@@ -0,0 +1,140 @@
+"""Generación condicionada: probabilidades exactas, secciones forzadas y restricciones imposibles"""
+
+import math
+import os
+import sys
+from fractions import Fraction
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from conditional_generator import Restricciones, tabla_condicionada
+from ruleset import ruleset_actual
+from solar_system_generator import SolarSystemGenerator, claves_sistema
+
+GENERATOR = SolarSystemGenerator()
+MUESTRAS = 20000
+
+
+def cumple(sistema, r):
+    """Si un sistema generado cumple las restricciones, mirando solo el sistema"""
+    comprobaciones = (
+        ('tipo_sistema', sistema['tipo_sistema']),
+        ('habitable', sistema['habitabilidad'] == "Habitable"),
+        ('megaestructura', sistema['sondeo']['megaestructura'] or False),
+        ('leviatan', sistema['leviatanes']['leviatan'] or False),
+        ('especies', sistema['especies']['tiene_especies']),
+        ('recurso', sistema['depositos']['recurso'] or False),
+        ('evento', sistema['evento_especial']['tipo_evento'] or False),
+    )
+    for campo, valor in comprobaciones:
+        pedido = getattr(r, campo)
+        if pedido is None:
+            continue
+        if pedido is True:
+            if not valor:
+                return False
+        elif pedido is False:
+            if valor:
+                return False
+        elif valor != pedido:
+            return False
+    return r.estrella is None or r.estrella in sistema['estrellas']
+
+
+@pytest.fixture(scope='module')
+def muestra():
+    return [GENERATOR.generar_sistema_completo(semilla=i) for i in range(MUESTRAS)]
+
+
+CASOS = [
+    Restricciones(habitable=True),
+    Restricciones(habitable=False, recurso=True),
+    Restricciones(tipo_sistema='Binario', estrella='Tipo G'),
+    Restricciones(megaestructura=True),
+    Restricciones(megaestructura=False, leviatan=False),
+    Restricciones(leviatan=True),
+    Restricciones(leviatan='Tiyankis'),
+    Restricciones(especies=True),
+    Restricciones(evento='Anomalía'),
+    Restricciones(recurso='Materia Oscura'),
+]
+
+
+@pytest.mark.parametrize('restricciones', CASOS, ids=repr)
+def test_probabilidad_coincide_con_la_frecuencia_sin_restricciones(muestra, restricciones):
+    p = tabla_condicionada(ruleset_actual(), restricciones).probabilidad
+    frecuencia = sum(cumple(sistema, restricciones) for sistema in muestra) / MUESTRAS
+    # Cinco desviaciones típicas de la frecuencia observada
+    assert abs(frecuencia - p) <= 5 * math.sqrt(p * (1 - p) / MUESTRAS) + 1 / MUESTRAS
+
+
+def test_probabilidades_exactas_de_secciones_independientes():
+    ruleset = ruleset_actual()
+    assert tabla_condicionada(ruleset, Restricciones(megaestructura=True)).probabilidad == Fraction(
+        ruleset.prob_sondeo, 100
+    )
+    assert tabla_condicionada(ruleset, Restricciones(evento=True)).probabilidad == Fraction(ruleset.prob_evento, 100)
+    assert tabla_condicionada(ruleset, Restricciones(recurso=True)).probabilidad == Fraction(
+        ruleset.prob_depositos, 100
+    )
+    assert tabla_condicionada(ruleset, Restricciones()).probabilidad == 1
+
+
+FORZADAS = CASOS + [
+    Restricciones(megaestructura=False),
+    Restricciones(leviatan='Tiyankis', megaestructura=False, especies=False),
+    Restricciones(habitable=True, especies=True, evento=True, recurso=True),
+    Restricciones(estrella='Agujero Negro', recurso=True),
+]
+
+
+@pytest.mark.parametrize('restricciones', FORZADAS, ids=repr)
+def test_sistemas_generados_cumplen_las_restricciones(restricciones):
+    for semilla in range(200):
+        sistema = GENERATOR.generar_sistema_condicionado(restricciones, semilla=semilla)
+        assert cumple(sistema, restricciones), sistema
+        assert list(sistema) == list(claves_sistema(sistema))
+
+
+def test_misma_semilla_mismo_sistema_condicionado():
+    r = Restricciones(leviatan=True, especies=True)
+    assert GENERATOR.generar_sistema_condicionado(r, semilla=5) == GENERATOR.generar_sistema_condicionado(
+        r, semilla=5
+    )
+
+
+def test_secciones_sin_restriccion_siguen_su_distribucion():
+    # Con un leviatán forzado, el sondeo sigue saliendo con su probabilidad de siempre
+    r = Restricciones(leviatan=True)
+    exitos = sum(
+        GENERATOR.generar_sistema_condicionado(r, semilla=i)['sondeo']['sondeo_exitoso'] for i in range(MUESTRAS)
+    )
+    p = ruleset_actual().prob_sondeo / 100
+    assert abs(exitos / MUESTRAS - p) <= 5 * math.sqrt(p * (1 - p) / MUESTRAS)
+
+
+@pytest.mark.parametrize('restricciones', [
+    Restricciones(habitable=False, especies=True),
+    Restricciones(estrella='Agujero Negro', recurso='Gases Exóticos'),
+], ids=repr)
+def test_combinaciones_imposibles_lanzan_value_error(restricciones):
+    with pytest.raises(ValueError, match='Ningún sistema'):
+        GENERATOR.generar_sistema_condicionado(restricciones)
+
+
+@pytest.mark.parametrize('restricciones', [
+    Restricciones(tipo_sistema='Cuaternario'),
+    Restricciones(estrella='Tipo Z'),
+    Restricciones(megaestructura='Torre inventada'),
+    Restricciones(leviatan='Kraken inventado'),
+    Restricciones(recurso='Oro'),
+    Restricciones(evento='Fiesta'),
+    Restricciones(habitable='sí'),
+    Restricciones(especies=3),
+], ids=repr)
+def test_valores_desconocidos_lanzan_value_error(restricciones):
+    with pytest.raises(ValueError):
+        GENERATOR.generar_sistema_condicionado(restricciones)
@@ -0,0 +1,230 @@
+"""Índices en memoria de la base de datos: comparados con el recorrido completo que sustituyen"""
+
+import os
+import random
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from database import SystemDatabase
+from indexes import IndiceBusqueda, IndiceExploradores, IndiceNombres, normalizar_busqueda, normalizar_nombre
+from solar_system_generator import SolarSystemGenerator
+from sqlite_database import SQLiteSystemDatabase
+
+GENERATOR = SolarSystemGenerator()
+NOMBRES = ['Alfa', 'alfa', 'ALFA', 'Beta', 'Gamma', 'Ñandú', 'ñandú', 'Alfa Centauri']
+
+
+def entradas_aleatorias(cantidad, semilla=0):
+    """Entradas con nombres, exploradores y timestamps repetidos, en un orden de llegada desordenado"""
+    rng = random.Random(semilla)
+    return [
+        {
+            'original_name': rng.choice(NOMBRES),
+            'explorer_id': rng.randrange(4),
+            'timestamp': f"2024-01-0{rng.randrange(1, 6)}T00:00:00",
+            'numero': numero
+        }
+        for numero in range(cantidad)
+    ]
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / 'db.json')
+
+
+def test_mas_reciente_como_la_ordenacion_estable():
+    entradas = entradas_aleatorias(300)
+    indice = IndiceNombres(entradas)
+    for nombre in NOMBRES + ['Delta']:
+        iguales = [e for e in entradas if normalizar_nombre(e['original_name']) == normalizar_nombre(nombre)]
+        # La ordenación de get_system antes del índice: con timestamps iguales, la primera que llegó
+        esperado = sorted(iguales, key=lambda e: e['timestamp'], reverse=True)[0] if iguales else None
+        assert indice.mas_reciente(nombre) is esperado
+        assert indice.entradas(nombre) == sorted(iguales, key=lambda e: e['timestamp'])
+        assert (nombre in indice) == bool(iguales)
+
+
+def clave_libre_original(nombre, claves):
+    """El bucle de add_system anterior al índice"""
+    base_key = normalizar_nombre(nombre)
+    unique_key = base_key
+    counter = 1
+    while unique_key in claves:
+        unique_key = f"{base_key}_{counter}"
+        counter += 1
+    return unique_key
+
+
+def test_clave_libre_como_el_bucle_original():
+    rng = random.Random(1)
+    claves = {'alfa_2': None, 'beta_1': None}
+    indice = IndiceNombres()
+    for _ in range(500):
+        nombre = rng.choice(NOMBRES + ['Beta_1'])
+        clave = indice.clave_libre(nombre, claves)
+        assert clave == clave_libre_original(nombre, claves)
+        claves[clave] = None
+
+
+def test_ida_y_vuelta_en_la_base_de_datos(db_file):
+    database = SystemDatabase(db_file, GENERATOR)
+    for i, nombre in enumerate(['Alfa', 'alfa', 'Beta', 'ALFA']):
+        database.add_system(nombre, i, f'explorador{i}', GENERATOR.generar_sistema_completo(semilla=i))
+    database.close()
+    assert sorted(database.data['systems']) == ['alfa', 'alfa_1', 'alfa_2', 'beta']
+
+    recargada = SystemDatabase(db_file, GENERATOR)
+    recargada.close()
+    assert recargada.system_exists('aLFa') and not recargada.system_exists('Gamma')
+    assert recargada.get_system('alfa')['unique_key'] == database.get_system('ALFA')['unique_key']
+    assert [e['unique_key'] for e in recargada.indice_nombres.entradas('Alfa')] == [
+        e['unique_key'] for e in database.indice_nombres.entradas('Alfa')
+    ]
+
+
+def recorrer(indice, explorer_id, limite):
+    """Todas las páginas de un explorador, siguiendo el cursor"""
+    paginas = []
+    cursor = None
+    while True:
+        pagina, cursor = indice.pagina(explorer_id, limite, cursor)
+        assert len(pagina) <= limite
+        paginas.append(pagina)
+        if cursor is None:
+            return paginas
+
+
+@pytest.mark.parametrize('limite', [1, 2, 3, 7, 100])
+def test_paginas_recorren_todas_las_entradas_de_la_mas_reciente(limite):
+    entradas = entradas_aleatorias(200)
+    indice = IndiceExploradores(entradas)
+    for explorer_id in range(5):
+        suyas = sorted((e for e in entradas if e['explorer_id'] == explorer_id), key=lambda e: e['timestamp'])
+        paginas = recorrer(indice, explorer_id, limite)
+        assert [e for pagina in paginas for e in pagina] == suyas[::-1]
+        assert all(len(pagina) == limite for pagina in paginas[:-1])
+        assert indice.cantidad(explorer_id) == len(suyas)
+        assert indice.entradas(explorer_id) == suyas
+
+
+def test_cursor_sigue_valido_tras_altas_nuevas():
+    entradas = entradas_aleatorias(100)
+    indice = IndiceExploradores(entradas)
+    esperadas = sorted((e for e in entradas if e['explorer_id'] == 0), key=lambda e: e['timestamp'])[::-1]
+    vistas = []
+    cursor = None
+    numero = len(entradas)
+    while True:
+        pagina, cursor = indice.pagina(0, 4, cursor)
+        vistas += pagina
+        if cursor is None:
+            break
+        # Un alta posterior (timestamp mayor o igual al más reciente) no desplaza las páginas siguientes
+        indice.añadir({'original_name': 'Nuevo', 'explorer_id': 0, 'timestamp': '2024-01-09T00:00:00',
+                       'numero': numero})
+        numero += 1
+    assert vistas == esperadas
+
+
+def test_paginas_en_la_base_de_datos(db_file):
+    database = SystemDatabase(db_file, GENERATOR)
+    for i in range(12):
+        database.add_system(f'Sistema {i}', 7 if i % 3 else 8, 'ana', GENERATOR.generar_sistema_completo(semilla=i))
+    database.close()
+
+    recargada = SystemDatabase(db_file, GENERATOR)
+    recargada.close()
+    nombres = []
+    cursor = None
+    while True:
+        sistemas, cursor = recargada.get_systems_page(7, limit=3, cursor=cursor)
+        nombres += [sistema['original_name'] for sistema in sistemas]
+        if cursor is None:
+            break
+    assert nombres == [f'Sistema {i}' for i in reversed(range(12)) if i % 3]
+    assert recargada.count_systems_by_explorer(7) == 8
+    assert [s['original_name'] for s in recargada.get_systems_by_explorer(8)] == ['Sistema 9', 'Sistema 6',
+                                                                                  'Sistema 3', 'Sistema 0']
+    assert recargada.get_systems_page(99) == ([], None)
+
+
+def nombres_aleatorios(cantidad, semilla=0):
+    rng = random.Random(semilla)
+    silabas = ['al', 'fa', 'be', 'ta', 'ké', 'ñan', 'dú', 'ori', 'on', 've', 'ga', 'mi']
+    return [
+        ' '.join(''.join(rng.choice(silabas) for _ in range(rng.randrange(1, 4))).capitalize()
+                 for _ in range(rng.randrange(1, 3)))
+        for _ in range(cantidad)
+    ]
+
+
+def test_por_prefijo_como_el_filtro_completo():
+    nombres = nombres_aleatorios(2000)
+    indice = IndiceBusqueda(nombres)
+    normalizados = sorted({normalizar_busqueda(nombre) for nombre in nombres})
+    for prefijo in ['a', 'Al', 'ÑAN', 'nan', 'be ta', 'Kéga', 'zz', '']:
+        esperados = [n for n in normalizados if n.startswith(normalizar_busqueda(prefijo))]
+        assert indice.por_prefijo(prefijo, limite=10000) == esperados
+        assert indice.por_prefijo(prefijo, limite=3) == esperados[:3]
+
+
+def test_añadir_equivale_a_construir_con_todos():
+    nombres = nombres_aleatorios(500)
+    completo = IndiceBusqueda(nombres)
+    incremental = IndiceBusqueda(nombres[:100])
+    for nombre in nombres[100:]:
+        incremental.añadir(nombre)
+    assert len(incremental) == len(completo)
+    for texto in ['al', 'Ñandu', 'orion vega', 'betta', 'kega', '']:
+        assert incremental.sugerencias(texto) == completo.sugerencias(texto)
+
+
+def test_sin_mayusculas_ni_tildes_y_una_variante_por_nombre():
+    indice = IndiceBusqueda(['Ñandú', 'ñandú', 'Alfa', 'alfa', 'ALFA', 'Alfa Centauri', 'Beta'])
+    assert indice.sugerencias('nandu') == ['Ñandú']
+    assert indice.sugerencias('ALF') == ['Alfa', 'Alfa Centauri']
+    assert indice.sugerencias('') == ['Alfa', 'Alfa Centauri', 'Beta', 'Ñandú']
+    assert indice.sugerencias('', limite=2) == ['Alfa', 'Alfa Centauri']
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('Alfa Cnetauri', 'Alfa Centauri'),
+    ('centauri', 'Alfa Centauri'),
+    ('Kepler 22', 'Kepler-22b'),
+    ('Proxma', 'Próxima'),
+])
+def test_errores_de_escritura_encuentran_el_nombre(texto, esperado):
+    indice = IndiceBusqueda(nombres_aleatorios(3000) + ['Alfa Centauri', 'Kepler-22b', 'Próxima'])
+    assert esperado in indice.sugerencias(texto, limite=5)
+    assert indice.parecidos(texto)[0] == normalizar_busqueda(esperado)
+
+
+def test_texto_sin_parecidos_no_sugiere_nada():
+    indice = IndiceBusqueda(['Alfa', 'Beta'])
+    assert indice.sugerencias('xyzw') == []
+    assert indice.parecidos('   ') == []
+
+
+def test_busqueda_tras_recargar_la_base_de_datos(db_file, tmp_path):
+    database = SystemDatabase(db_file, GENERATOR)
+    for i, nombre in enumerate(['Alfa Centauri', 'Ñandú', 'Beta']):
+        database.add_system(nombre, 1, 'ana', GENERATOR.generar_sistema_completo(semilla=i))
+    database.close()
+    recargada = SystemDatabase(db_file, GENERATOR)
+    recargada.close()
+    assert recargada.buscar_nombres('nan') == ['Ñandú']
+    assert recargada.buscar_nombres('Alfa Cnetauri')[0] == 'Alfa Centauri'
+
+    sqlite = SQLiteSystemDatabase(str(tmp_path / 'db.sqlite3'), GENERATOR, migrar_desde=db_file)
+    try:
+        sqlite.add_system('Gamma', 1, 'ana', GENERATOR.generar_sistema_completo(semilla=5))
+        assert sqlite.buscar_nombres('') == ['Alfa Centauri', 'Beta', 'Gamma', 'Ñandú']
+        assert sqlite.buscar_nombres('gama') == ['Gamma']
+    finally:
+        sqlite.close()
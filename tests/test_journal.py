@@ -0,0 +1,209 @@
+"""Recuperación de la base de datos JSON a partir de la instantánea y el journal"""
+
+import json
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from database import JOURNAL_ROTADO, SystemDatabase, leer_database_json
+from sharded_database import ShardedSystemDatabase
+from sqlite_database import SQLiteSystemDatabase
+from solar_system_generator import SolarSystemGenerator
+
+GENERATOR = SolarSystemGenerator()
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / 'db.json')
+
+
+def añadir(database, nombres):
+    for i, nombre in enumerate(nombres):
+        database.add_system(nombre, 1, 'ana', GENERATOR.generar_sistema_completo(semilla=i))
+
+
+def nombres_guardados(db_file):
+    database = SystemDatabase(db_file, GENERATOR)
+    database.close()
+    return sorted(entrada['original_name'] for entrada in database.data['systems'].values()), database
+
+
+def test_altas_sin_compactar_se_recuperan_del_journal(db_file):
+    database = SystemDatabase(db_file, GENERATOR)
+    añadir(database, ['Alfa', 'Beta', 'Gamma'])
+    database.close()
+    assert not os.path.exists(db_file)
+
+    nombres, recuperada = nombres_guardados(db_file)
+    assert nombres == ['Alfa', 'Beta', 'Gamma']
+    assert recuperada.get_total_systems() == 3
+    assert dict(recuperada.get_system('beta')['system_data']) == GENERATOR.generar_sistema_completo(semilla=1)
+
+
+def test_ultima_linea_a_medio_escribir_se_descarta(db_file):
+    database = SystemDatabase(db_file, GENERATOR)
+    añadir(database, ['Alfa', 'Beta'])
+    database.close()
+    journal = db_file + '.journal'
+    with open(journal, 'rb') as f:
+        contenido = f.read()
+    # Corte a mitad de la segunda línea, como si el proceso muriera durante la escritura
+    lineas = contenido.splitlines(keepends=True)
+    with open(journal, 'wb') as f:
+        f.write(lineas[0] + lineas[1][:len(lineas[1]) // 2])
+
+    nombres, recuperada = nombres_guardados(db_file)
+    assert nombres == ['Alfa']
+    # La línea rota se recorta, así que las altas siguientes quedan en líneas válidas
+    with open(journal, 'rb') as f:
+        assert f.read() == lineas[0]
+
+    database = SystemDatabase(db_file, GENERATOR)
+    añadir(database, ['Gamma'])
+    database.close()
+    assert nombres_guardados(db_file)[0] == ['Alfa', 'Gamma']
+
+
+def test_journal_rotado_de_compactacion_fallida_se_aplica(db_file):
+    database = SystemDatabase(db_file, GENERATOR)
+    añadir(database, ['Alfa', 'Beta'])
+    database.save_data()
+    añadir(database, ['Gamma'])
+    database.close()
+    # Compactación interrumpida: el journal se rotó pero la instantánea nueva no llegó a escribirse
+    os.replace(db_file + '.journal', db_file + '.journal' + JOURNAL_ROTADO)
+    database = SystemDatabase(db_file, GENERATOR)
+    añadir(database, ['Delta'])
+    database.close()
+
+    nombres, recuperada = nombres_guardados(db_file)
+    assert nombres == ['Alfa', 'Beta', 'Delta', 'Gamma']
+    assert recuperada.get_total_systems() == 4
+
+    # Una compactación completa lo vuelca todo en la instantánea y borra el journal rotado
+    recuperada = SystemDatabase(db_file, GENERATOR)
+    recuperada.save_data()
+    recuperada.close()
+    assert not os.path.exists(db_file + '.journal' + JOURNAL_ROTADO)
+    assert nombres_guardados(db_file)[0] == ['Alfa', 'Beta', 'Delta', 'Gamma']
+
+
+def test_claves_repetidas_en_instantanea_y_journal_cuentan_una_vez(db_file):
+    database = SystemDatabase(db_file, GENERATOR)
+    añadir(database, ['Alfa', 'Beta'])
+    database.close()
+    with open(db_file + '.journal', encoding='utf-8') as f:
+        journal = f.read()
+    # La instantánea se escribió pero el proceso murió antes de vaciar el journal
+    database = SystemDatabase(db_file, GENERATOR)
+    database.save_data()
+    database.close()
+    with open(db_file + '.journal', 'w', encoding='utf-8') as f:
+        f.write(journal)
+
+    nombres, recuperada = nombres_guardados(db_file)
+    assert nombres == ['Alfa', 'Beta']
+    assert recuperada.get_total_systems() == 2
+    assert recuperada.data['stats']['top_explorers']['1']['systems_explored'] == 2
+
+
+def test_escritura_fallida_del_journal_se_compacta_al_cerrar(db_file):
+    database = SystemDatabase(db_file, GENERATOR)
+
+    def fallar(lineas):
+        raise OSError("disco lleno")
+
+    database._escritor._escribir_lote = fallar
+    añadir(database, ['Alfa', 'Beta'])
+    database._escritor.vaciar()
+    assert database.estadisticas_persistencia()['errores'] >= 1
+    database.close()
+
+    with open(db_file, encoding='utf-8') as f:
+        assert len(json.load(f)['systems']) == 2
+    assert nombres_guardados(db_file)[0] == ['Alfa', 'Beta']
+
+
+def archivos(directorio):
+    """Contenido de todos los archivos de un directorio"""
+    contenido = {}
+    for nombre in sorted(os.listdir(directorio)):
+        with open(os.path.join(directorio, nombre), 'rb') as f:
+            contenido[nombre] = f.read()
+    return contenido
+
+
+@pytest.fixture
+def base_con_journal(tmp_path, monkeypatch):
+    """Base JSON con instantánea, altas en el journal y una última línea a medio escribir"""
+    origen = tmp_path / 'origen'
+    origen.mkdir()
+    monkeypatch.chdir(tmp_path)
+    db_file = str(origen / 'db.json')
+    database = SystemDatabase(db_file, GENERATOR)
+    database.add_system('Alfa', 1, 'ana', GENERATOR.generar_sistema_completo(semilla=0), guild_id=10)
+    database.save_data()
+    database.add_system('Beta', 2, 'bea', GENERATOR.generar_sistema_completo(semilla=1), guild_id=10)
+    database.add_system('Gamma', 1, 'ana', GENERATOR.generar_sistema_completo(semilla=2))
+    database.close()
+    with open(db_file + '.journal', 'a', encoding='utf-8') as f:
+        f.write('{"key": "delta", "entr')
+    return db_file
+
+
+def test_leer_database_json_no_modifica_la_base(base_con_journal):
+    antes = archivos(os.path.dirname(base_con_journal))
+    data = leer_database_json(base_con_journal)
+    assert archivos(os.path.dirname(base_con_journal)) == antes
+    assert sorted(data['systems']) == ['alfa', 'beta', 'gamma']
+    assert data['stats']['total_systems'] == 3
+    assert dict(data['systems']['beta']['system_data']) == GENERATOR.generar_sistema_completo(semilla=1)
+
+
+def test_leer_database_json_sin_archivos(tmp_path):
+    assert leer_database_json(str(tmp_path / 'no_existe.json')) == SystemDatabase.create_empty_database()
+
+
+def test_migrar_a_sqlite_solo_lee_el_origen(base_con_journal, tmp_path):
+    antes = archivos(os.path.dirname(base_con_journal))
+    database = SQLiteSystemDatabase(str(tmp_path / 'db.sqlite3'), GENERATOR, migrar_desde=base_con_journal)
+    try:
+        assert archivos(os.path.dirname(base_con_journal)) == antes
+        assert database.get_total_systems() == 3
+        assert database.get_total_systems(10) == 2
+        assert [explorer_id for explorer_id, _ in database.get_top_explorers(5, 10)] == ['1', '2']
+        assert dict(database.get_system('gamma')['system_data']) == GENERATOR.generar_sistema_completo(semilla=2)
+    finally:
+        database.close()
+
+
+def test_migrar_por_servidor_solo_lee_el_origen(base_con_journal, tmp_path):
+    antes = archivos(os.path.dirname(base_con_journal))
+    database = ShardedSystemDatabase(str(tmp_path / 'guilds'), GENERATOR, migrar_desde=base_con_journal)
+    try:
+        assert archivos(os.path.dirname(base_con_journal)) == antes
+        assert database.get_total_systems() == 3
+        assert database.get_total_systems(10) == 2
+        assert database.get_system('gamma', guild_id=10) is not None
+    finally:
+        database.close()
+
+
+def test_migrar_a_sqlite_una_base_solo_con_journal(db_file, tmp_path):
+    database = SystemDatabase(db_file, GENERATOR)
+    añadir(database, ['Alfa', 'Beta'])
+    database.close()
+    assert not os.path.exists(db_file)
+
+    migrada = SQLiteSystemDatabase(str(tmp_path / 'db.sqlite3'), GENERATOR, migrar_desde=db_file)
+    try:
+        assert migrada.get_total_systems() == 2
+        assert migrada.system_exists('beta')
+    finally:
+        migrada.close()
@@ -0,0 +1,19 @@
+"""Probabilidades exactas del ruleset activo"""
+
+from test_rulesets import config_modificado, ejecutar
+
+
+def test_probabilidades_siguen_a_la_recarga_de_reglas(tmp_path):
+    config = config_modificado(str(tmp_path), 2, 97)
+    salida = ejecutar(str(tmp_path), f"""
+        from probabilities import probabilidades
+        antes = probabilidades()
+        assert probabilidades() is antes
+        nuevo = ruleset.cargar_ruleset({config!r})
+        despues = probabilidades()
+        assert despues.ruleset is nuevo
+        print(antes.ruleset.version, antes.depositos(), despues.ruleset.version, despues.depositos())
+    """)
+    version_antes, depositos_antes, version_despues, depositos_despues = salida.split()
+    assert version_antes == '1' and depositos_antes != '97/100'
+    assert (version_despues, depositos_despues) == ('2', '97/100')
@@ -0,0 +1,117 @@
+"""Reglas archivadas por versión y reconstrucción exacta de los sistemas guardados con semilla"""
+
+import json
+import os
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cada proceso usa el config indicado en CONFIG (o el del repositorio) y guarda en el directorio actual
+PREAMBULO = f"""
+import json, os, sys
+sys.path.insert(0, {RAIZ!r})
+import ruleset
+if os.environ.get('CONFIG'):
+    sys.modules['config'] = ruleset.leer_config(os.environ['CONFIG'])
+from database import SistemaIrreconstruible, SystemDatabase
+from solar_system_generator import SolarSystemGenerator
+"""
+
+
+def ejecutar(directorio, codigo, config=None):
+    entorno = dict(os.environ, CONFIG=config or '')
+    resultado = subprocess.run(
+        [sys.executable, '-c', PREAMBULO + textwrap.dedent(codigo)],
+        cwd=directorio, env=entorno, capture_output=True, text=True
+    )
+    if resultado.returncode != 0:
+        raise AssertionError(resultado.stderr)
+    return resultado.stdout.strip()
+
+
+def config_modificado(directorio, version, depositos):
+    with open(os.path.join(RAIZ, 'config.py'), encoding='utf-8') as f:
+        lineas = f.read().splitlines()
+    for i, linea in enumerate(lineas):
+        if linea.startswith('RULESET_VERSION ='):
+            lineas[i] = f'RULESET_VERSION = {version}'
+        elif linea.startswith('DEPOSITOS_PROBABILITY ='):
+            lineas[i] = f'DEPOSITOS_PROBABILITY = {depositos}'
+    ruta = os.path.join(directorio, f'config_v{version}.py')
+    with open(ruta, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lineas) + '\n')
+    return ruta
+
+
+GUARDAR = """
+generator = SolarSystemGenerator()
+database = SystemDatabase('db.json', generator)
+sistemas = {}
+for semilla in range(40):
+    sistema = generator.generar_sistema(semilla=semilla)
+    database.add_system(f'Sistema {semilla}', 1, 'ana', sistema, semilla=semilla)
+    sistemas[semilla] = json.loads(json.dumps(dict(sistema), ensure_ascii=False))
+database.close()
+assert all('semilla' in entrada for entrada in database.data['systems'].values())
+print(json.dumps(sistemas, ensure_ascii=False))
+"""
+
+LEER = """
+database = SystemDatabase('db.json', SolarSystemGenerator())
+try:
+    print(json.dumps({
+        semilla: json.loads(json.dumps(dict(database.get_system(f'Sistema {semilla}')['system_data']),
+                                       ensure_ascii=False))
+        for semilla in range(40)
+    }, ensure_ascii=False))
+except SistemaIrreconstruible:
+    print('irreconstruible')
+database.close()
+"""
+
+
+def test_semillas_se_reconstruyen_con_sus_reglas_archivadas(tmp_path):
+    originales = ejecutar(tmp_path, GUARDAR)
+    assert os.path.exists(tmp_path / 'rulesets' / 'v1.json')
+
+    # Nueva versión con otras probabilidades, en un proceso nuevo
+    config_v2 = config_modificado(tmp_path, 2, 97)
+    assert ejecutar(tmp_path, LEER, config_v2) == originales
+    assert os.path.exists(tmp_path / 'rulesets' / 'v2.json')
+
+
+def test_sin_reglas_archivadas_no_se_reconstruye_con_otras(tmp_path):
+    ejecutar(tmp_path, GUARDAR)
+    os.remove(tmp_path / 'rulesets' / 'v1.json')
+    assert ejecutar(tmp_path, LEER, config_modificado(tmp_path, 2, 97)) == 'irreconstruible'
+
+
+def test_cambiar_tablas_sin_cambiar_version_falla(tmp_path):
+    ejecutar(tmp_path, GUARDAR)
+    with pytest.raises(AssertionError, match='RULESET_VERSION sigue siendo 1'):
+        ejecutar(tmp_path, "SolarSystemGenerator().generar_sistema(semilla=1)", config_modificado(tmp_path, 1, 97))
+
+
+def test_sin_archivo_posible_se_guarda_el_sistema_completo(tmp_path):
+    # Un archivo donde debería estar el directorio impide archivar las reglas
+    (tmp_path / 'rulesets').write_text('')
+    salida = ejecutar(tmp_path, """
+    generator = SolarSystemGenerator()
+    database = SystemDatabase('db.json', generator)
+    database.add_system('Completo', 1, 'ana', generator.generar_sistema(semilla=5), semilla=5)
+    database.close()
+    print(sorted(database.data['systems']['completo']))
+    """)
+    assert 'system_data' in salida and 'semilla' not in salida
+
+
+
+def test_reglas_actuales_archivadas_en_el_repositorio(tmp_path):
+    # Sin este archivo, un despliegue limpio no podría reconstruir los sistemas guardados con semilla
+    version, huella = ejecutar(tmp_path, "r = ruleset.ruleset_actual(); print(r.version, r.huella)").split()
+    with open(os.path.join(RAIZ, 'rulesets', f'v{version}.json'), encoding='utf-8') as f:
+        assert json.load(f)['huella'] == huella
@@ -0,0 +1,134 @@
+"""Muestreadores precompilados: tabla alias exacta, rasgos de especie y datos inválidos"""
+
+import os
+import random
+import sys
+from collections import Counter
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import config
+from samplers import AliasSampler, TraitSampler
+from ruleset import ruleset_actual
+
+TABLAS = [
+    {'a': 1},
+    {'a': 1, 'b': 1},
+    {'a': 5, 'b': 0, 'c': 3, 'd': 12},
+    {'a': 97, 'b': 1, 'c': 1, 'd': 1},
+    {f'o{i}': i * 7 % 13 for i in range(30)},
+]
+
+
+@pytest.mark.parametrize('tabla', TABLAS)
+def test_cada_opcion_ocupa_exactamente_su_peso(tabla):
+    # Recorriendo todos los valores de randbelow, cada opción sale peso * n veces
+    sampler = AliasSampler.desde_dict(tabla)
+    n = len(sampler)
+    conteo = Counter(sampler.elegir(lambda m, r=r: r) for r in range(n * sampler.total))
+    assert conteo == Counter({opcion: peso * n for opcion, peso in tabla.items() if peso})
+
+
+@pytest.mark.parametrize('tabla', TABLAS)
+def test_elegir_y_elegir_indice_coinciden(tabla):
+    sampler = AliasSampler.desde_dict(tabla)
+    for r in range(len(sampler) * sampler.total):
+        assert sampler.elegir(lambda m: r) == sampler.opciones[sampler.elegir_indice(lambda m: r)]
+
+
+def test_frecuencias_con_un_rng():
+    sampler = AliasSampler(['a', 'b', 'c'], [1, 2, 7])
+    rng = random.Random(3)
+    conteo = Counter(sampler.elegir(rng.randrange) for _ in range(100000))
+    for i, opcion in enumerate(sampler.opciones):
+        assert abs(conteo[opcion] / 100000 - sampler.probabilidad(i)) < 0.01
+
+
+def test_probabilidad_y_tabla_alias():
+    sampler = AliasSampler(['a', 'b'], [1, 3])
+    assert sampler.probabilidad(0) == 0.25
+    assert sampler.probabilidad(1) == 0.75
+    cortes, alias = sampler.tabla_alias()
+    assert len(cortes) == len(alias) == 2
+
+
+@pytest.mark.parametrize('opciones, pesos', [
+    ([], []),
+    (['a', 'b'], [1]),
+    (['a'], [-1]),
+    (['a'], [0.5]),
+    (['a'], [True]),
+    (['a', 'b'], [0, 0]),
+])
+def test_datos_invalidos_lanzan_value_error(opciones, pesos):
+    with pytest.raises(ValueError):
+        AliasSampler(opciones, pesos)
+
+
+RASGOS = {'A': [], 'B': ['Roca'], 'C': [], 'D': ['Roca', 'Gas'], 'E': ['Gas']}
+EXCLUSIVOS = {'A': ['C'], 'C': ['A'], 'D': ['E']}
+
+
+def permitidos(especie):
+    return {rasgo for rasgo, especies in RASGOS.items() if not especies or especie in especies}
+
+
+def test_pool_de_cada_especie():
+    sampler = TraitSampler(RASGOS, ['Roca', 'Gas'], EXCLUSIVOS, 3)
+    for especie in ('Roca', 'Gas', 'Desconocida'):
+        pool = sampler.pool(especie)
+        assert {rasgo for i, rasgo in enumerate(sampler.rasgos) if pool >> i & 1} == permitidos(especie)
+
+
+@pytest.mark.parametrize('especie', ['Roca', 'Gas', 'Desconocida'])
+def test_rasgos_elegidos_respetan_especie_y_exclusiones(especie):
+    sampler = TraitSampler(RASGOS, ['Roca', 'Gas'], EXCLUSIVOS, 3)
+    rng = random.Random(1)
+    vistos = Counter()
+    for _ in range(5000):
+        rasgos = sampler.elegir(especie, rng.randrange)
+        assert len(rasgos) == len(set(rasgos)) <= 3
+        assert set(rasgos) <= permitidos(especie)
+        # Un rasgo elegido retira los que excluye de las tiradas siguientes
+        for i, rasgo in enumerate(rasgos):
+            assert not set(EXCLUSIVOS.get(rasgo, ())) & set(rasgos[i + 1:])
+        vistos.update(rasgos)
+    assert set(vistos) == permitidos(especie)
+
+
+def test_cada_tirada_elige_el_k_esimo_rasgo_disponible():
+    sampler = TraitSampler(RASGOS, ['Roca', 'Gas'], EXCLUSIVOS, 3)
+    # Siempre el primero disponible: A excluye C, así que después van B y D
+    assert sampler.elegir('Roca', lambda m: 0) == ['A', 'B', 'D']
+    # Siempre el último disponible: E no excluye a nadie, así que D sigue disponible después
+    assert sampler.elegir('Gas', lambda m: m - 1) == ['E', 'D', 'C']
+
+
+def test_primer_rasgo_uniforme_entre_los_disponibles():
+    sampler = TraitSampler(RASGOS, ['Roca', 'Gas'], EXCLUSIVOS, 1)
+    primeros = Counter(sampler.elegir('Roca', lambda m, r=r: r)[0] for r in range(4))
+    assert primeros == Counter({'A': 1, 'B': 1, 'C': 1, 'D': 1})
+
+
+def test_menos_rasgos_si_se_agotan():
+    sampler = TraitSampler({'A': [], 'B': []}, [], {'A': ['B'], 'B': ['A']}, 3)
+    assert len(sampler.elegir('Cualquiera', random.Random(0).randrange)) == 1
+
+
+def test_rasgos_del_ruleset_respetan_config():
+    ruleset = ruleset_actual()
+    rng = random.Random(2)
+    for especie in ruleset.tipos_especies:
+        for _ in range(300):
+            positivos = ruleset.sampler_rasgos_positivos.elegir(especie, rng.randrange)
+            negativos = ruleset.sampler_rasgos_negativos.elegir(especie, rng.randrange)
+            assert len(set(positivos)) == len(positivos) <= 3
+            assert len(set(negativos)) == len(negativos) <= 2
+            for i, rasgo in enumerate(positivos):
+                assert not config.RASGOS_POSITIVOS[rasgo] or especie in config.RASGOS_POSITIVOS[rasgo]
+                assert not set(config.RASGOS_EXCLUSIVOS.get(rasgo, ())) & set(positivos[i + 1:])
+            for rasgo in negativos:
+                assert not config.RASGOS_NEGATIVOS[rasgo] or especie in config.RASGOS_NEGATIVOS[rasgo]
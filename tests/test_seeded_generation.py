@@ -0,0 +1,65 @@
+"""Generación con semilla: reproducible, independiente del orden de lectura y con el generador por sección"""
+
+import os
+import sys
+from collections import Counter
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from parallel_generator import generar_galaxia
+from rng_backends import RNGSeccion
+from solar_system_generator import SolarSystemGenerator, semillas_secciones
+
+
+def test_rng_seccion_reproducible_y_en_rango():
+    a, b = RNGSeccion(12345), RNGSeccion(12345)
+    tiradas = [(a.randint(1, 100), a.randrange(7), a.randrange(3, 9), a.choice('xyz')) for _ in range(2000)]
+    assert tiradas == [(b.randint(1, 100), b.randrange(7), b.randrange(3, 9), b.choice('xyz')) for _ in range(2000)]
+    assert {t[0] for t in tiradas} == set(range(1, 101))
+    assert {t[1] for t in tiradas} == set(range(7))
+    assert {t[2] for t in tiradas} == set(range(3, 9))
+    assert RNGSeccion(1).getrandbits(200) < 1 << 200
+    assert 0 <= RNGSeccion(1).random() < 1
+
+
+def test_rng_seccion_uniforme():
+    rng = RNGSeccion(7)
+    conteo = Counter(rng.randrange(10) for _ in range(100000))
+    assert all(abs(n - 10000) < 500 for n in conteo.values())
+
+
+def test_rng_seccion_rechaza_rangos_vacios():
+    rng = RNGSeccion(1)
+    with pytest.raises(ValueError):
+        rng.randint(5, 4)
+    with pytest.raises(ValueError):
+        rng.randrange(0)
+    with pytest.raises(IndexError):
+        rng.choice([])
+
+
+def test_sub_semillas_distintas_por_seccion():
+    semillas = semillas_secciones(42)
+    assert len(set(semillas.values())) == len(semillas)
+    assert semillas == semillas_secciones(42) != semillas_secciones(43)
+
+
+@pytest.mark.parametrize('semilla', range(50))
+def test_misma_semilla_mismo_sistema(semilla):
+    completo = SolarSystemGenerator().generar_sistema_completo(semilla=semilla)
+    assert SolarSystemGenerator().generar_sistema_completo(semilla=semilla) == completo
+
+    # Leído al revés, el sistema perezoso genera sus secciones en otro orden y da lo mismo
+    perezoso = SolarSystemGenerator().generar_sistema(semilla=semilla)
+    assert {clave: perezoso[clave] for clave in reversed(list(perezoso))} == completo
+    assert list(perezoso) == list(completo)
+
+
+def test_galaxia_en_paralelo_no_depende_de_los_procesos():
+    secuencial = list(generar_galaxia(2500, 11, procesos=1, tamano_shard=1000))
+    assert len(secuencial) == 2500
+    assert list(generar_galaxia(2500, 11, procesos=2, tamano_shard=1000)) == secuencial
+    assert list(generar_galaxia(2500, 12, procesos=1, tamano_shard=1000)) != secuencial
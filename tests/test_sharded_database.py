@@ -0,0 +1,119 @@
+"""Base de datos por servidor: aislamiento, partición compartida, resumen global y descarga de particiones"""
+
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from database import SystemDatabase
+from sharded_database import BYTES_POR_SISTEMA, RESUMEN, ShardedSystemDatabase, archivo_particion
+from solar_system_generator import SolarSystemGenerator
+
+GENERATOR = SolarSystemGenerator()
+
+
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / 'guilds')
+
+
+def abrir(directorio, **opciones):
+    return ShardedSystemDatabase(directorio, GENERATOR, migrar_desde=None, **opciones)
+
+
+def guardar(database, nombre, user_id, guild_id, semilla=0):
+    database.add_system(nombre, user_id, f'explorador{user_id}', GENERATOR.generar_sistema_completo(semilla=semilla),
+                        guild_id=guild_id)
+
+
+def test_cada_servidor_ve_sus_sistemas_y_los_compartidos(directorio):
+    database = abrir(directorio)
+    guardar(database, 'Alfa', 1, 10)
+    guardar(database, 'Beta', 2, 20)
+    guardar(database, 'Gamma', 3, None)
+    try:
+        assert database.system_exists('alfa', guild_id=10)
+        assert not database.system_exists('Alfa', guild_id=20)
+        assert database.get_system('Beta', guild_id=10) is None
+        # Los sistemas sin servidor (mensajes directos y anteriores al particionado) se ven desde todos
+        assert database.system_exists('Gamma', guild_id=20)
+        assert database.get_system('gamma', guild_id=10)['original_name'] == 'Gamma'
+        assert database.buscar_nombres('', guild_id=10) == ['Alfa', 'Gamma']
+        assert database.particion(20).system_exists('gamma')
+    finally:
+        database.close()
+
+
+def test_estadisticas_globales_y_por_servidor(directorio):
+    database = abrir(directorio)
+    for i, (user_id, guild_id) in enumerate([(1, 10), (1, 10), (2, 10), (2, 20), (2, 20), (3, None)]):
+        guardar(database, f'Sistema {i}', user_id, guild_id, semilla=i)
+    database.close()
+
+    recargada = abrir(directorio)
+    try:
+        # El resumen global se lee al arrancar, sin cargar ninguna partición
+        assert recargada.get_total_systems() == 6
+        top = recargada.get_top_explorers(3)
+        assert [(k, v['systems_explored']) for k, v in top] == [('2', 3), ('1', 2), ('3', 1)]
+        assert recargada.cargas == 0
+        assert recargada.get_total_systems(10) == 3
+        assert [(k, v['systems_explored']) for k, v in recargada.get_top_explorers(5, 20)] == [('2', 2)]
+        assert recargada.count_systems_by_explorer(1, guild_id=10) == 2
+        assert recargada.cargas == 2
+    finally:
+        recargada.close()
+
+
+def test_particiones_menos_usadas_se_descargan_sin_perder_altas(directorio):
+    database = abrir(directorio, presupuesto_memoria=3 * BYTES_POR_SISTEMA)
+    try:
+        for i in range(8):
+            guardar(database, f'Sistema {i}', 1, 100 + i % 4, semilla=i)
+        assert database.descargas > 0
+        assert database.memoria_estimada() <= 3 * BYTES_POR_SISTEMA
+        # Una partición descargada se vuelve a cargar con todas sus altas
+        for i in range(8):
+            assert database.get_system(f'Sistema {i}', guild_id=100 + i % 4) is not None
+    finally:
+        database.close()
+
+    recargada = abrir(directorio)
+    try:
+        assert recargada.get_total_systems() == 8
+        assert all(recargada.get_total_systems(100 + g) == 2 for g in range(4))
+    finally:
+        recargada.close()
+
+
+def test_migracion_reparte_por_servidor(directorio, tmp_path):
+    json_file = str(tmp_path / 'db.json')
+    origen = SystemDatabase(json_file, GENERATOR)
+    for i, guild_id in enumerate([10, 10, 20, None]):
+        origen.add_system(f'Sistema {i}', i, 'ana', GENERATOR.generar_sistema_completo(semilla=i), guild_id=guild_id)
+    origen.close()
+
+    database = ShardedSystemDatabase(directorio, GENERATOR, migrar_desde=json_file)
+    try:
+        # Antes de cargar ninguna partición solo están los archivos que escribió la migración
+        assert sorted(os.listdir(directorio)) == sorted([
+            RESUMEN, archivo_particion(10), archivo_particion(20), archivo_particion(None)
+        ])
+        assert database.get_total_systems() == 4
+        assert database.get_total_systems(10) == 2
+        assert database.system_exists('Sistema 2', guild_id=20)
+        assert database.system_exists('Sistema 3', guild_id=20)
+        assert not database.system_exists('Sistema 0', guild_id=20)
+    finally:
+        database.close()
+
+    # La migración se hace una sola vez: con el resumen ya escrito no se repite
+    repetida = ShardedSystemDatabase(directorio, GENERATOR, migrar_desde=json_file)
+    try:
+        assert repetida.get_total_systems() == 4
+    finally:
+        repetida.close()